@@ -2,56 +2,146 @@ from flask import Flask, jsonify, session, request
 from flask_mail import Mail
 import os
 from dotenv import load_dotenv
+from config import Config
 from models import Database
+from services.admission_controller import AdmissionController
+from services.asset_service import AssetService
+from services.compression_service import CompressionService
+from services.analytics_engine import AnalyticsEngine
+from services.dashboard_service import DashboardService
+from services.ai_service import AIService
 from services.session_service import SessionService
+from services.trend_service import TrendService
+from services.review_service import ReviewService
 from services.email_service import EmailService
+from services.metrics_service import MetricsService
+from services.page_cache_service import PageCacheService
+from services.telemetry_service import TelemetryService
+from services.tracing_service import TracingService
 
 # Import blueprints
 from blueprints import (
-    auth_bp, generate_bp, sessions_bp, 
-    analytics_bp, contact_bp, pages_bp
+    auth_bp, generate_bp, sessions_bp,
+    analytics_bp, reviews_bp, contact_bp, pages_bp,
+    user_bp, debug_bp, metrics_bp
 )
 
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
+# Template pages, pre-rendered at startup by PageCacheService
+PAGES = ['/', '/analytics', '/sessions', '/donate', '/upgrade', '/contact']
 
-# Configure email
-app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
-app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'True').lower() == 'true'
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
-
-mail = Mail(app)
-
-# Initialize database
-db = Database()
-if not db or not db.pool:
-    raise RuntimeError("Database failed to initialize")
-
-# Initialize services (making them available to blueprints via app context)
-session_service = SessionService(db)
-email_service = EmailService(mail, app.config['MAIL_DEFAULT_SENDER'])
-
-# Make services available to blueprints
-app.db = db
-app.session_service = session_service
-app.email_service = email_service
-
-# Register blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(generate_bp)
-app.register_blueprint(sessions_bp)
-app.register_blueprint(analytics_bp)
-app.register_blueprint(contact_bp)
-app.register_blueprint(pages_bp)
+def create_app(start_workers=True):
+    """Build the Flask app and its services"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
+    
+    # Configure email
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'True').lower() == 'true'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
+    
+    mail = Mail(app)
+    
+    # Initialize database; the pool reconnects on first use in each forked worker
+    db = Database()
+    if not db or not db.pool:
+        raise RuntimeError("Database failed to initialize")
+    
+    # Initialize services (making them available to blueprints via current_app)
+    telemetry_service = TelemetryService(db, Config.LLM_SAMPLE_RATE, Config.LLM_SAMPLE_LOG)
+    app.db = db
+    app.session_service = SessionService(
+        db, identity_cache_size=Config.IDENTITY_CACHE_SIZE, identity_ttl=Config.IDENTITY_CACHE_TTL
+    )
+    app.dashboard_service = DashboardService(
+        db, app.session_service, workers=Config.DASHBOARD_WORKERS,
+        cache_ttl=Config.DASHBOARD_CACHE_TTL, timeout=Config.DASHBOARD_TIMEOUT,
+        utc_offset_hours=Config.STUDY_UTC_OFFSET_HOURS
+    )
+    app.trend_service = TrendService(db, utc_offset_hours=Config.STUDY_UTC_OFFSET_HOURS)
+    app.review_service = ReviewService(
+        db, max_interval_days=Config.REVIEW_MAX_INTERVAL_DAYS,
+        relearn_minutes=Config.REVIEW_RELEARN_MINUTES, quiz_size=Config.REVIEW_QUIZ_SIZE
+    )
+    app.analytics_engine = AnalyticsEngine(
+        db, app.session_service, cache_cards=Config.ANALYTICS_CACHE_CARDS, cache_ttl=Config.ANALYTICS_CACHE_TTL
+    )
+    app.email_service = EmailService(
+        mail, app.config['MAIL_DEFAULT_SENDER'], outbox=db,
+        workers=Config.EMAIL_WORKERS, max_attempts=Config.EMAIL_MAX_ATTEMPTS
+    )
+    app.telemetry_service = telemetry_service
+    app.ai_service = AIService(telemetry=telemetry_service, max_connections=Config.GROQ_MAX_CONNECTIONS)
+    app.admission_controller = AdmissionController(
+        max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+        per_user_limit=Config.ADMISSION_PER_USER,
+        max_queue=Config.ADMISSION_MAX_QUEUE,
+        max_wait_seconds=Config.ADMISSION_MAX_WAIT_SECONDS
+    )
+    app.asset_service = AssetService(app.static_folder)
+    app.compression_service = CompressionService(
+        min_size=Config.COMPRESS_MIN_BYTES,
+        brotli_quality=Config.COMPRESS_BROTLI_QUALITY,
+        gzip_level=Config.COMPRESS_GZIP_LEVEL
+    )
+    app.page_cache = PageCacheService(app.asset_service, app.compression_service)
+    app.metrics_service = MetricsService()
+    app.tracing_service = TracingService(
+        sample_rate=Config.TRACE_SAMPLE_RATE,
+        exporter=Config.TRACE_EXPORTER,
+        export_path=Config.TRACE_FILE,
+        otlp_endpoint=Config.OTLP_ENDPOINT,
+        profile_token=Config.PROFILE_TOKEN,
+        profile_endpoints=Config.PROFILE_ENDPOINTS,
+        profile_interval_ms=Config.PROFILE_INTERVAL_MS,
+        profile_dir=Config.PROFILE_DIR
+    )
+    
+    # Register blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(generate_bp)
+    app.register_blueprint(sessions_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(reviews_bp)
+    app.register_blueprint(contact_bp)
+    app.register_blueprint(pages_bp)
+    app.register_blueprint(user_bp)
+    app.register_blueprint(debug_bp)
+    app.register_blueprint(metrics_bp)
+    
+    # Templates and /static/ go through the build manifest when static/dist/ exists
+    app.asset_service.init_app(app)
+    
+    # after_request hooks run in reverse, so compression (registered first) sees the final body;
+    # tracing wraps everything else in the request's root span; metrics hooks come next so
+    # requests rejected by require_auth are still counted
+    app.compression_service.init_app(app)
+    app.tracing_service.init_app(app)
+    app.metrics_service.init_app(app)
+    app.before_request(require_auth)
+    
+    # Rendered once here; with gunicorn's preload the workers inherit the pages
+    app.page_cache.warm(app, PAGES)
+    
+    # gunicorn builds the app once in the master and runs init_worker() after each fork instead
+    if start_workers:
+        init_worker(app)
+    return app
+
+def init_worker(app):
+    """Per-process startup: open this process's DB pool and start the email senders, trace exporter and telemetry writer"""
+    conn = app.db.get_connection()
+    if conn:
+        conn.close()
+    app.email_service.start(app)
+    app.tracing_service.start()
+    app.telemetry_service.start()
 
 # Auth middleware
-@app.before_request
 def require_auth():
     # Public routes (no auth required)
     public_routes = ['/', '/static/', '/contact', '/donate', '/upgrade']
@@ -68,100 +158,10 @@ def require_auth():
     
     return None
 
-# Debug routes
-@app.route('/debug/pool-status')
-def debug_pool_status():
-    return jsonify({
-        "status": "success",
-        "pool_status": "Pool working" if db.pool else "Pool failed",
-        "pool_size": getattr(db.pool, 'pool_size', 'No pool')
-    })
-
-@app.route('/debug/email-config')
-def debug_email_config():
-    return jsonify({
-        'MAIL_SERVER': app.config.get('MAIL_SERVER'),
-        'MAIL_PORT': app.config.get('MAIL_PORT'),
-        'MAIL_USERNAME': 'SET' if app.config.get('MAIL_USERNAME') else 'MISSING',
-        'MAIL_PASSWORD': 'SET' if app.config.get('MAIL_PASSWORD') else 'MISSING',
-    })
-
-# User info routes
-@app.route('/user/tier-info')
-def user_tier_info():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({
-            "status": "success",
-            "tier_info": {
-                "tier": "free",
-                "remaining_sessions": 10,
-                "session_limit": 10,
-                "sessions_used_today": 0,
-                "reset_in": "midnight",
-                "billing_period": "daily",
-                "total_sessions_used": 0
-            }
-        })
-    
-    allowance = session_service.check_daily_limit(user_id)
-    
-    # Get total sessions
-    conn = db.get_connection()
-    total_sessions = 0
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT total_sessions_used FROM users WHERE id = %s", (user_id,))
-        user_data = cursor.fetchone()
-        total_sessions = user_data.get('total_sessions_used', 0) if user_data else 0
-        cursor.close()
-        conn.close()
-    
-    return jsonify({
-        "status": "success",
-        "tier_info": {
-            "tier": "free",
-            "remaining_sessions": allowance['remaining'],
-            "session_limit": allowance['limit'],
-            "sessions_used_today": allowance['sessions_used_today'],
-            "reset_in": allowance['reset_in'],
-            "billing_period": "daily",
-            "total_sessions_used": total_sessions
-        }
-    })
-
-@app.route('/user/session-allowance')
-def user_session_allowance():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({
-            "status": "success",
-            "allowance": {"allowed": True, "remaining": 10, "limit": 10, "reset_in": "24h", "period": "daily"}
-        })
-    
-    allowance = session_service.check_daily_limit(user_id)
-    return jsonify({"status": "success", "allowance": allowance})
-
-@app.route('/user/session-count')
-def user_session_count():
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({"status": "success", "session_count": 0})
-    
-    result = db.fetch_one("SELECT sessions_used_today FROM users WHERE id = %s", (user_id,))
-    return jsonify({"status": "success", "session_count": result['sessions_used_today'] if result else 0})
-
 if __name__ == '__main__':
-    # Initialize database tables
-    with app.app_context():
-        if db.initialize_database():
-            print("✅ Database tables created/verified")
-        else:
-            print("❌ Failed to initialize database tables")
-
-    # In local development
-    if __name__ == '__main__':
-        host = os.environ.get('HOST', '0.0.0.0')
-        port = int(os.environ.get('PORT', 5000))
-        debug = os.environ.get('DEBUG', 'False').lower() == 'true'
-        app.run(host=host, port=port, debug=debug)
\ No newline at end of file
+    # Local development only; schema setup is `python init_db.py`, production runs gunicorn
+    app = create_app()
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+    debug = os.environ.get('DEBUG', 'False').lower() == 'true'
+    app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,210 @@
+"""
+Per-user learning-curve and mastery compute time for users with --cards
+answered cards: AnalyticsEngine's NumPy passes against the same statistics
+computed row by row in plain Python.
+
+For each --cards size (default 10,000 and 100,000) these are timed --repeat
+times (median and min):
+
+  python     learning curves and mastery with a loop over every card
+  columns    CardOutcomes(rows): the query's tuples into NumPy columns
+  curves     learning_curves() on the columns
+  mastery    mastery() on the columns
+
+and the two implementations' results are compared. With --mysql none
+(default) the cards are generated in process, so no database is needed.
+With --mysql docker (a throwaway mysql:8.0 container) or --mysql env (the
+database in DB_*), a probe user with about that many cards is seeded
+(benchmarks/seed.py) and the query and both endpoints are timed as well:
+
+  query      Database.get_card_outcomes
+  cold       GET /analytics/learning-curve + /analytics/mastery after invalidating the user
+  warm       the same with the user's columns cached
+
+Results go to benchmarks/results/analytics-engine-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.analytics_engine [--cards 10000,100000] [--mysql none|docker|env]
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, timed, write_results
+from services.analytics_engine import Z_95, CardOutcomes, learning_curves, mastery
+
+WINDOW, POINTS, BINS = 20, 200, 10
+HALF_LIFE, THRESHOLD = 50, 0.8
+
+
+def synthetic_rows(cards, rng_seed):
+    """get_card_outcomes-shaped tuples for one improving learner, oldest first"""
+    rng = random.Random(rng_seed)
+    answered_at, session_id, rows = 1700000000, 0, []
+    for i in range(cards):
+        if i % 10 == 0:
+            session_id += 1
+            answered_at += rng.randint(3600, 3 * 86400)
+        question_type = 2 if rng.random() < 0.25 else 1
+        difficulty = 2 if rng.random() < 0.3 else 1
+        p_correct = 0.45 + 0.4 * i / cards - (0.15 if difficulty == 2 else 0)
+        rows.append((answered_at, session_id, int(rng.random() < p_correct), question_type, difficulty))
+    return rows
+
+
+def wilson(successes, total):
+    if not total:
+        return None, None, None
+    p = successes / total
+    z2n = Z_95 * Z_95 / total
+    centre = (p + z2n / 2) / (1 + z2n)
+    half = Z_95 * math.sqrt(p * (1 - p) / total + z2n / (4 * total)) / (1 + z2n)
+    return p, centre - half, centre + half
+
+
+def python_statistics(rows):
+    """Everything learning_curves() and mastery() return, one card at a time"""
+    n = len(rows)
+    sample = sorted({round(i * (n - 1) / (min(POINTS, n) - 1)) for i in range(min(POINTS, n))}) if n > 1 else list(range(n))
+    wanted = set(sample)
+    moving, window_sum, total_correct, sessions = [], 0, 0, set()
+    groups = {"difficulty": {}, "question_type": {}, "combined": {}, "overall": {}}
+    for i, (answered_at, session_id, correct, question_type, difficulty) in enumerate(rows):
+        window_sum += correct
+        total_correct += correct
+        sessions.add(session_id)
+        if i >= WINDOW:
+            window_sum -= rows[i - WINDOW][2]
+        if i in wanted:
+            moving.append((i + 1, datetime.fromtimestamp(answered_at, timezone.utc).date().isoformat(),
+                           *wilson(window_sum, min(i + 1, WINDOW))))
+        groups["difficulty"].setdefault(difficulty, []).append(correct)
+        groups["question_type"].setdefault(question_type, []).append(correct)
+        groups["combined"].setdefault((question_type, difficulty), []).append(correct)
+        groups["overall"].setdefault(0, []).append(correct)
+
+    def curve(outcomes):
+        slices = min(len(outcomes), BINS)
+        bins = [[0, 0] for _ in range(slices)]
+        for rank, correct in enumerate(outcomes):
+            b = bins[rank * slices // len(outcomes)]
+            b[0] += 1
+            b[1] += correct
+        ends = list(itertools.accumulate(total for total, hits in bins))
+        return [(end, *wilson(hits, total)) for end, (total, hits) in zip(ends, bins)]
+
+    def estimate(outcomes):
+        weight = score = 0.0
+        for age, correct in enumerate(reversed(outcomes)):
+            w = 0.5 ** (age / HALF_LIFE)
+            weight += w
+            score += w * correct
+        mean = (1 + score) / (2 + weight)
+        spread = Z_95 * math.sqrt(mean * (1 - mean) / (3 + weight))
+        return mean, max(mean - spread, 0), min(mean + spread, 1), sum(outcomes) / len(outcomes)
+
+    return {
+        "overall": wilson(total_correct, n),
+        "sessions": len(sessions),
+        "moving_average": [point[2] for point in moving],
+        "curves": {key: {k: curve(v) for k, v in sorted(groups[key].items())} for key in ("difficulty", "question_type")},
+        "mastery": {key: {k: estimate(v) for k, v in sorted(groups[key].items())} for key in groups},
+    }
+
+
+def compare(vectorized_curves, vectorized_mastery, reference):
+    """Largest difference, in percentage points, between the two implementations"""
+    pairs = list(zip(vectorized_curves["moving_average"]["accuracy"], reference["moving_average"]))
+    for key in ("difficulty", "question_type"):
+        for curve, ref in zip(vectorized_curves["curves"][key].values(), reference["curves"][key].values()):
+            pairs += zip(curve["accuracy"], (point[1] for point in ref))
+    for key in ("difficulty", "question_type", "combined"):
+        for group, ref in zip(vectorized_mastery[key].values(), reference["mastery"][key].values()):
+            pairs += zip((group["mastery"], group["low"], group["high"], group["accuracy"]), ref)
+    return round(max(abs(a - b * 100) for a, b in pairs), 3)
+
+
+def run_size(rows, repeat):
+    results = {}
+    results["python"], reference = timed(lambda: python_statistics(rows), repeat)
+    results["columns"], outcomes = timed(lambda: CardOutcomes(rows), repeat)
+    results["curves"], curves = timed(lambda: learning_curves(outcomes, WINDOW, POINTS, BINS), repeat)
+    results["mastery"], estimates = timed(lambda: mastery(outcomes, HALF_LIFE, THRESHOLD), repeat)
+    python_ms = results["python"]["median_ms"]
+    cached = results["curves"]["median_ms"] + results["mastery"]["median_ms"]
+    return results, {
+        "cards": len(rows),
+        "speedup": round(python_ms / (results["columns"]["median_ms"] + cached), 1),
+        "cached_speedup": round(python_ms / cached, 1),
+        "max_difference_points": compare(curves, estimates, reference),
+        "column_bytes": outcomes.nbytes,
+    }
+
+
+def run_database(app, db, size, rng_seed, repeat):
+    """Query and endpoint timings for a seeded user with about `size` cards"""
+    from benchmarks.data_layer import probe
+    ctx = probe(app, db, f"analytics-{size}-{rng_seed}@probe.reviseai.test", max(1, size // 10))
+    user_id, client, engine = ctx['user_id'], ctx['client'], app.analytics_engine
+
+    def endpoints():
+        for path in ("/analytics/learning-curve", "/analytics/mastery"):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    def cold():
+        engine.invalidate(user_id)
+        endpoints()
+
+    results = {}
+    results["query"], rows = timed(lambda: db.get_card_outcomes(user_id), repeat)
+    results["cold"], _ = timed(cold, repeat)
+    results["warm"], _ = timed(endpoints, repeat)
+    return rows, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', default="10000,100000", help="answered cards per user")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "analytics-engine", choices=('none', 'docker', 'env'), default='none')
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.cards.split(","))
+
+    results = {}
+    with benchmark_app(args, "analytics-engine") as app:
+        db = app.db if app else None
+        for size in sizes:
+            print(f"\n{size:,} cards", flush=True)
+            database = None
+            if db is None:
+                rows = synthetic_rows(size, args.seed)
+            else:
+                rows, database = run_database(app, db, size, args.seed, args.repeat)
+            timings, summary = run_size(rows, args.repeat)
+            results[str(size)] = {**summary, "timings": {**timings, **(database or {})}}
+
+    names = ("python", "columns", "curves", "mastery") + (("query", "cold", "warm") if args.mysql != 'none' else ())
+    print(f"\nmedian ms per user ({'synthetic cards' if args.mysql == 'none' else 'seeded users'})")
+    print(f"  {'cards':>9}" + "".join(f"{name:>10}" for name in names) + f"{'speedup':>9}{'cached':>8}{'max diff':>10}")
+    for size, r in results.items():
+        cells = "".join(f"{r['timings'][name]['median_ms']:>10.2f}" for name in names)
+        print(f"  {r['cards']:>9,}{cells}{r['speedup']:>8}x{r['cached_speedup']:>7}x{r['max_difference_points']:>10}")
+    print("\nspeedup is python against columns + curves + mastery, cached against curves + mastery alone")
+    print("(the columns are built once per user and cached); max diff is in percentage points")
+
+    parameters = {"window": WINDOW, "points": POINTS, "bins": BINS, "half_life": HALF_LIFE, "threshold": THRESHOLD}
+    write_results("analytics-engine", args, parameters=parameters, sizes=results)
+
+
+if __name__ == '__main__':
+    main()
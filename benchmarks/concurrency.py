@@ -0,0 +1,181 @@
+"""
+Load test for the cooperative (gevent) mode: how many generations one process
+holds open at once while Groq is slow.
+
+A Groq stand-in (benchmarks/standins.py) runs in a subprocess and answers every
+completion after --latency-ms. --requests generations are then started at the
+same moment and the script reports how many were in flight at the stand-in at
+peak, the wall time, and latency percentiles. With thread-per-request serving,
+wall time is bounded below by ceil(requests / threads) x latency; the same bound
+is printed for comparison.
+
+Targets:
+  service  AdmissionController + AIService in this process under gevent, exactly as
+           a gevent worker runs them, without HTTP or MySQL (the default).
+  http     The full app under `gunicorn -c gunicorn.conf.py` with
+           GUNICORN_WORKER_CLASS=gevent and one worker. Needs DB_* pointing at a
+           database prepared with init_db.py; each request logs in as a new user.
+
+Usage:
+    python -m benchmarks.concurrency [--target service|http] [--requests 2000]
+                                     [--latency-ms 2000] [--threads 12]
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+
+import gevent
+import requests
+from gevent.pool import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+NOTES = ("Photosynthesis converts light energy into chemical energy in the chloroplasts. "
+         "Chlorophyll absorbs red and blue light. The Calvin cycle fixes carbon dioxide into glucose.")
+
+
+def start_groq_standin(port, latency_ms):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.standins", "groq", "--port", str(port), "--latency-ms", str(latency_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(base_url + "/stats", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise SystemExit("Groq stand-in did not start")
+
+
+def stop(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def run_service(args, groq_url):
+    """One greenlet per generation through the same admission and AI path as the route"""
+    os.environ.update(GUNICORN_WORKER_CLASS="gevent", GROQ_API_KEY="standin", GROQ_BASE_URL=groq_url)
+    from config import Config
+    from services.admission_controller import AdmissionController
+    from services.ai_service import AIService
+
+    ai_service = AIService(max_connections=Config.GROQ_MAX_CONNECTIONS)
+    admission = AdmissionController(
+        max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+        per_user_limit=Config.ADMISSION_PER_USER,
+        max_queue=Config.ADMISSION_MAX_QUEUE,
+        max_wait_seconds=Config.ADMISSION_MAX_WAIT_SECONDS
+    )
+
+    def one(user_id):
+        started = time.perf_counter()
+        decision = admission.acquire(user_id, "free")
+        if not decision['admitted']:
+            return f"shed_{decision['status_code']}", time.perf_counter() - started
+        try:
+            questions, status = ai_service.generate_questions(NOTES, 6, "mcq", "normal", user_id)
+        finally:
+            admission.release(decision['ticket'])
+        return ("ok" if questions else status), time.perf_counter() - started
+
+    return [gevent.spawn(one, i) for i in range(args.requests)]
+
+
+def run_http(args, groq_url):
+    """The full app under a single gevent gunicorn worker"""
+    port = args.port
+    env = dict(os.environ, GUNICORN_WORKER_CLASS="gevent", WEB_CONCURRENCY="1", GROQ_API_KEY="standin",
+               GROQ_BASE_URL=groq_url, HOST="127.0.0.1", PORT=str(port), GUNICORN_LOG_LEVEL="warning")
+    log = open(os.path.join(ROOT, "logs", "bench-concurrency.log"), "w")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], cwd=ROOT, env=env,
+                              stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(base_url + "/", timeout=1)
+            break
+        except requests.RequestException:
+            if server.poll() is not None:
+                raise SystemExit(f"gunicorn exited during startup (see {log.name})")
+            time.sleep(0.2)
+
+    # Log everyone in first (bounded) so the generation burst is what gets measured
+    run_id = uuid.uuid4().hex[:8]
+    sessions = [requests.Session() for _ in range(args.requests)]
+    Pool(100).map(lambda i: sessions[i].post(base_url + "/auth/login",
+                                             json={"email": f"load-{run_id}-{i}@example.com"}, timeout=60),
+                  range(args.requests))
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            response = sessions[i].post(base_url + "/generate_questions",
+                                        json={"notes": NOTES, "num_questions": 6}, timeout=120)
+            outcome = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - started
+
+    greenlets = [gevent.spawn(one, i) for i in range(args.requests)]
+    return greenlets, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['service', 'http'], default='service')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=2000)
+    parser.add_argument('--threads', type=int, default=12, help="thread-per-request capacity to compare against")
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--groq-port', type=int, default=8099)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(ROOT, "logs"), exist_ok=True)
+    standin, groq_url = start_groq_standin(args.groq_port, args.latency_ms)
+    server = None
+    try:
+        began = time.perf_counter()
+        if args.target == 'service':
+            greenlets = run_service(args, groq_url)
+        else:
+            greenlets, server = run_http(args, groq_url)
+            began = time.perf_counter()
+        gevent.joinall(greenlets)
+        finished = time.perf_counter()
+        stats = requests.get(groq_url + "/stats", timeout=5).json()
+    finally:
+        if server:
+            stop(server)
+        stop(standin)
+
+    outcomes = {}
+    latencies = []
+    for greenlet in greenlets:
+        outcome, elapsed = greenlet.value
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if outcome == "ok":
+            latencies.append(elapsed)
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+    thread_bound = math.ceil(args.requests / args.threads) * args.latency_ms / 1000
+    print(f"target:            {args.target} (gevent, one process)")
+    print(f"generations:       {args.requests} started together, Groq latency {args.latency_ms:.0f} ms")
+    print(f"outcomes:          {outcomes}")
+    print(f"peak in flight:    {stats['peak_in_flight']} at Groq ({stats['requests']} completions)")
+    print(f"wall time:         {finished - began:.1f} s (p50 {pick(0.5):.1f} s, p95 {pick(0.95):.1f} s)")
+    print(f"thread-per-request bound with {args.threads} threads: >= {thread_bound:.0f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+How each Database query method and data-backed endpoint scales with table
+size and with how many sessions a user has.
+
+The database (a throwaway mysql:8.0 container by default, or DB_* with
+--mysql env) is grown with benchmarks/seed.py through each --scales level
+(total studycards rows). At each level every operation is timed for a typical
+user (20 sessions): the Database methods called directly, and the endpoints
+through Flask's test client (no HTTP, so routing, queries and JSON encoding
+are all that is measured). After the largest level, probe users with
+--user-sessions sessions each are added and the per-user operations are timed
+for each of them.
+
+Each operation is run once to warm up, then --repeat times within a
+--budget-seconds limit. The median, and the growth exponent between the
+smallest and largest level, are reported: about 0 means the cost does not
+depend on that dimension (an index lookup), about 1 means it grows linearly
+(a scan). Results go to benchmarks/results/data-layer-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.data_layer [--scales 1000,100000,10000000]
+                                    [--user-sessions 10,500,5000] [--repeat 5]
+                                    [--mysql docker|env]
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, write_results
+
+TYPICAL_SESSIONS = 20
+SAVE_CARDS = 10
+
+
+def database_operations(ctx):
+    """(name, callable) for each Database method, bound to the probe user in ctx"""
+    db = ctx['db']
+    return [
+        ("db.get_sessions", lambda: db.get_sessions(ctx['user_id'])),
+        ("db.get_user_sessions_with_analytics", lambda: db.get_user_sessions_with_analytics(ctx['user_id'])),
+        ("db.get_sessions_for_chart", lambda: db.get_sessions_for_chart(ctx['user_id'], 10)),
+        ("db.get_flashcards_by_session", lambda: db.get_flashcards_by_session(ctx['session_ids'][0])),
+        ("db.get_analytics_type_difficulty", lambda: db.get_analytics_type_difficulty(ctx['user_id'])),
+        ("db.get_user_tier_info", lambda: db.get_user_tier_info(ctx['user_id'])),
+        ("db.get_daily_stats (90 days)", lambda: db.get_daily_stats(
+            ctx['user_id'], date.today() - timedelta(days=89), date.today())),
+        ("db.get_or_create_user", lambda: db.get_or_create_user(ctx['email'])),
+        (f"db.save_flashcards+delete_session ({SAVE_CARDS} cards)", lambda: save_and_delete(ctx)),
+    ]
+
+
+def endpoint_operations(ctx):
+    client = ctx['client']
+    session_service = ctx['app'].session_service
+    return [
+        ("GET /get_sessions", lambda: client.get("/get_sessions")),
+        ("GET /list_sessions", lambda: client.get("/list_sessions")),
+        ("GET /analytics/type-difficulty", lambda: client.get("/analytics/type-difficulty")),
+        ("POST /analytics/type-difficulty-filtered",
+         lambda: client.post("/analytics/type-difficulty-filtered", json={"session_ids": ctx['session_ids'][:50]})),
+        # SessionService caches the session list for 60s; measure the uncached path
+        ("GET /analytics/progress-data", lambda: (session_service.cache.clear(), client.get("/analytics/progress-data"))),
+        ("GET /analytics/chart-data", lambda: client.get("/analytics/chart-data?limit=10")),
+        ("GET /user/tier-info", lambda: client.get("/user/tier-info")),
+        ("GET /analytics/daily (90 days)", lambda: client.get(
+            f"/analytics/daily?from={date.today() - timedelta(days=89)}&to={date.today()}")),
+        ("GET /analytics/streaks", lambda: client.get("/analytics/streaks")),
+        ("GET /analytics/week-over-week", lambda: client.get("/analytics/week-over-week")),
+    ]
+
+
+def save_and_delete(ctx):
+    db = ctx['db']
+    session_id = db.execute_query(
+        "INSERT INTO study_sessions (title, notes, user_id, session_duration) VALUES (%s, %s, %s, %s)",
+        ("Benchmark session", "Benchmark notes", ctx['user_id'], 60))
+    cards = [{"question": f"Benchmark question {i}?", "options": ["A", "B", "C", "D"], "correctAnswer": i % 4,
+              "userAnswer": 0, "questionType": "mcq", "difficulty": "normal"} for i in range(SAVE_CARDS)]
+    db.save_flashcards(session_id, cards)
+    db.delete_session(session_id)
+
+
+def probe(app, db, email, sessions):
+    """A seeded user with a logged-in test client"""
+    from benchmarks.seed import seed_user
+    user_id = seed_user(db, email, sessions)
+    rows = db.fetch_all("SELECT id FROM study_sessions WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_email'] = email
+    return {"app": app, "db": db, "client": client, "user_id": user_id, "email": email,
+            "session_ids": [row['id'] for row in rows]}
+
+
+def measure(operations, repeat, budget):
+    results = {}
+    for name, operation in operations:
+        operation()
+        samples = []
+        deadline = time.perf_counter() + budget
+        while len(samples) < repeat and (not samples or time.perf_counter() < deadline):
+            started = time.perf_counter()
+            response = operation()
+            samples.append((time.perf_counter() - started) * 1000)
+            if isinstance(response, tuple):
+                response = response[-1]
+            if getattr(response, 'status_code', 200) >= 400:
+                raise SystemExit(f"{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        results[name] = {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2),
+                         "runs": len(samples)}
+    return results
+
+
+def growth(points):
+    """Slope of log(time) against log(size) between the first and last point"""
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    if x1 == x0 or y0 <= 0 or y1 <= 0:
+        return None
+    return round(math.log(y1 / y0) / math.log(x1 / x0), 2)
+
+
+def print_curve(title, levels):
+    names = list(levels[0]['operations'])
+    header = "".join(f"{short(level['size']):>12}" for level in levels)
+    print(f"\n{title}\n  {'operation (median ms)':<52}{header}{'growth':>8}")
+    for name in names:
+        medians = [level['operations'][name]['median_ms'] for level in levels]
+        exponent = growth([(level['size'], m) for level, m in zip(levels, medians)])
+        cells = "".join(f"{m:>12.2f}" for m in medians)
+        print(f"  {name:<52}{cells}{exponent if exponent is not None else '-':>8}")
+
+
+def short(n):
+    for unit, scale in (("M", 1_000_000), ("k", 1_000)):
+        if n >= scale:
+            return f"{n / scale:g}{unit}"
+    return str(n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default="1000,100000,10000000", help="studycards rows at each level")
+    parser.add_argument('--user-sessions', default="10,500,5000", help="sessions for each per-user probe")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-seconds', type=float, default=20, help="stop repeating an operation after this")
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "data_layer")
+    args = parser.parse_args()
+    scales = sorted(int(s) for s in args.scales.split(","))
+    user_sessions = sorted(int(s) for s in args.user_sessions.split(","))
+
+
+    with benchmark_app(args, "data_layer") as app:
+        from benchmarks.seed import seed, table_counts
+        db = app.db
+
+        typical = probe(app, db, f"typical-{args.seed}@probe.reviseai.test", TYPICAL_SESSIONS)
+        table_levels = []
+        for size in scales:
+            started = time.monotonic()
+            seed(db, size, args.seed)
+            seeded_s = time.monotonic() - started
+            counts = table_counts(db)
+            print(f"\n{short(size)} cards: {counts['users']:,} users, {counts['study_sessions']:,} sessions, "
+                  f"{counts['studycards']:,} cards (seeded in {seeded_s:.0f}s)", flush=True)
+            operations = measure(database_operations(typical) + endpoint_operations(typical),
+                                 args.repeat, args.budget_seconds)
+            table_levels.append({"size": size, "tables": counts, "seed_seconds": round(seeded_s, 1),
+                                 "operations": operations})
+
+        user_levels = []
+        for sessions in user_sessions:
+            user = probe(app, db, f"probe-{sessions}-{args.seed}@probe.reviseai.test", sessions)
+            operations = measure(database_operations(user) + endpoint_operations(user),
+                                 args.repeat, args.budget_seconds)
+            user_levels.append({"size": sessions, "cards": db.fetch_one(
+                "SELECT COUNT(*) AS n FROM studycards c JOIN study_sessions s ON s.id = c.session_id "
+                "WHERE s.user_id = %s", (user['user_id'],))['n'], "operations": operations})
+
+    print_curve(f"Table size (studycards rows), typical user with {TYPICAL_SESSIONS} sessions", table_levels)
+    print_curve(f"Sessions per user, at {short(scales[-1])} cards", user_levels)
+
+    write_results("data_layer", args, table_scaling=table_levels, user_scaling=user_levels)
+
+
+if __name__ == '__main__':
+    main()
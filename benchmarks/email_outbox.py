@@ -0,0 +1,160 @@
+"""
+Delivers a burst of contact-form emails through a local SMTP stand-in and
+compares the old thread-and-connection-per-message sender with the outbox
+sender pool in services/email_service.py.
+
+The outbox runs on an in-memory table with the same methods Database exposes,
+so no MySQL is needed. The stand-in can reject the first messages with a
+transient 451 to exercise retry with backoff. The script exits non-zero if any
+message is not delivered.
+
+Usage:
+    python -m benchmarks.email_outbox [--messages 200] [--workers 2]
+                                      [--connect-delay-ms 50] [--fail-first 5]
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+from benchmarks.standins import SMTPStandIn
+from services.email_service import EmailService
+
+
+class MemoryOutbox:
+    """In-memory stand-in for the email_outbox methods of models.Database"""
+
+    def __init__(self):
+        self.rows = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def enqueue_email(self, subject, sender, recipients, body, reply_to=None):
+        with self.lock:
+            email_id = next(self.ids)
+            self.rows[email_id] = {"id": email_id, "subject": subject, "sender": sender,
+                                   "recipients": recipients, "body": body, "reply_to": reply_to,
+                                   "status": "pending", "attempts": 0, "due": 0.0}
+            return email_id
+
+    def claim_outbox_batch(self, claim_token, limit, stale_minutes=10):
+        now = time.monotonic()
+        with self.lock:
+            due = [r for r in self.rows.values() if r['status'] == 'pending' and r['due'] <= now][:limit]
+            for row in due:
+                row['status'] = 'sending'
+            return [dict(r) for r in due]
+
+    def mark_email_sent(self, email_id):
+        with self.lock:
+            self.rows[email_id]['status'] = 'sent'
+            self.rows[email_id]['attempts'] += 1
+
+    def mark_email_failed(self, email_id, error, retry_in_seconds=None):
+        with self.lock:
+            row = self.rows[email_id]
+            row['attempts'] += 1
+            if retry_in_seconds is None:
+                row['status'] = 'failed'
+            else:
+                row['status'] = 'pending'
+                row['due'] = time.monotonic() + retry_in_seconds
+
+    def get_outbox_stats(self):
+        with self.lock:
+            stats = {}
+            for row in self.rows.values():
+                stats[row['status']] = stats.get(row['status'], 0) + 1
+            return stats
+
+
+def make_app(standin):
+    app = Flask(__name__)
+    app.config.update(MAIL_SERVER=standin.host, MAIL_PORT=standin.port, MAIL_USE_TLS=False,
+                      MAIL_DEFAULT_SENDER='noreply@example.com')
+    return app, Mail(app)
+
+
+def run_legacy(args):
+    """The previous EmailService.send_async: one thread and one SMTP connection per message"""
+    standin = SMTPStandIn(connect_delay_ms=args.connect_delay_ms).start()
+    app, mail = make_app(standin)
+    threads = []
+    started = time.perf_counter()
+
+    def send(i):
+        with app.app_context():
+            try:
+                mail.send(Message(subject=f"Contact {i}", recipients=['inbox@example.com'], body='Hello'))
+            except Exception:
+                pass
+
+    for i in range(args.messages):
+        thread = threading.Thread(target=send, args=(i,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    counts = dict(standin.counts)
+    standin.stop()
+    return {"elapsed_s": elapsed, "threads": len(threads), **counts}
+
+
+def run_outbox(args):
+    standin = SMTPStandIn(connect_delay_ms=args.connect_delay_ms, fail_first=args.fail_first).start()
+    app, mail = make_app(standin)
+    outbox = MemoryOutbox()
+    service = EmailService(mail, 'noreply@example.com', outbox=outbox, workers=args.workers,
+                           poll_seconds=0.05)
+    service.BASE_RETRY_SECONDS = 0.05
+    service.start(app)
+
+    started = time.perf_counter()
+    for i in range(args.messages):
+        service.send_async(f"Contact {i}", ['inbox@example.com'], 'Hello')
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if outbox.get_outbox_stats().get('sent', 0) + outbox.get_outbox_stats().get('failed', 0) >= args.messages:
+            break
+        time.sleep(0.01)
+
+    elapsed = time.perf_counter() - started
+    counts = dict(standin.counts)
+    stats = service.stats()
+    standin.stop()
+    return {"elapsed_s": elapsed, "threads": args.workers, **counts, "outbox": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--connect-delay-ms', type=float, default=50)
+    parser.add_argument('--fail-first', type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = run_legacy(args)
+    outbox = run_outbox(args)
+
+    print(f"{'sender':<10}{'messages':>10}{'threads':>10}{'connections':>13}{'elapsed s':>11}{'msg/s':>9}")
+    for name, result in (("legacy", legacy), ("outbox", outbox)):
+        print(f"{name:<10}{result['messages']:>10}{result['threads']:>10}{result['connections']:>13}"
+              f"{result['elapsed_s']:>11.2f}{result['messages'] / result['elapsed_s']:>9.0f}")
+    print(f"outbox stats: {outbox['outbox']}")
+
+    if outbox['messages'] != args.messages:
+        raise SystemExit(f"outbox delivered {outbox['messages']} of {args.messages} messages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+POST /analytics/type-difficulty-filtered with large session selections: the
+old unscoped IN list and two GROUP BYs against the user-scoped single pass,
+with the selection inlined or joined through a temporary table.
+
+A probe user with --sessions sessions (benchmarks/seed.py) is created after
+the tables are grown to --cards studycards rows, so other users' cards are
+there to be scanned. Both run in a throwaway mysql:8.0 container by default,
+or in the database in DB_* with --mysql env. For each --selections size the
+user's newest N sessions are selected, and each variant is timed --repeat
+times (median and min):
+
+  legacy    the endpoint as it was: IN (...) over studycards, once per grouping,
+            not restricted to the user's sessions
+  inline    Database.get_filtered_breakdown with the ids in an IN list
+  temporary Database.get_filtered_breakdown through the selected_sessions table
+  endpoint  the POST itself, which inlines up to Database.FILTER_INLINE_IDS ids
+
+A date-range-only request (the analytics page's "All sessions" filter) is
+timed as well. Each selection also gets --foreign other users' session ids
+mixed in: legacy counts their cards, the scoped variants must not. Results go
+to benchmarks/results/filtered-analytics-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.filtered_analytics [--sessions 10000] [--selections 100,1000,10000]
+                                            [--cards 1000000] [--mysql docker|env]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, timed, write_results
+
+VARIANTS = ("legacy", "inline", "temporary", "endpoint")
+
+
+def legacy_breakdown(db, session_ids):
+    """The old endpoint's queries: an unscoped IN list, one GROUP BY per grouping"""
+    placeholders = ','.join(['%s'] * len(session_ids))
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        result = {}
+        for key, column in (("question_types", "question_type"), ("difficulties", "difficulty")):
+            cursor.execute(f"""
+                SELECT {column}, COUNT(*) as total_questions,
+                       SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END) as correct_answers
+                FROM studycards
+                WHERE session_id IN ({placeholders})
+                GROUP BY {column}
+            """, session_ids)
+            result[key] = cursor.fetchall()
+        return result
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def total_questions(breakdown):
+    return sum(int(row['total_questions']) for row in breakdown['question_types'])
+
+
+def run_selection(ctx, session_ids, repeat):
+    db, client, user_id = ctx['db'], ctx['client'], ctx['user_id']
+
+    def endpoint():
+        response = client.post("/analytics/type-difficulty-filtered", json={"session_ids": session_ids})
+        if response.status_code != 200:
+            raise SystemExit(f"endpoint returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()['data']
+
+    operations = {
+        "legacy": lambda: legacy_breakdown(db, session_ids),
+        "inline": lambda: db.get_filtered_breakdown(user_id, session_ids=session_ids, inline_limit=len(session_ids)),
+        "temporary": lambda: db.get_filtered_breakdown(user_id, session_ids=session_ids, inline_limit=0),
+        "endpoint": endpoint,
+    }
+    results = {}
+    for variant in VARIANTS:
+        timing, breakdown = timed(operations[variant], repeat)
+        results[variant] = {**timing, "questions": total_questions(breakdown)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10000, help="sessions for the probe user")
+    parser.add_argument('--selections', default="100,1000,10000", help="selected session counts")
+    parser.add_argument('--cards', type=int, default=1000000, help="studycards rows before the probe user")
+    parser.add_argument('--foreign', type=int, default=100, help="other users' session ids mixed into each selection")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "filtered-analytics")
+    args = parser.parse_args()
+    selections = sorted(int(s) for s in args.selections.split(","))
+    if selections[-1] > args.sessions:
+        raise SystemExit("--selections can't exceed --sessions")
+
+    with benchmark_app(args, "filtered-analytics", ANALYTICS_MAX_SESSION_IDS=selections[-1] + args.foreign) as app:
+        from benchmarks.data_layer import probe
+        from benchmarks.seed import seed
+        db = app.db
+
+        print(f"Seeding to {args.cards:,} cards ...", flush=True)
+        seed(db, args.cards, args.seed)
+        ctx = probe(app, db, f"filtered-{args.sessions}-{args.seed}@probe.reviseai.test", args.sessions)
+        foreign = [row['id'] for row in db.fetch_all(
+            "SELECT id FROM study_sessions WHERE user_id <> %s ORDER BY id LIMIT %s", (ctx['user_id'], args.foreign))]
+
+        results = {}
+        for size in selections:
+            print(f"\n{size:,} selected sessions (+{len(foreign)} foreign ids)", flush=True)
+            results[str(size)] = run_selection(ctx, ctx['session_ids'][:size] + foreign, args.repeat)
+
+        since = datetime.now() - timedelta(days=90)
+        date_timing, date_breakdown = timed(
+            lambda: db.get_filtered_breakdown(ctx['user_id'], date_from=since), args.repeat)
+        date_range = {**date_timing, "questions": total_questions(date_breakdown)}
+
+    print(f"\nProbe user with {args.sessions:,} sessions at {args.cards:,} cards; median ms (questions counted)")
+    print(f"  {'selected':>10}" + "".join(f"{variant:>22}" for variant in VARIANTS))
+    for size, variants in results.items():
+        cells = "".join(f"{v['median_ms']:>12.2f} ({v['questions']:>7,})" for v in variants.values())
+        print(f"  {int(size):>10,}{cells}")
+    print(f"  last 90 days, no ids: {date_range['median_ms']:.2f} ms ({date_range['questions']:,} questions)")
+    print("\nlegacy's larger question counts are other users' cards picked up through the foreign ids")
+
+    write_results("filtered-analytics", args, inline_limit=db.FILTER_INLINE_IDS, selections=results,
+                  date_range_90_days=date_range)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Scaffolding shared by the database-backed benchmarks: the --mysql, --mysql-port
+and --output options, a MySQL database with the schema and an app to run
+against, timing of repeated operations and the results file.
+
+    parser = argparse.ArgumentParser(...)
+    add_mysql_arguments(parser, "search")
+    args = parser.parse_args()
+    with benchmark_app(args, "search") as app:
+        stats, result = timed(lambda: app.db.search_sessions(...), args.repeat)
+    write_results("search", args, queries=...)
+"""
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from benchmarks.loadtest import RESULTS_DIR, git_revision, prepare_database, start_mysql, stop_mysql
+
+
+def add_mysql_arguments(parser, name, choices=('docker', 'env'), default='docker'):
+    parser.add_argument('--mysql', choices=choices, default=default)
+    parser.add_argument('--mysql-port', type=int, default=3307)
+    parser.add_argument('--output', help=f"results file (default benchmarks/results/{results_prefix(name)}-<time>-<commit>.json)")
+
+
+@contextmanager
+def benchmark_app(args, name, **environ):
+    """create_app() on the database --mysql selects (a throwaway container, or DB_*), schema created
+
+    Yields None for --mysql none. environ entries are defaults for settings the app reads
+    at import. The container, if any, is stopped on the way out.
+    """
+    if args.mysql == 'docker':
+        print(f"Starting MySQL on 127.0.0.1:{args.mysql_port} ...", flush=True)
+        os.environ.update(start_mysql(args.mysql_port))
+    elif args.mysql == 'env' and not os.environ.get('DB_HOST'):
+        raise SystemExit("--mysql env needs DB_HOST, DB_USER, DB_PASSWORD and DB_NAME")
+    os.environ.setdefault('SECRET_KEY', f"{results_prefix(name)}-benchmark")
+    for key, value in environ.items():
+        os.environ.setdefault(key, str(value))
+
+    try:
+        if args.mysql == 'none':
+            yield None
+            return
+        prepare_database(dict(os.environ))
+        # Config reads DB_* at import, so the app is only imported once they are set
+        from app import create_app
+        yield create_app(start_workers=False)
+    finally:
+        if args.mysql == 'docker':
+            stop_mysql()
+
+
+def timed(operation, repeat):
+    """Run operation once to warm up, then repeat times: ({median_ms, min_ms}, the last result)"""
+    result = operation()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = operation()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2)}, result
+
+
+def results_prefix(name):
+    return name.replace('_', '-')
+
+
+def write_results(name, args, **sections):
+    """Write the run's git revision, settings and sections to --output or benchmarks/results/"""
+    result = {
+        "benchmark": name,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "git": git_revision(),
+        "settings": {k: v for k, v in vars(args).items() if k != 'output'},
+        **sections,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{results_prefix(name)}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-"
+                     f"{(result['git']['commit'] or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"\nResults written to {os.path.relpath(output)}")
+    return result
@@ -0,0 +1,359 @@
+"""
+End-to-end load test of the real user journey, with per-route latency at
+increasing concurrency, saved as JSON for comparison between commits.
+
+Everything runs locally:
+  MySQL   a throwaway mysql:8.0 container on --mysql-port with its data on tmpfs
+          (--mysql docker, the default), or whatever DB_* point at (--mysql env).
+          The schema is created with init_db.py either way.
+  Groq    benchmarks/standins.py with --groq-latency-ms and a seeded
+          --groq-error-rate of --groq-error-status failures.
+  App     gunicorn -c gunicorn.conf.py, with --workers and --worker-class.
+
+Each virtual user repeats the journey
+    POST /auth/login, GET /user/tier-info, POST /generate_questions,
+    POST /save_flashcards, GET /get_sessions, then the analytics endpoints
+for --duration seconds at each --concurrency level, logging in as a fresh user
+every JOURNEYS_PER_USER journeys to stay under the daily session limit. The
+script prints throughput and p50/p95/p99 per route and level, and writes the
+results, git commit and settings to benchmarks/results/ (or --output).
+
+--compare BASELINE.json prints the p95 change per route and level against an
+earlier run. --max-regression PCT exits non-zero if any p95 grew by more than
+PCT percent, so a CI job can gate on it.
+
+Usage:
+    python -m benchmarks.loadtest [--concurrency 1,4,16,32] [--duration 30]
+                                  [--groq-latency-ms 800] [--groq-error-rate 0.02]
+                                  [--mysql docker|env] [--compare benchmarks/results/<run>.json]
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# SessionService.DAILY_LIMIT is 10 generations per user per day
+JOURNEYS_PER_USER = 10
+
+MYSQL_CONTAINER = "reviseai-loadtest-db"
+MYSQL_ENV = {"DB_HOST": "127.0.0.1", "DB_USER": "reviseai", "DB_PASSWORD": "loadtest", "DB_NAME": "reviseai_loadtest"}
+
+NOTES = ("Photosynthesis converts light energy into chemical energy in the chloroplasts. "
+         "Chlorophyll absorbs red and blue light and reflects green. The light-dependent reactions "
+         "split water and release oxygen; the Calvin cycle fixes carbon dioxide into glucose.")
+
+ROUTES = [
+    "POST /auth/login",
+    "GET /user/tier-info",
+    "POST /generate_questions",
+    "POST /save_flashcards",
+    "GET /get_sessions",
+    "GET /analytics/type-difficulty",
+    "POST /analytics/type-difficulty-filtered",
+    "GET /analytics/progress-data",
+    "GET /analytics/chart-data",
+]
+
+
+class Recorder:
+    """Latency samples and failures per route, shared by the virtual users of one level"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {route: [] for route in ROUTES}
+        self.failures = {route: {} for route in ROUTES}
+        self.journeys = 0
+
+    def timed(self, http, route, url, **kwargs):
+        method = route.split(" ", 1)[0]
+        started = time.perf_counter()
+        try:
+            response = http.request(method, url, timeout=120, **kwargs)
+            outcome = None if response.status_code < 400 else str(response.status_code)
+        except requests.RequestException as e:
+            response, outcome = None, type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.samples[route].append(elapsed_ms)
+            if outcome:
+                self.failures[route][outcome] = self.failures[route].get(outcome, 0) + 1
+        return response if outcome is None else None
+
+
+def journey(base_url, http, recorder, email):
+    """One pass through the app as a user would click through it"""
+    call = lambda route, path, **kwargs: recorder.timed(http, route, base_url + path, **kwargs)
+
+    if call("POST /auth/login", "/auth/login", json={"email": email}) is None:
+        return
+    call("GET /user/tier-info", "/user/tier-info")
+
+    started_at = datetime.now(timezone.utc)
+    generated = call("POST /generate_questions", "/generate_questions",
+                     json={"notes": NOTES, "num_questions": 6, "question_type": "mcq"})
+    questions = (generated.json().get('questions') if generated is not None else None) or []
+    if questions:
+        flashcards = [dict(q, userAnswer=i % 4, questionType="mcq", difficulty="normal")
+                      for i, q in enumerate(questions)]
+        call("POST /save_flashcards", "/save_flashcards", json={
+            "flashcards": flashcards,
+            "notes": NOTES,
+            "session_start_time": started_at.isoformat(),
+            "session_end_time": datetime.now(timezone.utc).isoformat(),
+            "session_duration": 60000
+        })
+
+    sessions = call("GET /get_sessions", "/get_sessions")
+    session_ids = [s['id'] for s in (sessions.json().get('sessions') or [])][:5] if sessions is not None else []
+    call("GET /analytics/type-difficulty", "/analytics/type-difficulty")
+    call("POST /analytics/type-difficulty-filtered", "/analytics/type-difficulty-filtered",
+         json={"session_ids": session_ids})
+    call("GET /analytics/progress-data", "/analytics/progress-data")
+    call("GET /analytics/chart-data", "/analytics/chart-data?limit=10")
+    with recorder.lock:
+        recorder.journeys += 1
+
+
+def virtual_user(base_url, run_id, index, stop_at, recorder):
+    http = requests.Session()
+    n = 0
+    while time.monotonic() < stop_at:
+        if n % JOURNEYS_PER_USER == 0:
+            http = requests.Session()
+            email = f"load-{run_id}-{index}-{n // JOURNEYS_PER_USER}@example.com"
+        journey(base_url, http, recorder, email)
+        n += 1
+
+
+def run_level(base_url, run_id, concurrency, duration):
+    recorder = Recorder()
+    started = time.monotonic()
+    stop_at = started + duration
+    users = [threading.Thread(target=virtual_user, args=(base_url, f"{run_id}-c{concurrency}", i, stop_at, recorder))
+             for i in range(concurrency)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.monotonic() - started
+
+    routes = {}
+    for route in ROUTES:
+        latencies = sorted(recorder.samples[route])
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1) if latencies else None
+        routes[route] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "failures": recorder.failures[route],
+            "p50_ms": pick(0.50),
+            "p95_ms": pick(0.95),
+            "p99_ms": pick(0.99),
+            "max_ms": round(latencies[-1], 1) if latencies else None
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "journeys": recorder.journeys,
+        "journeys_per_s": round(recorder.journeys / elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 2),
+        "failures": sum(sum(r["failures"].values()) for r in routes.values()),
+        "routes": routes
+    }
+
+
+def start_mysql(port):
+    subprocess.run(["docker", "rm", "-f", MYSQL_CONTAINER], capture_output=True)
+    subprocess.run([
+        "docker", "run", "-d", "--rm", "--name", MYSQL_CONTAINER,
+        "-p", f"127.0.0.1:{port}:3306", "--tmpfs", "/var/lib/mysql",
+        "-e", "MYSQL_ROOT_PASSWORD=loadtest", "-e", f"MYSQL_DATABASE={MYSQL_ENV['DB_NAME']}",
+        "-e", f"MYSQL_USER={MYSQL_ENV['DB_USER']}", "-e", f"MYSQL_PASSWORD={MYSQL_ENV['DB_PASSWORD']}",
+        "mysql:8.0"
+    ], check=True, stdout=subprocess.DEVNULL)
+    return dict(MYSQL_ENV, DB_PORT=str(port))
+
+
+def stop_mysql():
+    subprocess.run(["docker", "stop", MYSQL_CONTAINER], capture_output=True)
+
+
+def prepare_database(env):
+    for script in ("wait_for_db.py", "init_db.py"):
+        result = subprocess.run([sys.executable, script], cwd=ROOT, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise SystemExit(f"{script} failed:\n{result.stdout}{result.stderr}")
+
+
+def start_process(command, env, log, ready_url, name):
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{name} exited during startup (see {log.name})")
+        try:
+            requests.get(ready_url, timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.25)
+    stop_process(process)
+    raise SystemExit(f"{name} did not start within 60s (see {log.name})")
+
+
+def stop_process(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def git_revision():
+    run = lambda *cmd: subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": run("rev-parse", "HEAD") or None, "subject": run("log", "-1", "--format=%s") or None,
+            "dirty": bool(run("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['journeys']} journeys ({level['journeys_per_s']}/s), "
+          f"{level['requests']} requests ({level['rps']}/s), {level['failures']} failed")
+    print(f"  {'route':<42}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  failures")
+    for route, stats in level['routes'].items():
+        if not stats['requests']:
+            continue
+        failures = ", ".join(f"{k}x{v}" for k, v in stats['failures'].items()) or "-"
+        print(f"  {route:<42}{stats['rps']:>8.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+              f"{stats['p99_ms']:>9.1f}  {failures}")
+
+
+def compare(result, baseline_path, max_regression):
+    """Print p95 changes against a baseline run; returns the routes that regressed past the limit"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {level['concurrency']: level for level in baseline['levels']}
+    print(f"\np95 vs {os.path.basename(baseline_path)} ({(baseline['git']['commit'] or '?')[:10]})")
+    regressions = []
+    for level in result['levels']:
+        old = before.get(level['concurrency'])
+        if not old:
+            continue
+        for route, stats in level['routes'].items():
+            old_p95 = old['routes'].get(route, {}).get('p95_ms')
+            if not old_p95 or not stats['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - old_p95) / old_p95 * 100
+            flag = ""
+            if max_regression is not None and change > max_regression:
+                flag = "  REGRESSION"
+                regressions.append((level['concurrency'], route, change))
+            print(f"  c={level['concurrency']:<4}{route:<42}{old_p95:>9.1f} -> {stats['p95_ms']:>9.1f} ms"
+                  f"  {change:+6.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default="1,4,16,32", help="comma-separated virtual-user counts")
+    parser.add_argument('--duration', type=float, default=30, help="seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=5, help="seconds of unrecorded traffic first")
+    parser.add_argument('--groq-latency-ms', type=float, default=800)
+    parser.add_argument('--groq-error-rate', type=float, default=0.0)
+    parser.add_argument('--groq-error-status', type=int, default=500)
+    parser.add_argument('--mysql', choices=['docker', 'env'], default='docker')
+    parser.add_argument('--mysql-port', type=int, default=3307)
+    parser.add_argument('--workers', type=int, default=2, help="WEB_CONCURRENCY for gunicorn")
+    parser.add_argument('--worker-class', choices=['gthread', 'gevent'], default='gthread')
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--groq-port', type=int, default=8098)
+    parser.add_argument('--output', help="results file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare p95 against")
+    parser.add_argument('--max-regression', type=float, help="with --compare: exit 1 if any p95 grows more than this %%")
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    os.makedirs(os.path.join(ROOT, "logs"), exist_ok=True)
+    env = dict(os.environ)
+    if args.mysql == 'docker':
+        print(f"Starting MySQL on 127.0.0.1:{args.mysql_port} ...", flush=True)
+        env.update(start_mysql(args.mysql_port))
+    elif not env.get('DB_HOST'):
+        raise SystemExit("--mysql env needs DB_HOST, DB_USER, DB_PASSWORD and DB_NAME")
+
+    groq = server = None
+    try:
+        prepare_database(env)
+        groq_url = f"http://127.0.0.1:{args.groq_port}"
+        groq_log = open(os.path.join(ROOT, "logs", "loadtest-groq.log"), "w")
+        groq = start_process([sys.executable, "-m", "benchmarks.standins", "groq", "--port", str(args.groq_port),
+                              "--latency-ms", str(args.groq_latency_ms), "--error-rate", str(args.groq_error_rate),
+                              "--error-status", str(args.groq_error_status)],
+                             env, groq_log, groq_url + "/stats", "Groq stand-in")
+
+        env.update(GROQ_API_KEY="standin", GROQ_BASE_URL=groq_url, HOST="127.0.0.1", PORT=str(args.port),
+                   WEB_CONCURRENCY=str(args.workers), GUNICORN_WORKER_CLASS=args.worker_class,
+                   GUNICORN_LOG_LEVEL="warning", SECRET_KEY="loadtest",
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(ROOT, "logs", "loadtest-metrics"))
+        base_url = f"http://127.0.0.1:{args.port}"
+        server_log = open(os.path.join(ROOT, "logs", "loadtest-server.log"), "w")
+        server = start_process([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+                               env, server_log, base_url + "/", "gunicorn")
+
+        run_id = uuid.uuid4().hex[:8]
+        if args.warmup > 0:
+            run_level(base_url, f"{run_id}-warmup", min(levels), args.warmup)
+
+        result = {
+            "benchmark": "loadtest",
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "git": git_revision(),
+            "host": {"python": platform.python_version(), "platform": platform.platform(),
+                     "cpus": os.cpu_count()},
+            "settings": {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'max_regression')},
+            "levels": []
+        }
+        for concurrency in levels:
+            level = run_level(base_url, run_id, concurrency, args.duration)
+            result["levels"].append(level)
+            print_level(level)
+        result["groq"] = requests.get(groq_url + "/stats", timeout=5).json()
+    finally:
+        if server:
+            stop_process(server)
+        if groq:
+            stop_process(groq)
+        if args.mysql == 'docker':
+            stop_mysql()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{(result['git']['commit'] or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nGroq stand-in: {result['groq']['requests']} completions, {result['groq']['errors']} injected errors")
+    print(f"Results written to {os.path.relpath(output)}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed by more than {args.max_regression:g}% at p95")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+POST /auth/login throughput while new users sign up concurrently, before and
+after the login upsert and identity cache.
+
+Three phases run for each variant, through Flask's test client (one per
+thread) against a throwaway mysql:8.0 container by default, or the database
+in DB_* with --mysql env:
+
+  signup  --threads threads each log in --logins-per-thread emails never seen
+          before, so every login creates a user
+  repeat  the same emails log in again (the identity cache's case)
+  race    --threads threads log in the same brand-new email at the same
+          moment, --race-rounds times; the old SELECT/INSERT/SELECT could
+          fail the losers on the UNIQUE key
+
+Variants: "legacy" is the old get_or_create_user with no cache, "upsert" the
+new one with the identity cache cleared before each phase. Failed logins are
+counted, not retried. Results go to benchmarks/results/login-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.login [--threads 32] [--logins-per-thread 50] [--mysql docker|env]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, write_results
+
+EMAIL_DOMAIN = "login.reviseai.test"
+
+
+def legacy_get_or_create_user(db):
+    """get_or_create_user as it was: SELECT, then INSERT and SELECT again for new users"""
+    def get_or_create_user(email):
+        connection = db.get_connection()
+        if connection is None:
+            return None
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT id, email, subscription_tier FROM users WHERE email = %s", (email,))
+            user = cursor.fetchone()
+            if user:
+                return user
+            cursor.execute("INSERT INTO users (email) VALUES (%s)", (email,))
+            connection.commit()
+            cursor.execute("SELECT id, email, subscription_tier FROM users WHERE id = %s", (cursor.lastrowid,))
+            return cursor.fetchone()
+        except Exception as e:
+            print(f"  legacy login failed: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
+    return get_or_create_user
+
+
+def run_threads(app, threads, work):
+    """Run work(client, index, record) on each thread, all released together; returns (latencies, failures, seconds)"""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def record(started, response):
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                failures.append(response.status_code)
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        work(client, index, record)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return latencies, failures, time.perf_counter() - started
+
+
+def login(client, email, record):
+    started = time.perf_counter()
+    record(started, client.post("/auth/login", json={"email": email}))
+
+
+def summarize(latencies, failures, seconds):
+    ordered = sorted(latencies)
+    return {
+        "logins": len(latencies),
+        "failed": len(failures),
+        "logins_per_second": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(statistics.median(ordered), 2) if ordered else None,
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 2) if ordered else None,
+    }
+
+
+def run_variant(app, variant, args, run_id):
+    session_service = app.session_service
+    emails = [[f"{variant}-{run_id}-{t}-{i}@{EMAIL_DOMAIN}" for i in range(args.logins_per_thread)]
+              for t in range(args.threads)]
+
+    def logins(client, index, record):
+        for email in emails[index]:
+            login(client, email, record)
+
+    results = {}
+    session_service.identities.clear()
+    results["signup"] = summarize(*run_threads(app, args.threads, logins))
+    results["repeat"] = summarize(*run_threads(app, args.threads, logins))
+
+    race = {"logins": 0, "failed": 0, "distinct_users": 0}
+    for round_index in range(args.race_rounds):
+        email = f"race-{variant}-{run_id}-{round_index}@{EMAIL_DOMAIN}"
+
+        def same_email(client, index, record):
+            login(client, email, record)
+
+        latencies, failures, _ = run_threads(app, args.threads, same_email)
+        race["logins"] += len(latencies)
+        race["failed"] += len(failures)
+        race["distinct_users"] += app.db.fetch_one("SELECT COUNT(*) AS n FROM users WHERE email = %s", (email,))['n']
+    results["race"] = race
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--logins-per-thread', type=int, default=50)
+    parser.add_argument('--race-rounds', type=int, default=20)
+    add_mysql_arguments(parser, "login")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    # One pooled connection per login thread, so the pool is not what is being measured
+    with benchmark_app(args, "login", DB_POOL_SIZE=min(32, args.threads)) as app:
+        results = {}
+        for variant in ("legacy", "upsert"):
+            print(f"\n{variant}: {args.threads} threads", flush=True)
+            if variant == "legacy":
+                # The old login went straight to the database, with no identity cache
+                app.session_service.resolve_user = legacy_get_or_create_user(app.db)
+            results[variant] = run_variant(app, variant, args, run_id)
+            if variant == "legacy":
+                del app.session_service.resolve_user
+        app.db.execute_query("DELETE FROM users WHERE email LIKE %s", (f"%@{EMAIL_DOMAIN}",))
+
+    print(f"\n  {'variant':<8}{'phase':<8}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'failed':>8}")
+    for variant, phases in results.items():
+        for phase in ("signup", "repeat"):
+            r = phases[phase]
+            print(f"  {variant:<8}{phase:<8}{r['logins_per_second'] or '-':>10}{r['p50_ms'] or '-':>9}{r['p95_ms'] or '-':>9}{r['failed']:>8}")
+        race = phases["race"]
+        print(f"  {variant:<8}{'race':<8}{race['logins']:>10} ok, {race['failed']} failed, "
+              f"{race['distinct_users']} users for {args.race_rounds} emails")
+
+    write_results("login", args, variants=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Compares the legacy verbose JSON response format with the compact positional
+format requested by AIService: output tokens and end-to-end latency per
+generation.
+
+  --record  sends each sample's notes in benchmarks/data/synthetic_responses.json
+            to Groq (GROQ_API_KEY, GROQ_MODEL) in both formats, --calls times
+            each, and stores every response with its usage.completion_tokens
+            and wall time in benchmarks/data/recorded_responses.json
+  (default) reports those recordings: median completion tokens and wall time
+            per sample and format as Groq returned them, plus the parse time
+            of the recorded text, measured here
+
+Without a recording it falls back to an estimate over the synthetic responses
+(hand-written questions in the shape the model returns): tokens approximated by
+a word/punctuation regex and e2e = time to first token + tokens / generation
+rate + parse time. Those rows are marked ~ and are not measurements.
+
+Usage:
+    python -m benchmarks.output_format --record [--calls 3]
+    python -m benchmarks.output_format [--tokens-per-second 275] [--ttft-ms 150]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import git_revision
+from services.ai_service import AIService
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), 'data', 'synthetic_responses.json')
+RECORDED_FILE = os.path.join(os.path.dirname(__file__), 'data', 'recorded_responses.json')
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+LEGACY_OUTPUT_FORMAT = """OUTPUT FORMAT (JSON only, no extra text):
+{
+  "questions": [
+    {
+      "question": "Question text",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "correctAnswer": 0
+    }
+  ]
+}"""
+
+
+def count_tokens(text):
+    return len(TOKEN_RE.findall(text))
+
+
+def to_legacy(questions):
+    # Models answering the legacy prompt in JSON mode emit indented objects
+    return json.dumps({"questions": questions}, indent=2)
+
+
+def to_compact(questions, question_type):
+    if question_type == "tf":
+        items = [[q['question'], q['correctAnswer']] for q in questions]
+    else:
+        items = [[q['question'], q['options'], q['correctAnswer']] for q in questions]
+    return json.dumps({"q": items}, separators=(',', ':'))
+
+
+def parse_legacy(text):
+    return json.loads(text)['questions']
+
+
+def timed(fn, *args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def prompts(service, notes, n, qtype, difficulty):
+    """(format, prompt, max_tokens) for the legacy and compact output formats"""
+    compact_prompt = service._build_prompt(notes, n, qtype, difficulty)
+    legacy_prompt = compact_prompt.split('OUTPUT FORMAT')[0] + LEGACY_OUTPUT_FORMAT + \
+        '\n\nINPUT CONTENT:' + compact_prompt.split('INPUT CONTENT:')[1]
+    return (("legacy", legacy_prompt, 2000),
+            ("compact", compact_prompt, service._max_tokens(n, qtype, difficulty)))
+
+
+def live_call(service, prompt, max_tokens):
+    start = time.perf_counter()
+    response = service.client.chat.completions.create(
+        model=service.model,
+        max_tokens=max_tokens,
+        temperature=0.8,
+        response_format={"type": "json_object"},
+        messages=[{"role": "user", "content": prompt}]
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {"text": response.choices[0].message.content, "completion_tokens": response.usage.completion_tokens,
+            "e2e_ms": round(elapsed_ms, 1)}
+
+
+def record(service, samples, calls):
+    if not service.client:
+        raise SystemExit("--record needs GROQ_API_KEY")
+    recordings = []
+    for rec in samples:
+        qtype, difficulty, n = rec['question_type'], rec['difficulty'], len(rec['questions'])
+        entry = {"question_type": qtype, "difficulty": difficulty, "num_questions": n, "notes": rec['notes'],
+                 "calls": {}}
+        for fmt, prompt, max_tokens in prompts(service, rec['notes'], n, qtype, difficulty):
+            entry["calls"][fmt] = []
+            for i in range(calls):
+                print(f"{qtype}/{difficulty}/{n} {fmt} call {i + 1}/{calls}", flush=True)
+                entry["calls"][fmt].append(dict(live_call(service, prompt, max_tokens), max_tokens=max_tokens))
+        recordings.append(entry)
+
+    with open(RECORDED_FILE, "w") as f:
+        json.dump({
+            "description": f"Responses captured from Groq ({service.model}) by benchmarks/output_format.py --record",
+            "model": service.model,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "git": git_revision(),
+            "responses": recordings
+        }, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"Recorded {len(recordings)} samples x {calls} calls per format to {os.path.relpath(RECORDED_FILE)}")
+
+
+def report_recorded(service, recorded):
+    print(f"Recorded from {recorded['model']} at {recorded['recorded_at']}: medians of each sample's calls")
+    header = f"{'sample':<16}{'format':<9}{'tokens':>8}{'parse ms':>10}{'e2e ms':>10}{'valid':>7}{'max_tokens':>12}"
+    print(header)
+    print('-' * len(header))
+
+    totals = {"legacy": [0, 0.0], "compact": [0, 0.0]}
+    for rec in recorded['responses']:
+        qtype, difficulty, n = rec['question_type'], rec['difficulty'], rec['num_questions']
+        name = f"{qtype}/{difficulty}/{n}"
+        for fmt, calls in rec['calls'].items():
+            tokens = statistics.median(c['completion_tokens'] for c in calls)
+            e2e_ms = statistics.median(c['e2e_ms'] for c in calls)
+            # What the app would keep from each response, and the time to parse it here
+            parsed = [timed(service._process_response, c['text'], n, qtype, difficulty)
+                      if fmt == "compact" else timed(parse_legacy_safe, c['text']) for c in calls]
+            parse_ms = statistics.median(ms for _, ms in parsed)
+            valid = statistics.median(len(result[0] or []) for result, _ in parsed)
+            totals[fmt][0] += tokens
+            totals[fmt][1] += e2e_ms + parse_ms
+            print(f"{name:<16}{fmt:<9}{tokens:>8g}{parse_ms:>10.3f}{e2e_ms:>10.1f}{valid:>7g}{calls[0]['max_tokens']:>12}")
+
+    print('-' * len(header))
+    summary(totals, "output tokens (usage.completion_tokens)", "e2e (wall time + parse)")
+
+
+def report_estimated(service, samples, args):
+    print("No recorded responses: run with --record and GROQ_API_KEY to measure. "
+          "Estimates over synthetic responses follow.")
+    header = f"{'sample':<16}{'format':<9}{'~tokens':>8}{'parse ms':>10}{'~e2e ms':>10}{'max_tokens':>12}"
+    print(header)
+    print('-' * len(header))
+
+    totals = {"legacy": [0, 0.0], "compact": [0, 0.0]}
+    for rec in samples:
+        qtype, difficulty, questions = rec['question_type'], rec['difficulty'], rec['questions']
+        name = f"{qtype}/{difficulty}/{len(questions)}"
+
+        legacy_text = to_legacy(questions)
+        compact_text = to_compact(questions, qtype)
+
+        _, legacy_parse = timed(parse_legacy, legacy_text)
+        parsed, compact_parse = timed(service._process_response, compact_text, len(questions), qtype, difficulty)
+        if parsed[1] != "success" or len(parsed[0]) != len(questions):
+            raise SystemExit(f"compact parse failed for {name}: {parsed[1]}")
+
+        rows = [
+            ("legacy", legacy_text, legacy_parse, 2000),
+            ("compact", compact_text, compact_parse, service._max_tokens(len(questions), qtype, difficulty)),
+        ]
+        for fmt, text, parse_ms, max_tokens in rows:
+            tokens = count_tokens(text)
+            e2e_ms = args.ttft_ms + tokens / args.tokens_per_second * 1000 + parse_ms
+            totals[fmt][0] += tokens
+            totals[fmt][1] += e2e_ms
+            print(f"{name:<16}{fmt:<9}{tokens:>8}{parse_ms:>10.3f}{e2e_ms:>10.1f}{max_tokens:>12}")
+
+    print('-' * len(header))
+    summary(totals, "approximate output tokens", "estimated e2e (not measured)")
+
+
+def parse_legacy_safe(text):
+    try:
+        return parse_legacy(text), "success"
+    except (ValueError, KeyError, TypeError):
+        return None, "no_valid_questions"
+
+
+def summary(totals, tokens_label, e2e_label):
+    legacy_tokens, legacy_ms = totals["legacy"]
+    compact_tokens, compact_ms = totals["compact"]
+    print(f"{tokens_label}: {legacy_tokens:g} -> {compact_tokens:g} "
+          f"({(1 - compact_tokens / legacy_tokens) * 100:.1f}% fewer)")
+    print(f"{e2e_label}: {legacy_ms:.0f} ms -> {compact_ms:.0f} ms "
+          f"({(1 - compact_ms / legacy_ms) * 100:.1f}% faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', action='store_true', help="call Groq and store the responses")
+    parser.add_argument('--calls', type=int, default=3, help="calls per sample and format when recording")
+    parser.add_argument('--tokens-per-second', type=float, default=275.0, help="estimate only")
+    parser.add_argument('--ttft-ms', type=float, default=150.0, help="estimate only")
+    args = parser.parse_args()
+
+    service = AIService()
+    with open(DATA_FILE) as f:
+        samples = json.load(f)['responses']
+
+    if args.record:
+        record(service, samples, args.calls)
+    if os.path.exists(RECORDED_FILE):
+        with open(RECORDED_FILE) as f:
+            report_recorded(service, json.load(f))
+    else:
+        report_estimated(service, samples, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+CPU time and bytes on the wire for each data-backed endpoint, with Flask's
+default JSON provider and uncompressed responses (how the app used to answer)
+against FastJSONProvider with no, gzip and brotli compression.
+
+A probe user with --sessions sessions (benchmarks/seed.py) is created in a
+throwaway mysql:8.0 container by default, or in the database in DB_* with
+--mysql env. Each endpoint is called through Flask's test client --repeat
+times per variant; CPU time is this thread's (time.thread_time), so it
+covers routing, the queries' driver work, serialization and compression but
+not time spent waiting on MySQL. The "stdlib" variant also parses each
+flashcard's stored options before re-serializing them, as models.py did.
+Results go to benchmarks/results/responses-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.responses [--sessions 200] [--repeat 50] [--mysql docker|env]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, write_results
+
+# (name, JSON provider, Accept-Encoding)
+VARIANTS = [
+    ("stdlib", "stdlib", "identity"),
+    ("orjson", "fast", "identity"),
+    ("orjson+gzip", "fast", "gzip"),
+    ("orjson+br", "fast", "br, gzip"),
+]
+
+
+def stdlib_provider(app):
+    """Flask's DefaultJSONProvider, parsing RawJSON columns the way models.py used to"""
+    from flask.json.provider import DefaultJSONProvider
+    from json_provider import RawJSON
+
+    class StdlibJSONProvider(DefaultJSONProvider):
+        @staticmethod
+        def default(o):
+            if isinstance(o, RawJSON):
+                return o.load()
+            return DefaultJSONProvider.default(o)
+
+    return StdlibJSONProvider(app)
+
+
+def endpoints(ctx):
+    flashcards_session = ctx['session_ids'][0]
+    return [
+        ("GET /get_sessions", "/get_sessions"),
+        ("GET /list_sessions", "/list_sessions"),
+        ("GET /get_flashcards/<id>", f"/get_flashcards/{flashcards_session}"),
+        ("GET /analytics/progress-data", "/analytics/progress-data"),
+        ("GET /analytics/chart-data", "/analytics/chart-data?limit=50"),
+        ("GET /analytics/type-difficulty", "/analytics/type-difficulty"),
+        ("GET /user/tier-info", "/user/tier-info"),
+        ("GET / (page)", "/"),
+    ]
+
+
+def measure(ctx, path, accept_encoding, repeat):
+    client = ctx['client']
+    headers = {"Accept-Encoding": accept_encoding}
+    response = client.get(path, headers=headers)
+    if response.status_code >= 400:
+        raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    cpu, wall = [], []
+    for _ in range(repeat):
+        ctx['app'].session_service.cache.clear()
+        started_cpu, started = time.thread_time(), time.perf_counter()
+        response = client.get(path, headers=headers)
+        cpu.append((time.thread_time() - started_cpu) * 1000)
+        wall.append((time.perf_counter() - started) * 1000)
+    return {"cpu_ms": round(statistics.median(cpu), 3), "wall_ms": round(statistics.median(wall), 3),
+            "bytes": len(response.data), "encoding": response.headers.get('Content-Encoding', 'identity')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=200, help="sessions for the probe user")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "responses")
+    args = parser.parse_args()
+
+    with benchmark_app(args, "responses") as app:
+        from benchmarks.data_layer import probe
+        ctx = probe(app, app.db, f"responses-{args.sessions}-{args.seed}@probe.reviseai.test", args.sessions)
+        providers = {"fast": app.json, "stdlib": stdlib_provider(app)}
+
+        results = {}
+        for name, path in endpoints(ctx):
+            results[name] = {}
+            for variant, provider, accept_encoding in VARIANTS:
+                app.json = providers[provider]
+                results[name][variant] = measure(ctx, path, accept_encoding, args.repeat)
+            app.json = providers["fast"]
+
+    print(f"\nProbe user with {args.sessions} sessions; median of {args.repeat} calls "
+          f"(CPU ms / bytes on the wire)")
+    print(f"  {'endpoint':<32}" + "".join(f"{variant:>22}" for variant, _, _ in VARIANTS))
+    for name, variants in results.items():
+        cells = "".join(f"{v['cpu_ms']:>10.2f} / {v['bytes']:>8,}" for v in variants.values())
+        print(f"  {name:<32}{cells}")
+
+    write_results("responses", args, compression=app.compression_service.stats(), endpoints=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+The spaced-repetition queue at scale: the bulk rescheduling job over every
+seeded user, then due-card reads and review writes for one heavy user.
+
+Tables are grown to --cards studycards rows (benchmarks/seed.py) and a probe
+user with --sessions sessions is added, in a throwaway mysql:8.0 container
+by default or the database in DB_* with --mysql env. Then:
+
+  reschedule  ReviewService.reschedule over all users, --batch-users ids per
+              transaction (every seeded card gets review state here)
+  due         GET /reviews/due for the probe user, whose cards are nearly all
+              overdue: Database.get_due_cards on idx_user_due, the same query
+              with the index ignored, and the endpoint
+  answers     --answers reviews recorded with one read and one upsert
+              (ReviewService.record_answers) against one UPDATE per card
+
+Reads and writes are timed --repeat times (median and min). Results go to
+benchmarks/results/review-queue-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.review_queue [--cards 1000000] [--sessions 5000] [--mysql docker|env]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, timed, write_results
+
+
+def reschedule_all(review_service, db, batch_users):
+    bounds = db.fetch_one("SELECT MIN(id) AS first, MAX(id) AS last FROM users")
+    started = time.perf_counter()
+    scheduled, batches, slowest = 0, 0, 0.0
+    for first in range(bounds['first'], bounds['last'] + 1, batch_users):
+        batch_started = time.perf_counter()
+        result = review_service.reschedule(first, first + batch_users - 1)
+        if result is None:
+            raise SystemExit(f"reschedule failed at users {first}-{first + batch_users - 1}")
+        slowest = max(slowest, time.perf_counter() - batch_started)
+        scheduled += result[0]
+        batches += 1
+    seconds = time.perf_counter() - started
+    return {"cards_scheduled": scheduled, "batches": batches, "seconds": round(seconds, 2),
+            "cards_per_second": round(scheduled / seconds) if seconds else None,
+            "slowest_batch_ms": round(slowest * 1000, 1)}
+
+
+def due_without_index(db, user_id, limit):
+    return db.fetch_all("""
+        SELECT cr.card_id, cr.due_at, sc.question, sc.options, sc.correct_answer
+        FROM card_reviews cr IGNORE INDEX (idx_user_due)
+        JOIN studycards sc ON sc.id = cr.card_id
+        WHERE cr.user_id = %s AND cr.due_at <= NOW()
+        ORDER BY cr.due_at
+        LIMIT %s
+    """, (user_id, limit))
+
+
+def per_row_answers(db, review_service, user_id, answers):
+    """The same reviews as one SELECT and one UPDATE per card"""
+    for card_id, user_answer in answers.items():
+        row = db.fetch_one("""
+            SELECT cr.repetitions, cr.interval_days, cr.ease, cr.lapses, sc.correct_answer
+            FROM card_reviews cr JOIN studycards sc ON sc.id = cr.card_id
+            WHERE cr.card_id = %s AND cr.user_id = %s
+        """, (card_id, user_id))
+        state = review_service.next_state((row['repetitions'], row['interval_days'], row['ease'], row['lapses']),
+                                          user_answer == row['correct_answer'])
+        db.execute_query("""
+            UPDATE card_reviews SET repetitions = %s, interval_days = %s, ease = %s, lapses = %s,
+                   due_at = NOW() + INTERVAL ROUND(%s * 86400) SECOND, last_reviewed_at = NOW()
+            WHERE card_id = %s
+        """, (*state, state[1], card_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=1000000, help="studycards rows before the probe user")
+    parser.add_argument('--sessions', type=int, default=5000, help="sessions for the probe user")
+    parser.add_argument('--batch-users', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=20, help="cards per review quiz")
+    parser.add_argument('--answers', type=int, default=20, help="reviews per answer submission")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "review-queue")
+    args = parser.parse_args()
+
+    with benchmark_app(args, "review-queue") as app:
+        from benchmarks.data_layer import probe
+        from benchmarks.seed import seed
+        db, review_service = app.db, app.review_service
+
+        print(f"Seeding to {args.cards:,} cards ...", flush=True)
+        seed(db, args.cards, args.seed)
+        ctx = probe(app, db, f"reviews-{args.sessions}-{args.seed}@probe.reviseai.test", args.sessions)
+        user_id, client = ctx['user_id'], ctx['client']
+
+        print(f"Rescheduling in batches of {args.batch_users} users ...", flush=True)
+        reschedule = reschedule_all(review_service, db, args.batch_users)
+        summary = db.get_review_summary(user_id)
+
+        def endpoint():
+            response = client.get(f"/reviews/due?limit={args.limit}")
+            if response.status_code != 200:
+                raise SystemExit(f"/reviews/due returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response.get_json()
+
+        due = {}
+        due["indexed"], _ = timed(lambda: db.get_due_cards(user_id, args.limit), args.repeat)
+        due["no_index"], _ = timed(lambda: due_without_index(db, user_id, args.limit), args.repeat)
+        due["endpoint"], _ = timed(endpoint, args.repeat)
+
+        # Reviewing pushes cards out of the due range, so each run answers a fresh page of them
+        def batch():
+            return {card['card_id']: card['correct_answer'] for card in db.get_due_cards(user_id, args.answers)}
+
+        answers = {}
+        answers["bulk"], _ = timed(lambda: review_service.record_answers(user_id, batch()), args.repeat)
+        answers["per_row"], _ = timed(lambda: per_row_answers(db, review_service, user_id, batch()), args.repeat)
+
+    print(f"\nreschedule: {reschedule['cards_scheduled']:,} cards in {reschedule['batches']} batches, "
+          f"{reschedule['seconds']}s ({reschedule['cards_per_second']:,} cards/s, slowest batch "
+          f"{reschedule['slowest_batch_ms']} ms)")
+    print(f"probe user: {summary['scheduled']:,} scheduled, {int(summary['due']):,} due")
+    print(f"  {'due cards (limit ' + str(args.limit) + ')':<28}" + "".join(f"{k:>12}" for k in due))
+    print(f"  {'median ms':<28}" + "".join(f"{v['median_ms']:>12.2f}" for v in due.values()))
+    print(f"  {str(args.answers) + ' answers':<28}" + "".join(f"{k:>12}" for k in answers))
+    print(f"  {'median ms (incl. due read)':<28}" + "".join(f"{v['median_ms']:>12.2f}" for v in answers.values()))
+
+    write_results("review-queue", args, reschedule=reschedule,
+                  probe_user={"scheduled": summary['scheduled'], "due": int(summary['due'])},
+                  due=due, answers=answers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+GET /search_sessions on a large seeded corpus: the FULLTEXT-indexed search
+against LIKE '%term%' scans of the same user's notes and questions.
+
+Tables are grown to --cards studycards rows (benchmarks/seed.py) and a probe
+user with --sessions sessions is added, in a throwaway mysql:8.0 container
+by default or the database in DB_* with --mysql env. For each query in
+--queries (comma-separated; words within a query are all required) these
+are timed --repeat times (median and min):
+
+  like      sessions whose notes or questions LIKE '%word%' for every word,
+            newest first (nothing to rank by)
+  fulltext  Database.search_sessions: one page of ranked sessions
+  endpoint  the GET itself, which also fetches each result's best questions
+
+The seeded notes and questions come from a small set of sentences, so most
+words match many sessions; "zebrafish" matches none. Results go to
+benchmarks/results/search-<time>-<commit>.json.
+
+Usage:
+    python -m benchmarks.search [--cards 1000000] [--sessions 5000] [--mysql docker|env]
+"""
+import argparse
+import os
+import sys
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.harness import add_mysql_arguments, benchmark_app, timed, write_results
+
+VARIANTS = ("like", "fulltext", "endpoint")
+
+
+def like_search(db, user_id, words, limit):
+    """What search looks like without an index: every word as a LIKE over the user's notes and questions"""
+    notes = " AND ".join(["ss.notes LIKE %s"] * len(words))
+    questions = " AND ".join(["sc.question LIKE %s"] * len(words))
+    patterns = [f"%{word}%" for word in words]
+    return db.fetch_all(f"""
+        SELECT ss.id, ss.title, ss.created_at
+        FROM study_sessions ss
+        WHERE ss.user_id = %s AND (({notes}) OR EXISTS (
+            SELECT 1 FROM studycards sc WHERE sc.session_id = ss.id AND {questions}))
+        ORDER BY ss.created_at DESC
+        LIMIT %s
+    """, (user_id, *patterns, *patterns, limit))
+
+
+def run_query(ctx, text, per_page, repeat):
+    from blueprints.sessions import _fulltext_query
+    db, client, user_id = ctx['db'], ctx['client'], ctx['user_id']
+    query = _fulltext_query(text)
+
+    def endpoint():
+        response = client.get(f"/search_sessions?q={quote(text)}&per_page={per_page}")
+        if response.status_code != 200:
+            raise SystemExit(f"search returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()
+
+    results = {}
+    results["like"], rows = timed(lambda: like_search(db, user_id, text.split(), per_page), repeat)
+    results["like"]["page"] = len(rows)
+    results["fulltext"], (rows, total) = timed(lambda: db.search_sessions(user_id, query, per_page, 0), repeat)
+    results["fulltext"].update(page=len(rows), total=total)
+    results["endpoint"], body = timed(endpoint, repeat)
+    results["endpoint"]["page"] = len(body['results'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=1000000, help="studycards rows before the probe user")
+    parser.add_argument('--sessions', type=int, default=5000, help="sessions for the probe user")
+    parser.add_argument('--queries', default="mitochondria,treaty westphalia,inflation interest,zebrafish")
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    add_mysql_arguments(parser, "search")
+    args = parser.parse_args()
+    queries = [q.strip() for q in args.queries.split(",") if q.strip()]
+
+    with benchmark_app(args, "search") as app:
+        from benchmarks.data_layer import probe
+        from benchmarks.seed import seed
+        db = app.db
+
+        print(f"Seeding to {args.cards:,} cards ...", flush=True)
+        seed(db, args.cards, args.seed)
+        ctx = probe(app, db, f"search-{args.sessions}-{args.seed}@probe.reviseai.test", args.sessions)
+
+        results = {}
+        for text in queries:
+            print(f"\n\"{text}\"", flush=True)
+            results[text] = run_query(ctx, text, args.per_page, args.repeat)
+
+    print(f"\nProbe user with {args.sessions:,} sessions at {args.cards:,} cards; median ms for a page of {args.per_page}")
+    print(f"  {'query':<24}" + "".join(f"{variant:>12}" for variant in VARIANTS) + f"{'matches':>10}")
+    for text, variants in results.items():
+        cells = "".join(f"{variants[variant]['median_ms']:>12.2f}" for variant in VARIANTS)
+        print(f"  {text:<24}{cells}{variants['fulltext']['total']:>10,}")
+
+    write_results("search", args, queries=results)
+
+
+if __name__ == '__main__':
+    main()
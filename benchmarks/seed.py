@@ -0,0 +1,234 @@
+"""
+Synthetic users, study sessions and studycards at a chosen scale.
+
+Users get a heavy-tailed number of sessions (most have a handful, a few have
+thousands), sessions are spread over the past year with 5-15 cards each,
+question types and difficulties follow a 75/25 and 70/30 split, and each user
+has a skill level that, with difficulty, drives how many answers are correct.
+Rows are written in multi-row batches with explicit ids, so tens of millions of
+cards take minutes rather than hours. The same --seed always gives the same
+data.
+
+Seeding grows the tables: it adds users until studycards holds at least
+--cards rows, so successive runs (or benchmark levels) build on each other.
+--user adds one probe user with exactly N sessions, e.g. a power user.
+
+Usage (DB_* must point at a database prepared with init_db.py):
+    python -m benchmarks.seed --cards 100000
+    python -m benchmarks.seed --user power@example.com --sessions 5000
+    python -m benchmarks.seed --reset
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED_DOMAIN = "seed.reviseai.test"
+BATCH_ROWS = 2000
+
+TOPICS = {
+    "biology": ["Photosynthesis converts light energy into chemical energy in the chloroplasts.",
+                "Mitochondria produce ATP through oxidative phosphorylation.",
+                "DNA replication is semi-conservative and proceeds 5' to 3'.",
+                "Enzymes lower the activation energy of reactions without being consumed."],
+    "history": ["The Treaty of Westphalia in 1648 ended the Thirty Years' War.",
+                "The printing press spread literacy across Europe in the fifteenth century.",
+                "Decolonisation reshaped Africa and Asia after the Second World War.",
+                "The Industrial Revolution began in Britain in the late eighteenth century."],
+    "physics": ["Newton's second law states that force equals mass times acceleration.",
+                "Energy is conserved in an isolated system.",
+                "The speed of light in a vacuum is about 300,000 kilometres per second.",
+                "Ohm's law relates voltage, current and resistance."],
+    "economics": ["Demand falls as price rises, other things being equal.",
+                  "Inflation erodes the purchasing power of money.",
+                  "Comparative advantage explains gains from trade.",
+                  "Central banks set interest rates to steer inflation."],
+}
+
+
+def connect():
+    """The app's own pool, so seeding uses the same DB_* settings and driver"""
+    from models import Database
+    db = Database()
+    if db.pool is None:
+        raise SystemExit("Database unavailable; check DB_* and run init_db.py first")
+    return db
+
+
+def table_counts(db):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        counts = {}
+        for table in ("users", "study_sessions", "studycards"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        return counts
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def seed(db, cards, rng_seed=42, mean_sessions=20, max_sessions=2000, progress=print):
+    """Add seeded users until studycards has at least `cards` rows; returns rows added"""
+    added = {"users": 0, "study_sessions": 0, "studycards": 0}
+    have = table_counts(db)["studycards"]
+    started = time.monotonic()
+    report_every = max(100000, cards // 20)
+    next_report = report_every
+    with Writer(db) as writer:
+        rng = random.Random(f"{rng_seed}-{writer.next_user_id}")
+        while have + added["studycards"] < cards:
+            # Pareto(1.5) has mean 3: scale it to mean_sessions, most users well below, a few far above
+            sessions = max(1, min(max_sessions, int(rng.paretovariate(1.5) * mean_sessions / 3)))
+            email = f"user{writer.next_user_id}@{SEED_DOMAIN}"
+            counts = writer.add_user(rng, email, sessions)
+            for key in added:
+                added[key] += counts[key]
+            if progress and added["studycards"] >= next_report:
+                progress(f"  {have + added['studycards']:,} cards ({time.monotonic() - started:.0f}s)")
+                next_report += report_every
+    return added
+
+
+def seed_user(db, email, sessions, rng_seed=42):
+    """One user with exactly `sessions` sessions (created once; reused if the email exists)"""
+    existing = db.fetch_one("SELECT id FROM users WHERE email = %s", (email,))
+    if existing:
+        return existing['id']
+    with Writer(db) as writer:
+        user_id = writer.next_user_id
+        writer.add_user(random.Random(f"{rng_seed}-{email}"), email, sessions)
+    return user_id
+
+
+def reset(db):
+    """Delete every seeded user; sessions and cards go with them (ON DELETE CASCADE)"""
+    return db.execute_query("DELETE FROM users WHERE email LIKE %s", (f"%@{SEED_DOMAIN}",))
+
+
+class Writer:
+    """Buffers rows and writes them in multi-row INSERTs with ids assigned up front
+
+    The new users' daily rollups (user_daily_stats) are built from their rows
+    on exit, since the rows bypass Database.save_flashcards.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = {"users": [], "study_sessions": [], "studycards": []}
+
+    def __enter__(self):
+        self.conn = self.db.get_connection()
+        self.cursor = self.conn.cursor()
+        # Ids are generated here and parents are always written first
+        self.cursor.execute("SET unique_checks = 0, foreign_key_checks = 0")
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users")
+        self.next_user_id = self.cursor.fetchone()[0]
+        self.first_user_id = self.next_user_id
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM study_sessions")
+        self.next_session_id = self.cursor.fetchone()[0]
+        self.now = datetime.now().replace(microsecond=0)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.cursor.close()
+            self.conn.close()
+        if exc_type is None and self.next_user_id > self.first_user_id:
+            self.db.rebuild_daily_stats(self.first_user_id, self.next_user_id - 1)
+
+    def add_user(self, rng, email, sessions):
+        user_id = self.next_user_id
+        self.next_user_id += 1
+        skill = rng.betavariate(5, 3)
+        joined = self.now - timedelta(days=rng.uniform(30, 730))
+        self.rows["users"].append((user_id, email, joined, rng.choice(("free",) * 9 + ("premium",)),
+                                   sessions))
+
+        card_count = 0
+        topic = rng.choice(list(TOPICS))
+        for _ in range(sessions):
+            session_id = self.next_session_id
+            self.next_session_id += 1
+            if rng.random() < 0.2:
+                topic = rng.choice(list(TOPICS))
+            sentences = TOPICS[topic]
+            notes = " ".join(rng.choice(sentences) for _ in range(rng.randint(8, 30)))
+            created = max(joined, self.now - timedelta(days=rng.uniform(0, 365), seconds=rng.uniform(0, 86400)))
+            duration = rng.uniform(60, 1800)
+            self.rows["study_sessions"].append((
+                session_id, f"Study Session {created.strftime('%Y-%m-%d at %H:%M')}", notes, user_id,
+                created, created + timedelta(seconds=duration), duration))
+
+            for i in range(rng.randint(5, 15)):
+                question_type = "tf" if rng.random() < 0.25 else "mcq"
+                difficulty = "difficult" if rng.random() < 0.3 else "normal"
+                options = ["True", "False"] if question_type == "tf" else [
+                    f"{topic.title()} option {k + 1} for item {i + 1}" for k in range(4)]
+                correct = rng.randrange(len(options))
+                p_correct = skill - (0.15 if difficulty == "difficult" else 0) + (0.1 if question_type == "tf" else 0)
+                answer = correct if rng.random() < p_correct else (correct + 1) % len(options)
+                self.rows["studycards"].append((
+                    session_id, f"{rng.choice(sentences)[:-1]}? ({topic} {i + 1})", json.dumps(options),
+                    correct, answer, answer == correct, question_type, difficulty, created))
+                card_count += 1
+
+            if len(self.rows["studycards"]) >= BATCH_ROWS:
+                self.flush()
+        return {"users": 1, "study_sessions": sessions, "studycards": card_count}
+
+    def flush(self):
+        statements = {
+            "users": "INSERT INTO users (id, email, created_at, subscription_tier, total_sessions_used) "
+                     "VALUES (%s, %s, %s, %s, %s)",
+            "study_sessions": "INSERT INTO study_sessions (id, title, notes, user_id, created_at, updated_at, "
+                              "session_duration) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            "studycards": "INSERT INTO studycards (session_id, question, options, correct_answer, user_answer, "
+                          "is_correct, question_type, difficulty, created_at) "
+                          "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        }
+        for table in ("users", "study_sessions", "studycards"):
+            rows = self.rows[table]
+            for start in range(0, len(rows), BATCH_ROWS):
+                self.cursor.executemany(statements[table], rows[start:start + BATCH_ROWS])
+            rows.clear()
+        self.conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, help="grow studycards to at least this many rows")
+    parser.add_argument('--mean-sessions', type=int, default=20, help="mean sessions per seeded user")
+    parser.add_argument('--max-sessions', type=int, default=2000, help="cap on sessions per seeded user")
+    parser.add_argument('--user', help="add one probe user with this email")
+    parser.add_argument('--sessions', type=int, default=5000, help="sessions for --user")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help="delete all seeded users and their data")
+    args = parser.parse_args()
+
+    db = connect()
+    if args.reset:
+        reset(db)
+    if args.cards:
+        started = time.monotonic()
+        added = seed(db, args.cards, args.seed, args.mean_sessions, args.max_sessions)
+        print(f"Added {added['users']:,} users, {added['study_sessions']:,} sessions and "
+              f"{added['studycards']:,} cards in {time.monotonic() - started:.1f}s")
+    if args.user:
+        user_id = seed_user(db, args.user, args.sessions, args.seed)
+        print(f"Probe user {args.user} (id {user_id}) with {args.sessions} sessions")
+    print("Table sizes: " + ", ".join(f"{table} {count:,}" for table, count in table_counts(db).items()))
+
+
+if __name__ == '__main__':
+    main()
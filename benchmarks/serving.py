@@ -0,0 +1,129 @@
+"""
+Throughput of the Werkzeug dev server (`python app.py`) vs the container's
+gunicorn configuration (`gunicorn -c gunicorn.conf.py`), on the same app and DB.
+
+Each server is started as a subprocess on --port with the current environment
+(so DB_* must point at a database prepared with `python init_db.py`). A fixed
+number of clients then loop over a mix of page, DB-backed and JSON routes for
+--duration seconds, each logged in as its own user, and the script reports
+requests/s and latency percentiles per server.
+
+Usage:
+    python -m benchmarks.serving [--server both|dev|gunicorn] [--clients 32]
+                                 [--duration 20] [--port 5055]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "dev": [sys.executable, "app.py"],
+    "gunicorn": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+}
+
+# (method, path, json body); a mix of template rendering, DB reads and in-memory JSON
+ROUTES = [
+    ("GET", "/", None),
+    ("GET", "/user/session-count", None),
+    ("GET", "/get_sessions", None),
+    ("GET", "/user/session-allowance", None),
+    ("GET", "/debug/llm-metrics", None),
+]
+
+
+def start_server(name, port, log):
+    env = dict(os.environ, PORT=str(port), HOST="127.0.0.1", DEBUG="False",
+               GUNICORN_LOG_LEVEL="warning")
+    process = subprocess.Popen(SERVERS[name], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{name} server exited during startup (see {log.name})")
+        try:
+            requests.get(base_url + "/", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.25)
+    stop_server(process)
+    raise SystemExit(f"{name} server did not start within 60s (see {log.name})")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def client(base_url, index, stop_at, latencies, errors):
+    http = requests.Session()
+    http.post(base_url + "/auth/login", json={"email": f"bench-{index}@example.com"}, timeout=30)
+    i = index
+    while time.monotonic() < stop_at:
+        method, path, body = ROUTES[i % len(ROUTES)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, json=body, timeout=60)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors.append(path)
+
+
+def run(name, args):
+    with open(os.path.join(ROOT, "logs", f"bench-{name}.log"), "w") as log:
+        process, base_url = start_server(name, args.port, log)
+        try:
+            latencies, errors = [], []
+            started = time.monotonic()
+            stop_at = started + args.duration
+            threads = [threading.Thread(target=client, args=(base_url, i, stop_at, latencies, errors))
+                       for i in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+        finally:
+            stop_server(process)
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+    return {"requests": len(latencies), "rps": len(latencies) / elapsed, "errors": len(errors),
+            "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['both', 'dev', 'gunicorn'], default='both')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(ROOT, "logs"), exist_ok=True)
+    names = ['dev', 'gunicorn'] if args.server == 'both' else [args.server]
+
+    print(f"{'server':<10}{'requests':>10}{'req/s':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in names:
+        result = run(name, args)
+        print(f"{name:<10}{result['requests']:>10}{result['rps']:>9.0f}{result['errors']:>8}"
+              f"{result['p50']:>9.1f}{result['p95']:>9.1f}{result['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
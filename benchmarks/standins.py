@@ -0,0 +1,235 @@
+"""
+Local stand-ins for external services, for benchmarks and manual testing.
+
+SMTPStandIn speaks just enough SMTP for smtplib/Flask-Mail: it counts
+connections and delivered messages, can delay each new connection to mimic a
+TLS handshake, and can reject the first N messages with a transient 451.
+
+GroqStandIn answers the Groq chat-completions endpoint with well-formed quizzes
+in the compact format after a fixed latency, and can fail a seeded random
+fraction of completions with a given HTTP status (429 or 5xx). It runs on
+asyncio so it can hold thousands of open requests, and reports request counts,
+injected errors and peak concurrency on GET /stats. Point the app at it with
+GROQ_BASE_URL=http://host:port, or run it on its own:
+
+    python -m benchmarks.standins groq --port 8099 --latency-ms 2000 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        standin = self.server.standin
+        standin._count('connections')
+        time.sleep(standin.connect_delay_ms / 1000)
+        self._reply(b"220 standin ESMTP ready")
+        
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    if standin._take_failure():
+                        self._reply(b"451 temporary failure, try again")
+                    else:
+                        standin._count('messages')
+                        self._reply(b"250 message accepted")
+                continue
+            
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.wfile.write(b"250-standin\r\n250 8BITMIME\r\n")
+            elif command in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self._reply(b"250 OK")
+            elif command == b"DATA":
+                in_data = True
+                self._reply(b"354 end data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self._reply(b"221 bye")
+                return
+            else:
+                self._reply(b"502 command not implemented")
+    
+    def _reply(self, text):
+        self.wfile.write(text + b"\r\n")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+class SMTPStandIn:
+    def __init__(self, host='127.0.0.1', port=0, connect_delay_ms=0, fail_first=0):
+        self.connect_delay_ms = connect_delay_ms
+        self.failures_left = fail_first
+        self.counts = {'connections': 0, 'messages': 0}
+        self.lock = threading.Lock()
+        self.server = _ThreadingServer((host, port), _SMTPHandler)
+        self.server.standin = self
+        self.host, self.port = self.server.server_address
+    
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+    
+    def _take_failure(self):
+        with self.lock:
+            if self.failures_left > 0:
+                self.failures_left -= 1
+                return True
+            return False
+
+
+class GroqStandIn:
+    PROMPT_RE = re.compile(r"Generate exactly (\d+) (multiple-choice|True/False)")
+    
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=1000, error_rate=0.0, error_status=500, seed=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.counts = {'requests': 0, 'errors': 0, 'in_flight': 0, 'peak_in_flight': 0}
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()
+    
+    def start(self):
+        """Serve from a background thread; returns once the port is bound"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.ready.wait()
+        return self
+    
+    def stop(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.server.close)
+    
+    def serve_forever(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096, limit=2 ** 20))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            self.loop.run_until_complete(self.server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+    
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                
+                status = 200
+                if method == 'GET' and path == '/stats':
+                    payload = dict(self.counts)
+                else:
+                    status, payload = await self._chat_completion(json.loads(body or b'{}'))
+                
+                data = json.dumps(payload).encode()
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" % (status, b"OK" if status == 200 else b"Error", len(data))
+                             + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _chat_completion(self, request):
+        counts = self.counts
+        counts['requests'] += 1
+        counts['in_flight'] += 1
+        counts['peak_in_flight'] = max(counts['peak_in_flight'], counts['in_flight'])
+        try:
+            await asyncio.sleep(self.latency_ms / 1000)
+        finally:
+            counts['in_flight'] -= 1
+        
+        if self.error_rate and self.random.random() < self.error_rate:
+            counts['errors'] += 1
+            return self.error_status, {"error": {"message": "injected by stand-in", "type": "standin_error",
+                                                 "code": str(self.error_status)}}
+        
+        prompt = request.get('messages', [{}])[-1].get('content', '')
+        match = self.PROMPT_RE.search(prompt)
+        num, kind = (int(match.group(1)), match.group(2)) if match else (6, 'multiple-choice')
+        seed = counts['requests']
+        if kind == 'True/False':
+            items = [[f"Statement {seed}-{i} about the notes holds", i % 2] for i in range(num)]
+        else:
+            items = [[f"Question {seed}-{i} about the notes?",
+                      [f"Answer {seed}-{i}-{k}" for k in range(4)], i % 4] for i in range(num)]
+        content = json.dumps({"q": items}, separators=(',', ':'))
+        
+        completion_tokens = len(content) // 4
+        return 200, {
+            "id": f"chatcmpl-standin-{seed}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'standin'),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": completion_tokens,
+                      "total_tokens": len(prompt) // 4 + completion_tokens}
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stand-in service in the foreground")
+    parser.add_argument('service', choices=['groq', 'smtp'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=1000, help="groq: delay before each completion")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="groq: fraction of completions that fail")
+    parser.add_argument('--error-status', type=int, default=500, help="groq: HTTP status of injected failures")
+    parser.add_argument('--seed', type=int, default=0, help="groq: seed for which completions fail")
+    parser.add_argument('--connect-delay-ms', type=float, default=0, help="smtp: delay before each greeting")
+    args = parser.parse_args()
+    
+    if args.service == 'groq':
+        standin = GroqStandIn(args.host, args.port, args.latency_ms, args.error_rate, args.error_status,
+                              args.seed).start()
+    else:
+        standin = SMTPStandIn(args.host, args.port, args.connect_delay_ms).start()
+    print(f"{args.service} stand-in on {standin.host}:{standin.port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == '__main__':
+    main()
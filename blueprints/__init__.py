@@ -2,10 +2,15 @@ from blueprints.auth import auth_bp
 from blueprints.generate import generate_bp
 from blueprints.sessions import sessions_bp
 from blueprints.analytics import analytics_bp
+from blueprints.reviews import reviews_bp
 from blueprints.contact import contact_bp
 from blueprints.pages import pages_bp
+from blueprints.user import user_bp
+from blueprints.debug import debug_bp
+from blueprints.metrics import metrics_bp
 
 __all__ = [
     'auth_bp', 'generate_bp', 'sessions_bp', 
-    'analytics_bp', 'contact_bp', 'pages_bp'
+    'analytics_bp', 'reviews_bp', 'contact_bp', 'pages_bp',
+    'user_bp', 'debug_bp', 'metrics_bp'
 ]
\ No newline at end of file
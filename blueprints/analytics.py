@@ -1,67 +1,109 @@
-from flask import Blueprint, request, jsonify, session
+from datetime import date, datetime, timedelta, timezone
+from flask import Blueprint, request, jsonify, session, current_app
+from config import Config
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
+@analytics_bp.route('/dashboard')
+def dashboard():
+    """Auth status, tier, sessions and the type/difficulty breakdown for the analytics page in one response
+    
+    The breakdown covers the page's filter: the last ?sessions= sessions of the last ?days=
+    days (default 5 and 30, either may be "all").
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "success", "authenticated": False, "user": None})
+    
+    try:
+        latest = _int_arg('sessions', 5, 1, 100000) if request.args.get('sessions') != 'all' else None
+        days = _int_arg('days', 30, 1, 36500) if request.args.get('days') != 'all' else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    data = current_app.dashboard_service.load(user_id, latest, days)
+    return jsonify({
+        "status": "success",
+        "authenticated": True,
+        "user": {"id": user_id, "email": session.get('user_email')},
+        **data
+    })
+
 @analytics_bp.route('/type-difficulty', methods=['GET'])
 def type_difficulty():
-    from app import db
+    db = current_app.db
     
     user_id = session.get('user_id')
     if not user_id:
         return jsonify({"status": "error", "message": "Auth required"}), 401
     
     data = db.get_analytics_type_difficulty(user_id)
-    return jsonify({"status": "success", "data": data}) if data else jsonify({"status": "error"}), 500
+    if not data:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
 
 @analytics_bp.route('/type-difficulty-filtered', methods=['POST'])
 def type_difficulty_filtered():
-    from app import db
+    """Type/difficulty breakdown over the user's sessions matching the given filters"""
+    db = current_app.db
     
     user_id = session.get('user_id')
     if not user_id:
         return jsonify({"status": "error", "message": "Auth required"}), 401
     
-    data = request.get_json()
-    session_ids = data.get('session_ids', [])
+    data = request.get_json(silent=True) or {}
+    try:
+        filters = _breakdown_filters(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     
-    if not session_ids:
-        return jsonify({"status": "success", "data": {"question_types": [], "difficulties": []}})
-    
-    # Build IN clause safely
-    placeholders = ','.join(['%s'] * len(session_ids))
-    
-    conn = db.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    cursor.execute(f"""
-        SELECT question_type, COUNT(*) as total_questions,
-               SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END) as correct_answers
-        FROM studycards
-        WHERE session_id IN ({placeholders})
-        GROUP BY question_type
-    """, session_ids)
-    type_data = cursor.fetchall()
-    
-    cursor.execute(f"""
-        SELECT difficulty, COUNT(*) as total_questions,
-               SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END) as correct_answers
-        FROM studycards
-        WHERE session_id IN ({placeholders})
-        GROUP BY difficulty
-    """, session_ids)
-    difficulty_data = cursor.fetchall()
-    
-    cursor.close()
-    conn.close()
-    
-    return jsonify({
-        "status": "success",
-        "data": {"question_types": type_data, "difficulties": difficulty_data}
-    })
+    breakdown = db.get_filtered_breakdown(user_id, **filters)
+    if breakdown is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": breakdown})
+
+def _breakdown_filters(data):
+    """Validated keyword arguments for Database.get_filtered_breakdown from a request body"""
+    filters = {}
+    
+    session_ids = data.get('session_ids')
+    if session_ids is not None:
+        if not isinstance(session_ids, list) or not all(type(i) is int for i in session_ids):
+            raise ValueError("session_ids must be a list of integers")
+        session_ids = list(dict.fromkeys(session_ids))
+        if len(session_ids) > Config.ANALYTICS_MAX_SESSION_IDS:
+            raise ValueError(f"At most {Config.ANALYTICS_MAX_SESSION_IDS} session_ids per request")
+        filters['session_ids'] = session_ids
+    
+    for key in ('date_from', 'date_to'):
+        value = data.get(key)
+        if value is not None:
+            filters[key] = _parse_timestamp(value, key)
+    
+    for key in ('question_types', 'difficulties'):
+        values = data.get(key)
+        if values is not None:
+            if not isinstance(values, list) or len(values) > 10 or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{key} must be a list of strings")
+            filters[key] = values
+    return filters
+
+def _parse_timestamp(value, key):
+    """ISO 8601 date or datetime as naive study time (UTC + STUDY_UTC_OFFSET_HOURS), the way
+    study_sessions.created_at is stored; values without an offset are taken as study time already
+    """
+    try:
+        parsed = datetime.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{key} must be an ISO 8601 date or datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone(timedelta(hours=Config.STUDY_UTC_OFFSET_HOURS))).replace(tzinfo=None)
+    return parsed
 
 @analytics_bp.route('/progress-data')
 def progress_data():
-    from app import session_service
+    session_service = current_app.session_service
     
     user_id = session.get('user_id')
     if not user_id:
@@ -77,7 +119,7 @@ def progress_data():
 
 @analytics_bp.route('/chart-data')
 def chart_data():
-    from app import db
+    db = current_app.db
     
     user_id = session.get('user_id')
     if not user_id:
@@ -90,4 +132,119 @@ def chart_data():
         "labels": [s['created_at_formatted'] for s in sessions],
         "scores": [float(s['score_percentage']) for s in sessions],
         "questions": [s['total_questions'] for s in sessions]
-    })
\ No newline at end of file
+    })
+
+@analytics_bp.route('/daily')
+def daily():
+    """Per-day (or ?bucket=week) sessions, questions, accuracy and study time for ?from=..&to=.. (default last 30 days)"""
+    trend_service = current_app.trend_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        end = _parse_day(request.args.get('to'), 'to') or trend_service.today()
+        start = _parse_day(request.args.get('from'), 'from') or end - timedelta(days=29)
+        data = trend_service.series(user_id, start, end, request.args.get('bucket', 'day'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
+
+@analytics_bp.route('/streaks')
+def streaks():
+    trend_service = current_app.trend_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    data = trend_service.streaks(user_id)
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
+
+@analytics_bp.route('/week-over-week')
+def week_over_week():
+    """The ?days=7 days ending ?to=.. (default today) against the same number of days before them"""
+    trend_service = current_app.trend_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        end = _parse_day(request.args.get('to'), 'to') or trend_service.today()
+        data = trend_service.compare(user_id, end, int(request.args.get('days', 7)))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
+
+@analytics_bp.route('/learning-curve')
+def learning_curve():
+    """Moving-average accuracy (?window=20 cards, ?points=200) and per-difficulty/type curves (?bins=10)"""
+    analytics_engine = current_app.analytics_engine
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        window = _int_arg('window', 20, 1, 1000)
+        points = _int_arg('points', 200, 2, 2000)
+        bins = _int_arg('bins', 10, 1, 100)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    data = analytics_engine.learning_curves(user_id, window, points, bins)
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
+
+@analytics_bp.route('/mastery')
+def mastery():
+    """Recency-weighted mastery per question type and difficulty (?half_life=50 cards, ?threshold=80 percent)"""
+    analytics_engine = current_app.analytics_engine
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        half_life = _int_arg('half_life', 50, 1, 10000)
+        threshold = _int_arg('threshold', 80, 1, 99)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    data = analytics_engine.mastery(user_id, half_life, threshold / 100)
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "data": data})
+
+def _int_arg(key, default, low, high):
+    """Integer query parameter within low..high"""
+    value = request.args.get(key)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a whole number")
+    if not low <= number <= high:
+        raise ValueError(f"{key} must be between {low} and {high}")
+    return number
+
+def _parse_day(value, key):
+    """YYYY-MM-DD query parameter as a date, or None when absent"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a YYYY-MM-DD date")
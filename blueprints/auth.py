@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 import re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -13,14 +13,14 @@ def login():
         if not email or not re.match(r'[^@]+@[^@]+\.[^@]+', email):
             return jsonify({"status": "error", "message": "Valid email required"}), 400
         
-        from app import db  # Lazy import to avoid circular dependency
-        user = db.get_or_create_user(email)
+        user = current_app.session_service.resolve_user(email)
         
         if not user:
             return jsonify({"status": "error", "message": "Failed to create user"}), 500
         
         session['user_id'] = user['id']
         session['user_email'] = user['email']
+        session['user_tier'] = user.get('subscription_tier') or 'free'
         
         return jsonify({
             "status": "success",
@@ -51,7 +51,7 @@ def logout():
     session.clear()
     
     if user_id:
-        from app import session_service
+        session_service = current_app.session_service
         session_service.invalidate_cache(user_id)
     
     return jsonify({"status": "success", "message": "Logged out"})
\ No newline at end of file
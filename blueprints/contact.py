@@ -1,16 +1,15 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, current_app
 import os
-from services.email_service import EmailService
 
 contact_bp = Blueprint('contact', __name__)
 
 @contact_bp.route('/contact', methods=['GET'])
 def contact_page():
-    return render_template('contact.html')
+    return current_app.page_cache.render('contact.html')
 
 @contact_bp.route('/contact', methods=['POST'])
 def send_contact():
-    from app import mail
+    email_service = current_app.email_service
     
     try:
         data = request.get_json() or {}
@@ -26,13 +25,14 @@ def send_contact():
         
         recipient = os.environ.get('CONTACT_DESTINATION_EMAIL', os.environ.get('MAIL_USERNAME'))
         
-        email_service = EmailService(mail)
-        email_service.send_async(
+        queued = email_service.send_async(
             subject=f"Contact from {name}",
             recipients=[recipient],
             body=f"Name: {name}\nEmail: {email}\n\nMessage:\n{message}",
             reply_to=email
         )
+        if not queued:
+            return jsonify({'status': 'error', 'message': 'Failed to send'}), 500
         
         return jsonify({'status': 'success', 'message': 'Message sent!'})
         
@@ -0,0 +1,77 @@
+import os
+from flask import Blueprint, Response, jsonify, request, current_app
+
+debug_bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+@debug_bp.route('/pool-status')
+def debug_pool_status():
+    db = current_app.db
+    return jsonify({
+        "status": "success",
+        "pool_status": "Pool working" if db.pool else "Pool failed",
+        "pool_size": getattr(db.pool, 'pool_size', 'No pool'),
+        "pid": os.getpid()
+    })
+
+@debug_bp.route('/email-config')
+def debug_email_config():
+    config = current_app.config
+    return jsonify({
+        'MAIL_SERVER': config.get('MAIL_SERVER'),
+        'MAIL_PORT': config.get('MAIL_PORT'),
+        'MAIL_USERNAME': 'SET' if config.get('MAIL_USERNAME') else 'MISSING',
+        'MAIL_PASSWORD': 'SET' if config.get('MAIL_PASSWORD') else 'MISSING',
+    })
+
+@debug_bp.route('/llm-metrics')
+def debug_llm_metrics():
+    return jsonify({
+        "status": "success",
+        "metrics": current_app.telemetry_service.snapshot(),
+        "writer": current_app.telemetry_service.writer_stats(),
+        "models": current_app.ai_service.router.snapshot(),
+        "admission": current_app.admission_controller.snapshot()
+    })
+
+@debug_bp.route('/email-outbox')
+def debug_email_outbox():
+    return jsonify({"status": "success", "outbox": current_app.email_service.stats()})
+
+@debug_bp.route('/tracing')
+def debug_tracing():
+    return jsonify({"status": "success", "tracing": current_app.tracing_service.stats()})
+
+@debug_bp.route('/compression')
+def debug_compression():
+    return jsonify({"status": "success", "compression": current_app.compression_service.stats()})
+
+@debug_bp.route('/page-cache')
+def debug_page_cache():
+    return jsonify({"status": "success", "page_cache": current_app.page_cache.stats()})
+
+@debug_bp.route('/dashboard')
+def debug_dashboard():
+    return jsonify({"status": "success", "dashboard": current_app.dashboard_service.stats()})
+
+@debug_bp.route('/analytics-engine')
+def debug_analytics_engine():
+    return jsonify({"status": "success", "analytics_engine": current_app.analytics_engine.stats()})
+
+@debug_bp.route('/reviews')
+def debug_reviews():
+    return jsonify({"status": "success", "reviews": current_app.review_service.stats()})
+
+@debug_bp.route('/profiles/<profile_id>')
+def debug_profile(profile_id):
+    """Collapsed stacks for a request answered with X-Profile-Id; needs X-Profile: <PROFILE_TOKEN>"""
+    tracing_service = current_app.tracing_service
+    # Profiles from PROFILE_ENDPOINTS are still written without a token, but never served without one
+    if not tracing_service.profile_token:
+        return jsonify({"status": "error", "message": "Profiles are disabled without PROFILE_TOKEN"}), 404
+    if not tracing_service.profile_allowed(request.headers.get('X-Profile')):
+        return jsonify({"status": "error", "message": "Profile token required"}), 403
+    
+    profile = tracing_service.read_profile(profile_id)
+    if profile is None:
+        return jsonify({"status": "error", "message": "Profile not found"}), 404
+    return Response(profile, content_type='text/plain; charset=utf-8')
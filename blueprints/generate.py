@@ -1,23 +1,146 @@
-from flask import Blueprint, request, jsonify, session
-from services.ai_service import AIService
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, current_app
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import threading
+from functools import partial
+from config import Config
+from services.local_generator import LocalQuestionGenerator
+from services.prefetch_service import PrefetchService
 
 generate_bp = Blueprint('generate', __name__)
-ai_service = AIService()
+local_generator = LocalQuestionGenerator()
+
+# AI failures that the local generator can cover for
+FALLBACK_STATUSES = ("no_api_key", "quota_exceeded", "api_error")
+
+ERROR_MESSAGES = {
+    "no_api_key": "AI service not configured",
+    "quota_exceeded": "AI quota exceeded. Try later",
+    "auth_error": "AI authentication failed",
+    "no_valid_questions": "No valid questions generated",
+    "api_error": "AI service temporarily unavailable"
+}
+
+def _read_settings(data):
+    """Normalise one generation request body"""
+    return {
+        "notes": data.get('notes', ''),
+        "num_questions": min(int(data.get('num_questions', 6)), 12),
+        "question_type": data.get('question_type', 'mcq'),
+        "difficulty": data.get('difficulty', 'normal'),
+        "mode": data.get('mode', 'ai')
+    }
+
+def _generate(ai_service, notes, num_questions, question_type, difficulty, mode, user_id=None):
+    """Run the AI or local generator and return (questions, status, source)"""
+    # "fast" mode skips the LLM entirely
+    if mode == "fast":
+        questions, status = local_generator.generate_questions(
+            notes, num_questions, question_type, difficulty
+        )
+        return questions, status, "local"
+    
+    questions, status = ai_service.generate_questions(
+        notes, num_questions, question_type, difficulty, user_id
+    )
+    source = "ai"
+    if not questions and status in FALLBACK_STATUSES and Config.LOCAL_FALLBACK:
+        fallback, _ = local_generator.generate_questions(
+            notes, num_questions, question_type, difficulty
+        )
+        if fallback:
+            questions, source = fallback, "local"
+    return questions, status, source
+
+@generate_bp.record_once
+def _init_prefetch(state):
+    """Background generations for the user's likely next request; see PrefetchService"""
+    app = state.app
+    app.prefetch_service = PrefetchService(
+        partial(_generate, app.ai_service),
+        ttl=Config.PREFETCH_TTL,
+        max_workers=Config.PREFETCH_WORKERS,
+        max_foreground=Config.PREFETCH_MAX_FOREGROUND,
+        admission_controller=app.admission_controller
+    )
+
+def _generate_foreground(app, settings, user_id):
+    """Takes the app explicitly so batch items can run on executor threads"""
+    with app.prefetch_service.foreground():
+        return _generate(app.ai_service, **settings, user_id=user_id)
+
+class _BatchRun:
+    """Admission slots and reserved sessions held by one batch, given back item by item
+    
+    Each item is settled when its future finishes or is cancelled: a failed item's session is
+    refunded, and the batch's admission weight shrinks once fewer items are left than it holds.
+    Items still running after the client goes away therefore stay counted against both limits.
+    """
+    
+    def __init__(self, admission_controller, session_service, ticket, user_id, items):
+        self.admission_controller = admission_controller
+        self.session_service = session_service
+        self.ticket = ticket
+        self.user_id = user_id
+        self.items = items
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.unsettled = items
+        self.held = ticket['weight']
+    
+    def submit(self, executor, fn, *args):
+        future = executor.submit(fn, *args)
+        with self.lock:
+            self.submitted += 1
+        future.add_done_callback(self._done)
+        return future
+    
+    def close(self):
+        """Settle items that were never submitted, e.g. when the response was never iterated"""
+        with self.lock:
+            unsubmitted = self.items - self.submitted
+            self.submitted = self.items
+        for _ in range(unsubmitted):
+            self._settle(False)
+    
+    def _done(self, future):
+        succeeded = False
+        if not future.cancelled() and future.exception() is None:
+            succeeded = bool(future.result()[0])
+        self._settle(succeeded)
+    
+    def _settle(self, succeeded):
+        with self.lock:
+            self.unsettled -= 1
+            freed = max(0, self.held - self.unsettled)
+            self.held -= freed
+        if not succeeded:
+            self.session_service.release_sessions(self.user_id, 1)
+        if freed:
+            self.admission_controller.release(self.ticket, freed)
+
+def _overloaded(admission):
+    """503/429 response for a request the admission controller turned away"""
+    response = jsonify({
+        "status": "error",
+        "code": "OVERLOADED",
+        "message": admission['message'],
+        "retry_after": admission['retry_after']
+    })
+    return response, admission['status_code'], {"Retry-After": str(admission['retry_after'])}
 
 @generate_bp.route('/generate_questions', methods=['POST'])
 def generate_questions():
-    from app import db, session_service
+    app = current_app._get_current_object()
+    session_service, admission_controller, prefetch_service = app.session_service, app.admission_controller, app.prefetch_service
     
     try:
         user_id = session.get('user_id')
         data = request.get_json()
+        settings = _read_settings(data)
+        prefetch = bool(data.get('prefetch', Config.SPECULATIVE_PREFETCH))
         
-        notes = data.get('notes', '')
-        num_questions = min(int(data.get('num_questions', 6)), 12)
-        question_type = data.get('question_type', 'mcq')
-        difficulty = data.get('difficulty', 'normal')
-        
-        if not notes or not notes.strip():
+        if not settings['notes'] or not settings['notes'].strip():
             return jsonify({"status": "error", "message": "Notes required"}), 400
         
         # Check session limit for authenticated users
@@ -32,35 +155,123 @@ def generate_questions():
                     "limit": allowance['limit']
                 }), 429
         
-        # Generate questions
-        questions, status = ai_service.generate_questions(
-            notes, num_questions, question_type, difficulty
-        )
+        # A speculative result for these exact settings is served instantly
+        prefetched = prefetch_service.take(user_id, settings) if user_id else None
+        if prefetched:
+            questions, source = prefetched
+            status = "success"
+        else:
+            admission = admission_controller.acquire(user_id, session.get('user_tier', 'free'))
+            if not admission['admitted']:
+                return _overloaded(admission)
+            try:
+                questions, status, source = _generate_foreground(app, settings, user_id)
+            finally:
+                admission_controller.release(admission['ticket'])
         
         # Increment session count only on success
         if questions and user_id:
             session_service.increment_session_count(user_id)
+            if prefetch and settings['mode'] != "fast":
+                prefetch_service.schedule(user_id, settings)
             return jsonify({
                 "status": "success",
-                "questions": questions[:num_questions],
-                "source": "ai"
+                "questions": questions[:settings['num_questions']],
+                "source": source,
+                "prefetched": bool(prefetched)
             })
         
-        # Handle errors
-        error_messages = {
-            "no_api_key": "AI service not configured",
-            "quota_exceeded": "AI quota exceeded. Try later",
-            "auth_error": "AI authentication failed",
-            "no_valid_questions": "No valid questions generated",
-            "api_error": "AI service temporarily unavailable"
-        }
-        
         return jsonify({
             "status": "error",
-            "message": error_messages.get(status, "Generation failed"),
+            "message": ERROR_MESSAGES.get(status, "Generation failed"),
             "code": "AI_ERROR"
         }), 500
-        
+    
     except Exception as e:
         print(f"Generation error: {e}")
-        return jsonify({"status": "error", "message": "Internal error"}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": "Internal error"}), 500
+
+@generate_bp.route('/generate_questions/batch', methods=['POST'])
+def generate_questions_batch():
+    """Generate several quizzes at once, streaming one NDJSON line per item as it completes"""
+    app = current_app._get_current_object()
+    session_service, admission_controller = app.session_service, app.admission_controller
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        raw_items = (request.get_json() or {}).get('items', [])
+        if not isinstance(raw_items, list) or not raw_items:
+            return jsonify({"status": "error", "message": "Items required"}), 400
+        if len(raw_items) > Config.BATCH_MAX_ITEMS:
+            return jsonify({
+                "status": "error",
+                "message": f"At most {Config.BATCH_MAX_ITEMS} items per batch"
+            }), 400
+        
+        items = [_read_settings(item) for item in raw_items]
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid batch items"}), 400
+    
+    invalid = [i for i, item in enumerate(items) if not item['notes'] or not item['notes'].strip()]
+    if invalid:
+        return jsonify({"status": "error", "message": "Notes required", "invalid": invalid}), 400
+    
+    # The batch runs only as many items in parallel as it was granted admission slots;
+    # acquire() caps the weight at the per-user limit
+    requested = max(1, min(Config.BATCH_PARALLELISM, len(items)))
+    admission = admission_controller.acquire(user_id, session.get('user_tier', 'free'), weight=requested)
+    if not admission['admitted']:
+        return _overloaded(admission)
+    parallelism = admission['ticket']['weight']
+    
+    # Reserve quota for the whole batch in one statement; each failed item's session is released as it finishes
+    if not session_service.reserve_sessions(user_id, len(items)):
+        admission_controller.release(admission['ticket'])
+        allowance = session_service.check_daily_limit(user_id)
+        return jsonify({
+            "status": "error",
+            "code": "SESSION_LIMIT_EXCEEDED",
+            "message": f"Daily limit reached. {allowance['remaining']} remaining",
+            "remaining": allowance['remaining'],
+            "limit": allowance['limit']
+        }), 429
+    
+    run = _BatchRun(admission_controller, session_service, admission['ticket'], user_id, len(items))
+    
+    def stream():
+        executor = ThreadPoolExecutor(max_workers=parallelism)
+        try:
+            futures = {run.submit(executor, _generate_foreground, app, item, user_id): i for i, item in enumerate(items)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    questions, status, source = future.result()
+                except Exception as e:
+                    print(f"Batch item {index} error: {e}")
+                    questions, status, source = None, "api_error", None
+                
+                if questions:
+                    result = {
+                        "index": index,
+                        "status": "success",
+                        "questions": questions[:items[index]['num_questions']],
+                        "source": source
+                    }
+                else:
+                    result = {
+                        "index": index,
+                        "status": "error",
+                        "code": status,
+                        "message": ERROR_MESSAGES.get(status, "Generation failed")
+                    }
+                yield json.dumps(result) + "\n"
+        finally:
+            # Queued items are cancelled and settled now; running ones settle when they finish
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    response = Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+    response.call_on_close(run.close)
+    return response
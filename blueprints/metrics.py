@@ -0,0 +1,9 @@
+from flask import Blueprint, Response, current_app
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = current_app.metrics_service.render(current_app)
+    return Response(body, content_type=content_type)
@@ -1,23 +1,23 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, current_app
 
 pages_bp = Blueprint('pages', __name__)
 
 @pages_bp.route('/')
 def index():
-    return render_template('index.html')
+    return current_app.page_cache.render('index.html')
 
 @pages_bp.route('/analytics')
 def analytics():
-    return render_template('analytics.html')
+    return current_app.page_cache.render('analytics.html')
 
 @pages_bp.route('/sessions')
 def sessions():
-    return render_template('sessions.html')
+    return current_app.page_cache.render('sessions.html')
 
 @pages_bp.route('/donate')
 def donate():
-    return render_template('donate.html')
+    return current_app.page_cache.render('donate.html')
 
 @pages_bp.route('/upgrade')
 def upgrade():
-    return render_template('donate.html')  # Alias for donate
\ No newline at end of file
+    return current_app.page_cache.render('donate.html')  # Alias for donate
\ No newline at end of file
@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify, session, current_app
+
+reviews_bp = Blueprint('reviews', __name__, url_prefix='/reviews')
+
+@reviews_bp.route('/due', methods=['GET'])
+def due():
+    """A review quiz of the user's overdue cards (?limit=, default REVIEW_QUIZ_SIZE)"""
+    review_service = current_app.review_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    try:
+        limit = int(request.args.get('limit', review_service.quiz_size))
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be a whole number"}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({"status": "error", "message": "limit must be between 1 and 100"}), 400
+    
+    data = review_service.due_quiz(user_id, limit)
+    if data is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", **data})
+
+@reviews_bp.route('/answers', methods=['POST'])
+def answers():
+    """Grade and reschedule reviewed cards: {"answers": [{"cardId": .., "userAnswer": ..}, ...]}"""
+    review_service = current_app.review_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    data = request.get_json(silent=True) or {}
+    submitted = data.get('answers')
+    if not isinstance(submitted, list) or not submitted or len(submitted) > 100:
+        return jsonify({"status": "error", "message": "answers must be a list of 1 to 100 cards"}), 400
+    try:
+        # A card answered twice in one submission counts once, with its last answer
+        graded = {int(a['cardId']): int(a['userAnswer']) for a in submitted}
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Each answer needs an integer cardId and userAnswer"}), 400
+    
+    results = review_service.record_answers(user_id, graded)
+    if results is None:
+        return jsonify({"status": "error"}), 500
+    return jsonify({"status": "success", "reviewed": results})
@@ -1,11 +1,18 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from datetime import datetime, timezone, timedelta
+import re
+from config import Config
 
 sessions_bp = Blueprint('sessions', __name__)
 
+# InnoDB's default innodb_ft_min_token_size: shorter words aren't in the full-text index
+SEARCH_MIN_WORD = 3
+SEARCH_MAX_WORDS = 10
+SEARCH_QUESTIONS_PER_SESSION = 3
+
 @ sessions_bp.route('/save_flashcards', methods=['POST'])
 def save_flashcards():
-    from app import db, session_service
+    db, session_service = current_app.db, current_app.session_service
     
     try:
         data = request.get_json()
@@ -33,7 +40,7 @@ def save_flashcards():
             if not iso_string:
                 return None
             dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
-            return dt.astimezone(timezone(timedelta(hours=3))).strftime('%Y-%m-%d %H:%M:%S')
+            return dt.astimezone(timezone(timedelta(hours=Config.STUDY_UTC_OFFSET_HOURS))).strftime('%Y-%m-%d %H:%M:%S')
         
         mysql_start = to_mysql(session_start)
         mysql_end = to_mysql(session_end)
@@ -56,14 +63,28 @@ def save_flashcards():
             return jsonify({"status": "error", "message": "Failed to save flashcards"}), 500
         
         session_service.invalidate_cache(user_id)
-        return jsonify({"status": "success", "message": "Saved", "session_id": session_id})
+        # Missed questions come back through /reviews/due; a failure here is backfilled by reschedule_reviews.py
+        current_app.review_service.schedule_session(session_id)
         
+        # Users often regenerate on the same notes right after saving
+        if data.get('prefetch', Config.SPECULATIVE_PREFETCH) and notes.strip() and flashcards:
+            first = flashcards[0]
+            current_app.prefetch_service.schedule(user_id, {
+                "notes": notes,
+                "num_questions": min(len(flashcards), 12),
+                "question_type": first.get('questionType', first.get('question_type', 'mcq')),
+                "difficulty": first.get('difficulty', 'normal'),
+                "mode": "ai"
+            })
+        
+        return jsonify({"status": "success", "message": "Saved", "session_id": session_id})
+    
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @ sessions_bp.route('/get_sessions', methods=['GET'])
 def get_sessions():
-    from app import db, session_service
+    db, session_service = current_app.db, current_app.session_service
     
     user_id = session.get('user_id')
     if not user_id:
@@ -74,14 +95,14 @@ def get_sessions():
 
 @ sessions_bp.route('/get_flashcards/<int:session_id>', methods=['GET'])
 def get_flashcards(session_id):
-    from app import db
+    db = current_app.db
     
     flashcards = db.get_flashcards_by_session(session_id)
     return jsonify({"status": "success", "flashcards": flashcards})
 
 @ sessions_bp.route('/delete_session/<int:session_id>', methods=['DELETE'])
 def delete_session(session_id):
-    from app import db, session_service
+    db, session_service = current_app.db, current_app.session_service
     
     user_id = session.get('user_id')
     if not user_id:
@@ -95,7 +116,7 @@ def delete_session(session_id):
 
 @ sessions_bp.route('/list_sessions', methods=['GET'])
 def list_sessions():
-    from app import db
+    db = current_app.db
     
     user_id = session.get('user_id')
     if not user_id:
@@ -120,4 +141,55 @@ def list_sessions():
             'updated_at': s['updated_at'].isoformat() if s['updated_at'] else None
         })
     
-    return jsonify({"status": "success", "sessions": processed})
\ No newline at end of file
+    return jsonify({"status": "success", "sessions": processed})
+
+@ sessions_bp.route('/search_sessions', methods=['GET'])
+def search_sessions():
+    """Sessions whose notes or questions contain every word of ?q= (words also match as prefixes), best first"""
+    db = current_app.db
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "error", "message": "Auth required"}), 401
+    
+    query = _fulltext_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({"status": "error", "message": f"Search for at least one word of {SEARCH_MIN_WORD} or more letters"}), 400
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(50, max(1, int(request.args.get('per_page', 20))))
+    except ValueError:
+        return jsonify({"status": "error", "message": "page and per_page must be whole numbers"}), 400
+    
+    found = db.search_sessions(user_id, query, per_page, (page - 1) * per_page)
+    if found is None:
+        return jsonify({"status": "error", "message": "Search failed"}), 500
+    rows, total = found
+    questions = db.get_matching_questions([row['id'] for row in rows], query, SEARCH_QUESTIONS_PER_SESSION) or {}
+    
+    return jsonify({
+        "status": "success",
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": -(-total // per_page),
+        "results": [{
+            'id': row['id'],
+            'title': row['title'],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'session_duration': row['session_duration'] or 0,
+            'notes_preview': row['notes_preview'],
+            'score': round(float(row['score']), 4),
+            'in_notes': bool(row['in_notes']),
+            'matched_questions': row['matched_questions'],
+            'questions': [{'id': q['id'], 'question': q['question']} for q in questions.get(row['id'], [])]
+        } for row in rows]
+    })
+
+def _fulltext_query(text):
+    """Boolean-mode query requiring every searchable word of text, each as a prefix ("+word*"); '' if none"""
+    words = []
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        if len(word) >= SEARCH_MIN_WORD and word not in words:
+            words.append(word)
+    return " ".join(f"+{word}*" for word in words[:SEARCH_MAX_WORDS])
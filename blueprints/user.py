@@ -0,0 +1,73 @@
+from flask import Blueprint, jsonify, session, current_app
+
+user_bp = Blueprint('user', __name__, url_prefix='/user')
+
+@user_bp.route('/tier-info')
+def user_tier_info():
+    db, session_service = current_app.db, current_app.session_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({
+            "status": "success",
+            "tier_info": {
+                "tier": "free",
+                "remaining_sessions": 10,
+                "session_limit": 10,
+                "sessions_used_today": 0,
+                "reset_in": "midnight",
+                "billing_period": "daily",
+                "total_sessions_used": 0
+            }
+        })
+    
+    allowance = session_service.check_daily_limit(user_id)
+    
+    # Get total sessions
+    conn = db.get_connection()
+    total_sessions = 0
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT total_sessions_used FROM users WHERE id = %s", (user_id,))
+        user_data = cursor.fetchone()
+        total_sessions = user_data.get('total_sessions_used', 0) if user_data else 0
+        cursor.close()
+        conn.close()
+    
+    return jsonify({
+        "status": "success",
+        "tier_info": {
+            "tier": "free",
+            "remaining_sessions": allowance['remaining'],
+            "session_limit": allowance['limit'],
+            "sessions_used_today": allowance['sessions_used_today'],
+            "reset_in": allowance['reset_in'],
+            "billing_period": "daily",
+            "total_sessions_used": total_sessions
+        }
+    })
+
+@user_bp.route('/session-allowance')
+def user_session_allowance():
+    session_service = current_app.session_service
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({
+            "status": "success",
+            "allowance": {"allowed": True, "remaining": 10, "limit": 10, "reset_in": "24h", "period": "daily"}
+        })
+    
+    allowance = session_service.check_daily_limit(user_id)
+    return jsonify({"status": "success", "allowance": allowance})
+
+@user_bp.route('/session-count')
+def user_session_count():
+    db = current_app.db
+    
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"status": "success", "session_count": 0})
+    
+    result = db.fetch_one("SELECT sessions_used_today FROM users WHERE id = %s", (user_id,))
+    return jsonify({"status": "success", "session_count": result['sessions_used_today'] if result else 0})
@@ -0,0 +1,192 @@
+"""
+Builds static/dist/ for production, then exits.
+
+- Bundles and minifies the stylesheets and scripts listed in
+  AssetService.BUNDLES into app.css and app.js (media-specific stylesheets are
+  wrapped in @media), and minifies every other CSS/JS file on its own.
+- Losslessly re-encodes PNGs, or palette-quantizes them when that is much
+  smaller, unless --lossless is given.
+- Copies every file under a content-hashed name (files with identical bytes
+  share one copy) and rewrites the icon paths in site.webmanifest.
+- Writes .br and .gz variants of compressible files when they save space.
+- Records it all in static/dist/manifest.json, which AssetService reads at
+  startup to rewrite url_for('static', ...) and serve the variants.
+
+The Docker image runs this at build time; locally, without a build, the app
+serves the source files unbundled:
+
+    python build_assets.py [--lossless]
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+
+import brotli
+import rcssmin
+import rjsmin
+from PIL import Image
+
+from services.asset_service import AssetService
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC = os.path.join(ROOT, "static")
+DIST = os.path.join(STATIC, AssetService.DIST_DIR)
+STATIC_URL = "/static/"
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.webmanifest', '.svg', '.ico', '.txt')
+# Keep a quantized PNG only if it is at most this fraction of the lossless one
+QUANTIZE_MAX_RATIO = 0.7
+
+
+def fingerprint(relative, content, written):
+    """Write content as <name>.<hash><ext> under dist/, reusing an identical earlier file"""
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in written:
+        return written[digest]
+    directory, name = os.path.split(relative)
+    stem, ext = os.path.splitext(name)
+    output = os.path.join(directory, f"{stem}.{digest[:10]}{ext}").replace(os.sep, '/')
+    path = os.path.join(DIST, output)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    written[digest] = output
+    return output
+
+
+def optimize_png(content, lossless):
+    image = Image.open(io.BytesIO(content))
+    image.load()
+    best = content
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    if len(buffer.getvalue()) < len(best):
+        best = buffer.getvalue()
+    
+    if not lossless:
+        source = image.convert('RGBA')
+        quantized = source.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.FLOYDSTEINBERG)
+        buffer = io.BytesIO()
+        quantized.save(buffer, format='PNG', optimize=True)
+        if len(buffer.getvalue()) <= QUANTIZE_MAX_RATIO * len(best):
+            best = buffer.getvalue()
+    return best
+
+
+def minify(relative, content):
+    text = content.decode('utf-8')
+    if relative.endswith('.css'):
+        return rcssmin.cssmin(text).encode('utf-8')
+    if relative.endswith('.js'):
+        return rjsmin.jsmin(text).encode('utf-8')
+    return content
+
+
+def bundle(name, sources):
+    parts = []
+    for path, media in sources:
+        with open(os.path.join(STATIC, path), 'rb') as f:
+            text = minify(path, f.read()).decode('utf-8')
+        if name.endswith('.css'):
+            parts.append(f"@media {media}{{{text}}}" if media else text)
+        else:
+            # Each source is a classic script; keep statements from running together
+            parts.append(text.rstrip().rstrip(';') + ';')
+    return "\n".join(parts).encode('utf-8')
+
+
+def compress(output):
+    """Write .br/.gz next to a built file when they are smaller; returns the encodings written"""
+    path = os.path.join(DIST, output)
+    with open(path, 'rb') as f:
+        content = f.read()
+    encodings = []
+    for encoding, suffix, data in (("br", ".br", brotli.compress(content, quality=11)),
+                                   ("gzip", ".gz", gzip.compress(content, compresslevel=9, mtime=0))):
+        if len(data) < len(content) * 0.9:
+            with open(path + suffix, 'wb') as f:
+                f.write(data)
+            encodings.append(encoding)
+    return encodings
+
+
+def source_files():
+    for directory, dirs, names in os.walk(STATIC):
+        if os.path.abspath(directory) == os.path.abspath(DIST):
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(directory, d)) != os.path.abspath(DIST)]
+        for name in sorted(names):
+            yield os.path.relpath(os.path.join(directory, name), STATIC).replace(os.sep, '/')
+
+
+def build(lossless=False):
+    shutil.rmtree(DIST, ignore_errors=True)
+    os.makedirs(DIST)
+    written, files, bundles, sizes = {}, {}, {}, {"source": 0, "built": 0}
+    
+    # Images first so the web manifest can point at their fingerprinted names
+    relatives = sorted(source_files(), key=lambda r: (r.endswith('.webmanifest'), r))
+    for relative in relatives:
+        with open(os.path.join(STATIC, relative), 'rb') as f:
+            content = f.read()
+        if not content:
+            continue
+        sizes["source"] += len(content)
+        if relative.endswith('.png'):
+            content = optimize_png(content, lossless)
+        elif relative.endswith(('.css', '.js')):
+            content = minify(relative, content)
+        elif relative.endswith('.webmanifest'):
+            manifest = json.loads(content)
+            for icon in manifest.get('icons', []):
+                source = os.path.join(os.path.dirname(relative), icon['src'].lstrip('/')).replace(os.sep, '/')
+                if source in files:
+                    icon['src'] = STATIC_URL + AssetService.DIST_DIR + '/' + files[source]
+            content = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        files[relative] = fingerprint(relative, content, written)
+    
+    for name, sources in AssetService.BUNDLES.items():
+        bundles[name] = fingerprint(name, bundle(name, sources), written)
+    
+    compressed = {}
+    for output in sorted(set(written.values())):
+        sizes["built"] += os.path.getsize(os.path.join(DIST, output))
+        if output.endswith(COMPRESSIBLE):
+            encodings = compress(output)
+            if encodings:
+                compressed[output] = encodings
+    
+    with open(os.path.join(DIST, AssetService.MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({
+            "files": {path: f"{AssetService.DIST_DIR}/{output}" for path, output in files.items()},
+            "bundles": {name: f"{AssetService.DIST_DIR}/{output}" for name, output in bundles.items()},
+            "compressed": compressed
+        }, f, indent=2, sort_keys=True)
+    return files, bundles, compressed, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, minified, precompressed static assets")
+    parser.add_argument('--lossless', action='store_true', help="never palette-quantize PNGs")
+    args = parser.parse_args()
+    
+    files, bundles, compressed, sizes = build(args.lossless)
+    for name, output in bundles.items():
+        path = os.path.join(DIST, output)
+        size = os.path.getsize(path)
+        br = os.path.getsize(path + '.br') if os.path.exists(path + '.br') else size
+        print(f"  {name:<8} -> {output} ({size / 1024:.1f} KB, {br / 1024:.1f} KB brotli)")
+    print(f"✅ {len(files)} static files -> {len(set(files.values()))} built files, "
+          f"{len(compressed)} precompressed; {sizes['source'] / 1024:.0f} KB -> {sizes['built'] / 1024:.0f} KB "
+          f"before compression")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
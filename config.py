@@ -5,11 +5,18 @@ load_dotenv()
 
 class Config:
     
+    # gevent workers (GUNICORN_WORKER_CLASS=gevent) hold thousands of requests per process;
+    # the concurrency defaults below are sized for whichever worker class is in use
+    COOPERATIVE = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread') == 'gevent'
+    
     # # Database configuration
     DB_HOST = os.environ.get('DB_HOST')
     DB_USER = os.environ.get('DB_USER')
     DB_PASSWORD = os.environ.get('DB_PASSWORD')
     DB_NAME = os.environ.get('DB_NAME')
+    DB_PORT = int(os.environ.get('DB_PORT', 3306))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 16))  # per process; cover gunicorn threads + background workers
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))  # seconds to wait for a free pooled connection
     
     # Flask configuration
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -22,9 +29,85 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
     
+    # Email outbox sender pool
+    EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', 2))
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+    
     # Groq API
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
     GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
+    GROQ_MAX_CONNECTIONS = int(os.environ.get('GROQ_MAX_CONNECTIONS', 2000 if COOPERATIVE else 100))
+    
+    # Fall back to the in-process question generator when Groq is unavailable
+    LOCAL_FALLBACK = os.environ.get('LOCAL_FALLBACK', 'True').lower() == 'true'
+    
+    # LLM telemetry: fraction of prompt/response pairs logged for offline replay
+    LLM_SAMPLE_RATE = float(os.environ.get('LLM_SAMPLE_RATE', 0))
+    LLM_SAMPLE_LOG = os.environ.get('LLM_SAMPLE_LOG', 'logs/llm_samples.jsonl')
+    
+    # Request tracing: fraction of requests traced (an upstream sampled traceparent is always honoured),
+    # exported as OTLP JSON to a file or an OTLP/HTTP collector (TRACE_EXPORTER=file|otlp)
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))
+    TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER') or None
+    TRACE_FILE = os.environ.get('TRACE_FILE', 'logs/traces.jsonl')
+    OTLP_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318')
+    
+    # On-demand profiling: requests carrying `X-Profile: <PROFILE_TOKEN>`, or hitting one of
+    # PROFILE_ENDPOINTS (comma-separated Flask endpoints), are sampled into logs/profiles/
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_ENDPOINTS = [e.strip() for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e.strip()]
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'logs/profiles')
+    
+    # Login identity cache: email -> user id/tier per process, so repeat logins skip the DB
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 10000))
+    IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', 300))
+    
+    # Analytics dashboard: sections of /analytics/dashboard run concurrently on DASHBOARD_WORKERS
+    # threads per process (each holds a pooled DB connection while it runs) and are cached per user
+    DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 4))
+    DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    DASHBOARD_TIMEOUT = float(os.environ.get('DASHBOARD_TIMEOUT', 10))
+    
+    # Sessions are stored with wall-clock times at this UTC offset (East Africa Time); daily rollups,
+    # streaks and "today" use the same calendar
+    STUDY_UTC_OFFSET_HOURS = float(os.environ.get('STUDY_UTC_OFFSET_HOURS', 3))
+    
+    # Filtered analytics: largest session selection accepted by /analytics/type-difficulty-filtered
+    ANALYTICS_MAX_SESSION_IDS = int(os.environ.get('ANALYTICS_MAX_SESSION_IDS', 20000))
+    
+    # Learning curves and mastery: each user's card outcomes are held as NumPy columns, up to
+    # ANALYTICS_CACHE_CARDS cards per process in total (about 15 bytes each)
+    ANALYTICS_CACHE_CARDS = int(os.environ.get('ANALYTICS_CACHE_CARDS', 2000000))
+    ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 600))
+    
+    # Spaced repetition: missed cards come back after REVIEW_RELEARN_MINUTES, remembered ones after
+    # growing intervals of at most REVIEW_MAX_INTERVAL_DAYS; /reviews/due serves REVIEW_QUIZ_SIZE cards
+    REVIEW_MAX_INTERVAL_DAYS = float(os.environ.get('REVIEW_MAX_INTERVAL_DAYS', 365))
+    REVIEW_RELEARN_MINUTES = float(os.environ.get('REVIEW_RELEARN_MINUTES', 10))
+    REVIEW_QUIZ_SIZE = int(os.environ.get('REVIEW_QUIZ_SIZE', 20))
+    
+    # Response compression: dynamic responses of at least COMPRESS_MIN_BYTES are sent brotli- or
+    # gzip-encoded, whichever the client prefers (static files are precompressed by build_assets.py)
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    
+    # Speculative prefetch of the next quiz (clients can also opt in per request)
+    SPECULATIVE_PREFETCH = os.environ.get('SPECULATIVE_PREFETCH', 'False').lower() == 'true'
+    PREFETCH_TTL = int(os.environ.get('PREFETCH_TTL', 300))
+    PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', 1))
+    PREFETCH_MAX_FOREGROUND = int(os.environ.get('PREFETCH_MAX_FOREGROUND', 4))
+    
+    # Admission control for generation requests
+    ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 2000 if COOPERATIVE else 8))
+    ADMISSION_PER_USER = int(os.environ.get('ADMISSION_PER_USER', 2))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 4000 if COOPERATIVE else 32))
+    ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get('ADMISSION_MAX_WAIT_SECONDS', 20))
+    
+    # Batch generation
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 10))
+    BATCH_PARALLELISM = int(os.environ.get('BATCH_PARALLELISM', 4))
     
     # Contact form destination
     CONTACT_DESTINATION_EMAIL = os.environ.get('CONTACT_DESTINATION_EMAIL')
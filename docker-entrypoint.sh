@@ -8,4 +8,9 @@ if [ -n "$DB_HOST" ]; then
   echo "MySQL is up."
 fi
 
+# Create/verify tables once per container start, before any worker boots
+if [ "${SKIP_DB_INIT:-false}" != "true" ]; then
+  python "$(dirname "$0")/init_db.py"
+fi
+
 exec "$@"
@@ -0,0 +1,72 @@
+"""
+Gunicorn settings for the container (`gunicorn -c gunicorn.conf.py`).
+
+Requests spend most of their time waiting on Groq, so each worker process runs
+a pool of threads (gthread) rather than relying on many processes. The app is
+built once in the master (preload) so workers share its imported code, and each
+worker opens its own DB pool and email senders after fork in post_worker_init.
+
+GUNICORN_WORKER_CLASS=gevent switches to cooperative workers: the stdlib is
+monkey-patched here, before the app is preloaded, so Groq (httpx), MySQL (pure
+driver, see Config.COOPERATIVE) and SMTP calls yield instead of blocking and one
+process can hold thousands of pending generations.
+
+Every value can be overridden from the environment.
+"""
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+import multiprocessing
+import shutil
+
+# Prometheus multiprocess mode: every worker writes its metrics under this directory and
+# /metrics merges them. It must be set before the app (and prometheus_client) is imported,
+# and is emptied on each start so counters from a previous run don't leak in.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/reviseai-metrics')
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+wsgi_app = "app:create_app(start_workers=False)"
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+
+# Processes for CPU (JSON, templates, local generator); threads for I/O waits
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 5)))
+# gthread: keep threads at or above ADMISSION_MAX_CONCURRENT so queued generations don't starve fast routes
+threads = int(os.environ.get('GUNICORN_THREADS', 12))
+# gevent: concurrent connections per worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 4000))
+
+preload_app = True
+
+# A generation with a top-up call can take well over 30s; batch streams run longer
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    # The master built the app; drop its DB connections before any worker is forked
+    server.app.wsgi().db.close_pool()
+
+
+def post_worker_init(worker):
+    from app import init_worker
+    init_worker(worker.wsgi)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (in-flight, pool, caches); its counters stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,18 @@
+"""
+Creates or migrates the database tables, then exits.
+
+Run once per deploy before starting the web server (the Docker entrypoint does
+this automatically), rather than on every app or gunicorn worker start:
+
+    python init_db.py
+"""
+import sys
+
+from models import Database
+
+db = Database()
+if db.pool is None or not db.initialize_database():
+    print("❌ Failed to initialize database tables")
+    sys.exit(1)
+
+print("✅ Database tables created/verified")
@@ -0,0 +1,63 @@
+"""
+orjson-backed JSON for Flask responses and request bodies.
+
+Dates and datetimes are written as ISO 8601 (naive MySQL DATETIMEs as UTC,
+which is how Flask's default provider treated them too), Decimals from
+AVG()/ROUND() as numbers, and RawJSON values, e.g. a JSON column straight
+from MySQL, are embedded as-is without being parsed and re-serialized.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Union
+import orjson
+from flask.json.provider import JSONProvider
+
+OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+class RawJSON:
+    """Already-serialized JSON to embed in a response unchanged"""
+    
+    __slots__ = ('json',)
+    
+    def __init__(self, value: Union[str, bytes, bytearray]):
+        self.json = bytes(value) if isinstance(value, bytearray) else value
+    
+    def load(self) -> Any:
+        """The parsed value, for code that needs to look inside"""
+        return orjson.loads(self.json)
+    
+    def __repr__(self) -> str:
+        return f"RawJSON({self.json!r})"
+
+def _default(o: Any) -> Any:
+    if isinstance(o, RawJSON):
+        return orjson.Fragment(o.json)
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider that serializes with orjson straight to bytes"""
+    
+    mimetype = "application/json"
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Jinja's |tojson passes sort_keys; anything else orjson can't honour goes to the stdlib
+        if kwargs.pop('sort_keys', False):
+            if not kwargs:
+                return orjson.dumps(obj, default=_default, option=OPTIONS | orjson.OPT_SORT_KEYS).decode()
+            kwargs['sort_keys'] = True
+        if kwargs:
+            return json.dumps(orjson.loads(orjson.dumps(obj, default=_default, option=OPTIONS)), **kwargs)
+        return orjson.dumps(obj, default=_default, option=OPTIONS).decode()
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=OPTIONS), mimetype=self.mimetype)
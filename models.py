@@ -1,44 +1,110 @@
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 from mysql.connector.pooling import MySQLConnectionPool
 from config import Config
+from tracing import span, trace_connection
+from json_provider import RawJSON
+import os
+import re
 import json
+import time
 from datetime import datetime, timedelta
 
 class Database:
+    # Indexes that CREATE TABLE IF NOT EXISTS won't add to tables created before them: (table, name, columns)
+    INDEXES = [
+        ("study_sessions", "idx_user_created", "(user_id, created_at)"),
+        ("studycards", "idx_session_breakdown", "(session_id, question_type, difficulty, is_correct)"),
+    ]
+    # FULLTEXT indexes behind search_sessions, added the same way
+    FULLTEXT_INDEXES = [
+        ("study_sessions", "ft_notes", "(notes)"),
+        ("studycards", "ft_question", "(question)"),
+    ]
+    # Filtered analytics: session selections larger than this are joined through a temporary table
+    FILTER_INLINE_IDS = 1000
+    # Streaks are walked through user_daily_stats this many days per read
+    STREAK_PAGE_DAYS = 60
+    # Upserts name their new rows (INSERT ... AS fresh / AS reviewed), which MySQL added in 8.0.19
+    MIN_MYSQL_VERSION = (8, 0, 19)
+    
     def __init__(self):
         self.config = {
             'host': Config.DB_HOST,
             'database': Config.DB_NAME,
             'user': Config.DB_USER,
-            'password': Config.DB_PASSWORD
+            'password': Config.DB_PASSWORD,
+            'port': Config.DB_PORT
         }
 
         if not all(self.config.values()):
             raise RuntimeError(f"Missing DB config: {self.config}")
     
-        # Initialize connection pool
+        self.pool = self._create_pool()
+    
+    def _create_pool(self):
+        """Open a connection pool owned by the current process"""
+        self.pid = os.getpid()
         try:
-            self.pool = MySQLConnectionPool(
+            pool = MySQLConnectionPool(
                 pool_name="reviseAI_pool",
-                pool_size=5,
+                pool_size=Config.DB_POOL_SIZE,
                 pool_reset_session=True,
+                # The C extension blocks the whole process; the pure driver yields under gevent
+                use_pure=Config.COOPERATIVE,
                 **self.config
             )
-            print(f"✅ Database pool initialized for {Config.DB_HOST}")
+            print(f"✅ Database pool initialized for {Config.DB_HOST} (pid {self.pid})")
+            return pool
         except Error as e:
             print(f"❌ Database connection error: {e}")
             print(f"Config: host={Config.DB_HOST}, db={Config.DB_NAME}, user={Config.DB_USER}")
-            self.pool = None
+            return None
+    
+    def close_pool(self):
+        """Close this process's idle pooled connections, e.g. in the gunicorn master before forking"""
+        if self.pool is not None:
+            self.pool._remove_connections()
+    
+    def pool_stats(self):
+        """Size and idle connections of this process's pool"""
+        if self.pool is None or self.pid != os.getpid():
+            return {"size": 0, "idle": 0}
+        return {"size": self.pool.pool_size, "idle": self.pool._cnx_queue.qsize()}
     
     def get_connection(self):
         """Get a connection from the pool"""
         if self.pool is None:
             return None
-        try:
-            return self.pool.get_connection()
-        except Error as e:
-            print(f"Error getting connection from pool: {e}")
-            return None
+        # Sockets inherited across fork are shared with the parent; reconnect in each worker
+        if self.pid != os.getpid():
+            self.pool = self._create_pool()
+            if self.pool is None:
+                return None
+        with span("db.acquire") as acquire_span:
+            return trace_connection(self._acquire(acquire_span))
+    
+    def _acquire(self, acquire_span=None):
+        # An exhausted pool raises immediately; wait briefly for a connection to be returned
+        deadline = time.monotonic() + Config.DB_POOL_TIMEOUT
+        delay = 0.005
+        retries = 0
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                if acquire_span is not None:
+                    acquire_span.attributes["db.pool_retries"] = retries
+                return connection
+            except PoolError as e:
+                if time.monotonic() >= deadline:
+                    print(f"Error getting connection from pool: {e}")
+                    return None
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+                retries += 1
+            except Error as e:
+                print(f"Error getting connection from pool: {e}")
+                return None
 
     def execute_query(self, query, params=None):
         """Run INSERT/UPDATE/DELETE queries"""
@@ -132,6 +198,12 @@ class Database:
         
         try:
             cursor = connection.cursor()
+            
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()[0]
+            if not self._version_supported(version):
+                print(f"❌ MySQL {'.'.join(map(str, self.MIN_MYSQL_VERSION))} or later is required; the server is {version}")
+                return False
 
             # --- Users table ---
             cursor.execute("""
@@ -158,7 +230,9 @@ class Database:
                     session_duration FLOAT,
                     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
                     INDEX idx_user_id (user_id),
-                    INDEX idx_created_at (created_at)
+                    INDEX idx_created_at (created_at),
+                    INDEX idx_user_created (user_id, created_at),
+                    FULLTEXT INDEX ft_notes (notes)
                 ) ENGINE=InnoDB
             """)
 
@@ -176,10 +250,104 @@ class Database:
                     difficulty VARCHAR(20) DEFAULT 'normal',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (session_id) REFERENCES study_sessions(id) ON DELETE CASCADE,
-                    INDEX idx_session_id (session_id)
+                    INDEX idx_session_id (session_id),
+                    INDEX idx_session_breakdown (session_id, question_type, difficulty, is_correct),
+                    FULLTEXT INDEX ft_question (question)
+                ) ENGINE=InnoDB
+            """)
+
+            # --- Daily rollups per user, kept current on save/delete (refresh_daily_stats) ---
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_daily_stats (
+                    user_id INT NOT NULL,
+                    day DATE NOT NULL,
+                    sessions INT NOT NULL DEFAULT 0,
+                    questions INT NOT NULL DEFAULT 0,
+                    correct INT NOT NULL DEFAULT 0,
+                    study_seconds DOUBLE NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, day),
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                ) ENGINE=InnoDB
+            """)
+
+            # --- Longest streak and days studied per user, kept with the rollups ---
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_streaks (
+                    user_id INT PRIMARY KEY,
+                    longest_streak INT NOT NULL DEFAULT 0,
+                    active_days INT NOT NULL DEFAULT 0,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                ) ENGINE=InnoDB
+            """)
+
+            # --- Spaced-repetition state per answered card (ReviewService) ---
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS card_reviews (
+                    card_id INT PRIMARY KEY,
+                    user_id INT NOT NULL,
+                    repetitions INT NOT NULL DEFAULT 0,
+                    interval_days DOUBLE NOT NULL DEFAULT 0,
+                    ease DOUBLE NOT NULL DEFAULT 2.5,
+                    lapses INT NOT NULL DEFAULT 0,
+                    due_at DATETIME NOT NULL,
+                    last_reviewed_at DATETIME NOT NULL,
+                    FOREIGN KEY (card_id) REFERENCES studycards(id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                    INDEX idx_user_due (user_id, due_at)
+                ) ENGINE=InnoDB
+            """)
+            
+            # --- LLM token usage per user and day ---
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS llm_usage (
+                    user_id INT NOT NULL,
+                    usage_date DATE NOT NULL,
+                    model VARCHAR(64) NOT NULL,
+                    calls INT DEFAULT 0,
+                    prompt_tokens BIGINT DEFAULT 0,
+                    completion_tokens BIGINT DEFAULT 0,
+                    total_tokens BIGINT DEFAULT 0,
+                    PRIMARY KEY (user_id, usage_date, model),
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                ) ENGINE=InnoDB
+            """)
+
+            # --- Email outbox ---
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    subject VARCHAR(255) NOT NULL,
+                    sender VARCHAR(255),
+                    recipients JSON NOT NULL,
+                    body TEXT NOT NULL,
+                    reply_to VARCHAR(255),
+                    status VARCHAR(20) DEFAULT 'pending',
+                    attempts INT DEFAULT 0,
+                    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    claimed_by VARCHAR(64),
+                    claimed_at TIMESTAMP NULL,
+                    last_error VARCHAR(500),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP NULL,
+                    INDEX idx_status_next (status, next_attempt_at),
+                    INDEX idx_claimed_by (claimed_by)
                 ) ENGINE=InnoDB
             """)
 
+            self._add_missing_indexes(cursor)
+            
+            # Databases from before the rollups existed get them built once from their sessions
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM user_daily_stats), EXISTS(SELECT 1 FROM study_sessions)")
+            has_rollups, has_sessions = cursor.fetchone()
+            if has_sessions and not has_rollups:
+                print("Building daily rollups from existing sessions")
+                self._rebuild_daily_stats(cursor)
+            elif has_rollups:
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM user_streaks)")
+                if not cursor.fetchone()[0]:
+                    print("Building streaks from the daily rollups")
+                    self._rebuild_streaks(cursor, 0, 2 ** 31 - 1)
+            
             connection.commit()
             print("✅ Database initialized successfully")
             return True
@@ -193,8 +361,32 @@ class Database:
             if connection:
                 connection.close()
 
+    def _version_supported(self, version):
+        """Whether a VERSION() string is MySQL at MIN_MYSQL_VERSION or later (MariaDB has no row aliases)"""
+        if 'mariadb' in version.lower():
+            return False
+        parts = re.match(r'(\d+)\.(\d+)\.(\d+)', version)
+        return bool(parts) and tuple(int(p) for p in parts.groups()) >= self.MIN_MYSQL_VERSION
+
+    def _add_missing_indexes(self, cursor):
+        """Add INDEXES and FULLTEXT_INDEXES to tables created by an older version of the schema"""
+        cursor.execute("""
+            SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        existing = {(table, name) for table, name in cursor.fetchall()}
+        for table, name, columns in self.INDEXES:
+            if (table, name) not in existing:
+                print(f"Adding index {name} to {table}")
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} {columns}")
+        for table, name, columns in self.FULLTEXT_INDEXES:
+            if (table, name) not in existing:
+                # Rebuilds the table the first time; can take a while on a large one
+                print(f"Adding full-text index {name} to {table}")
+                cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} {columns}")
+
     def get_or_create_user(self, email):
-        """Get user by email, create if not exists"""
+        """Get user by email, create if not exists; concurrent first logins resolve to the same row"""
         # Don't allow anonymous email
         if not email or email.strip() == '' or email == 'anonymous@example.com':
             return None
@@ -213,12 +405,14 @@ class Database:
             if user:
                 return user
             
-            cursor.execute("INSERT INTO users (email) VALUES (%s)", (email,))
+            # One atomic upsert: if a simultaneous login inserted the email first, LAST_INSERT_ID(id)
+            # hands back that row's id instead of failing on the UNIQUE key. Either way it is a new
+            # user, so the tier is the column default.
+            cursor.execute(
+                "INSERT INTO users (email) VALUES (%s) ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)",
+                (email,))
             connection.commit()
-            user_id = cursor.lastrowid
-            
-            cursor.execute("SELECT id, email, subscription_tier FROM users WHERE id = %s", (user_id,))
-            return cursor.fetchone()
+            return {"id": cursor.lastrowid, "email": email, "subscription_tier": "free"}
             
         except Error as e:
             print(f"Error getting/creating user: {e}")
@@ -229,6 +423,111 @@ class Database:
             if connection and connection.is_connected():
                 connection.close()
 
+    def add_llm_usage(self, usage):
+        """
+        Accumulate LLM token usage into the users' daily rows in one statement: usage is
+        (user_id, model, calls, prompt_tokens, completion_tokens, total_tokens) tuples.
+        """
+        if not usage:
+            return True
+        rows = ','.join(["(%s, CURDATE(), %s, %s, %s, %s, %s)"] * len(usage))
+        query = f"""
+            INSERT INTO llm_usage 
+            (user_id, usage_date, model, calls, prompt_tokens, completion_tokens, total_tokens)
+            VALUES {rows}
+            ON DUPLICATE KEY UPDATE
+                calls = calls + VALUES(calls),
+                prompt_tokens = prompt_tokens + VALUES(prompt_tokens),
+                completion_tokens = completion_tokens + VALUES(completion_tokens),
+                total_tokens = total_tokens + VALUES(total_tokens)
+        """
+        return self.execute_query(query, [value for row in usage for value in row]) is not None
+
+    def enqueue_email(self, subject, sender, recipients, body, reply_to=None):
+        """Store an outgoing email in the outbox; returns its id"""
+        query = """
+            INSERT INTO email_outbox (subject, sender, recipients, body, reply_to)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        return self.execute_query(query, (subject[:255], sender, json.dumps(recipients), body, reply_to))
+
+    def claim_outbox_batch(self, claim_token, limit, stale_minutes=10):
+        """
+        Atomically claim up to `limit` due emails for one sender.
+        Rows left in 'sending' by a crashed process are reclaimed after `stale_minutes`.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return []
+
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                UPDATE email_outbox
+                SET status = 'sending', claimed_by = %s, claimed_at = NOW()
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'sending' AND claimed_at < NOW() - INTERVAL %s MINUTE)
+                ORDER BY id
+                LIMIT %s
+            """, (claim_token, stale_minutes, limit))
+            connection.commit()
+
+            if cursor.rowcount == 0:
+                return []
+
+            cursor.execute("""
+                SELECT id, subject, sender, recipients, body, reply_to, attempts
+                FROM email_outbox
+                WHERE claimed_by = %s AND status = 'sending'
+                ORDER BY id
+            """, (claim_token,))
+            emails = cursor.fetchall()
+            for email in emails:
+                email['recipients'] = json.loads(email['recipients'])
+            return emails
+
+        except Error as e:
+            print(f"Error claiming outbox batch: {e}")
+            connection.rollback()
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def mark_email_sent(self, email_id):
+        query = """
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = NOW(), attempts = attempts + 1, claimed_by = NULL
+            WHERE id = %s
+        """
+        return self.execute_query(query, (email_id,))
+
+    def mark_email_failed(self, email_id, error, retry_in_seconds=None):
+        """Schedule a retry after `retry_in_seconds`, or give up when it is None"""
+        if retry_in_seconds is None:
+            query = """
+                UPDATE email_outbox
+                SET status = 'failed', attempts = attempts + 1, last_error = %s, claimed_by = NULL
+                WHERE id = %s
+            """
+            return self.execute_query(query, (str(error)[:500], email_id))
+
+        query = """
+            UPDATE email_outbox
+            SET status = 'pending', attempts = attempts + 1, last_error = %s, claimed_by = NULL,
+                next_attempt_at = NOW() + INTERVAL %s SECOND
+            WHERE id = %s
+        """
+        return self.execute_query(query, (str(error)[:500], int(retry_in_seconds), email_id))
+
+    def get_outbox_stats(self):
+        """Count outbox rows by status"""
+        rows = self.fetch_all("SELECT status, COUNT(*) AS count FROM email_outbox GROUP BY status")
+        return {row['status']: row['count'] for row in rows}
+
     def save_flashcards(self, session_id, flashcards):
         """Save flashcards for a session with type and difficulty"""
         try:
@@ -263,6 +562,11 @@ class Database:
                 )
                 self.execute_query(query, params)
             
+            session = self.fetch_one("SELECT user_id, DATE(created_at) AS day FROM study_sessions WHERE id = %s",
+                                     (session_id,))
+            if session and session['user_id'] and session['day']:
+                self.refresh_daily_stats(session['user_id'], session['day'])
+            
             return True
             
         except Error as e:
@@ -317,7 +621,19 @@ class Database:
             })
 
         return {"status": "success", "sessions": formatted_sessions}
-    
+
+    def get_sessions_version(self, user_id):
+        """
+        (session count, newest session id) for a user, from idx_user_id alone. Sessions are only
+        ever inserted or deleted, so this changes whenever anything derived from them does, in every
+        process. None on error.
+        """
+        row = self.fetch_one("""
+            SELECT COUNT(*) AS sessions, COALESCE(MAX(id), 0) AS last_id
+            FROM study_sessions WHERE user_id = %s
+        """, (user_id,))
+        return (row['sessions'], row['last_id']) if row else None
+
     def get_user_sessions_with_analytics(self, user_id):
         """
         Get sessions for a user with analytics data.
@@ -440,8 +756,8 @@ class Database:
             
             studycards = cursor.fetchall()
             for card in studycards:
-                # Parse JSON options into Python list
-                card['options'] = json.loads(card['options'])
+                # Options are sent to the client exactly as stored; RawJSON.load() parses them if needed
+                card['options'] = RawJSON(card['options'])
             
             return studycards
             
@@ -464,8 +780,13 @@ class Database:
         try:
             cursor = connection.cursor()
             
+            cursor.execute("SELECT user_id, DATE(created_at) FROM study_sessions WHERE id = %s", (session_id,))
+            session = cursor.fetchone()
             cursor.execute("DELETE FROM studycards WHERE session_id = %s", (session_id,))
             cursor.execute("DELETE FROM study_sessions WHERE id = %s", (session_id,))
+            # Same transaction, so the day's rollup never counts a deleted session
+            if session and session[0] and session[1]:
+                self._refresh_daily_stats(cursor, session[0], session[1])
             connection.commit()
             
             return True
@@ -485,6 +806,55 @@ class Database:
         Get aggregated analytics by question type and difficulty for a user.
         Returns a dictionary with 'question_types' and 'difficulties' keys.
         """
+        return self.get_filtered_breakdown(user_id)
+
+    def get_filtered_breakdown(self, user_id, session_ids=None, date_from=None, date_to=None,
+                               question_types=None, difficulties=None, latest=None, inline_limit=None):
+        """
+        Questions answered and correct per question_type and per difficulty over the user's
+        sessions that match every given filter (None means no filter on that field).
+        Returns {'question_types': [...], 'difficulties': [...]} in the shape of
+        get_analytics_type_difficulty(), or None on error.
+        
+        Both groupings come from one GROUP BY question_type, difficulty over the user's
+        (user_id, created_at) index range. session_ids only narrow that range, so ids of
+        other users' sessions match nothing; selections over inline_limit ids
+        (FILTER_INLINE_IDS) are joined through a temporary table instead of an IN list.
+        latest keeps only the user's latest most recent sessions in the date range, the
+        analytics page's "show last N sessions".
+        """
+        if inline_limit is None:
+            inline_limit = self.FILTER_INLINE_IDS
+        
+        joins, conditions, params = [], ["ss.user_id = %s"], [user_id]
+        if date_from is not None:
+            conditions.append("ss.created_at >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("ss.created_at < %s")
+            params.append(date_to)
+        if latest is not None:
+            # The same index range, newest first; its parameters precede the WHERE clause's
+            joins.append(f"""JOIN (SELECT id FROM study_sessions ss WHERE {' AND '.join(conditions)}
+                              ORDER BY ss.created_at DESC LIMIT %s) recent ON recent.id = ss.id""")
+            params = params + [latest] + params
+        for column, values in (("question_type", question_types), ("difficulty", difficulties)):
+            if values is not None:
+                if not values:
+                    return {'question_types': [], 'difficulties': []}
+                conditions.append(f"sc.{column} IN ({','.join(['%s'] * len(values))})")
+                params.extend(values)
+        
+        temporary = session_ids is not None and len(session_ids) > inline_limit
+        if session_ids is not None:
+            if not session_ids:
+                return {'question_types': [], 'difficulties': []}
+            if temporary:
+                joins.append("JOIN selected_sessions sel ON sel.id = ss.id")
+            else:
+                conditions.append(f"ss.id IN ({','.join(['%s'] * len(session_ids))})")
+                params.extend(session_ids)
+        
         connection = self.get_connection()
         if connection is None:
             return None
@@ -492,40 +862,572 @@ class Database:
         cursor = None
         try:
             cursor = connection.cursor(dictionary=True)
+            if temporary:
+                # Per connection, and dropped again below before it goes back to the pool
+                cursor.execute("CREATE TEMPORARY TABLE selected_sessions (id INT PRIMARY KEY) ENGINE=MEMORY")
+                batch = self.FILTER_INLINE_IDS
+                for start in range(0, len(session_ids), batch):
+                    cursor.executemany("INSERT IGNORE INTO selected_sessions (id) VALUES (%s)",
+                                       [(i,) for i in session_ids[start:start + batch]])
             
-            # Get question type analytics
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
                     sc.question_type,
+                    sc.difficulty,
                     COUNT(*) as total_questions,
                     SUM(CASE WHEN sc.is_correct = 1 THEN 1 ELSE 0 END) as correct_answers
-                FROM studycards sc
-                JOIN study_sessions ss ON sc.session_id = ss.id
-                WHERE ss.user_id = %s
-                GROUP BY sc.question_type
+                FROM study_sessions ss
+                {' '.join(joins)}
+                JOIN studycards sc ON sc.session_id = ss.id
+                WHERE {' AND '.join(conditions)}
+                GROUP BY sc.question_type, sc.difficulty
+            """, params)
+            rows = cursor.fetchall()
+            
+        except Error as e:
+            print(f"Error getting filtered analytics: {e}")
+            return None
+        finally:
+            if cursor:
+                if temporary:
+                    try:
+                        cursor.execute("DROP TEMPORARY TABLE IF EXISTS selected_sessions")
+                    except Error as e:
+                        print(f"Error dropping selected_sessions: {e}")
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+        
+        # Fold the cross-tabulation into the two groupings
+        totals = {'question_type': {}, 'difficulty': {}}
+        for row in rows:
+            for column, groups in totals.items():
+                total, correct = groups.get(row[column], (0, 0))
+                groups[row[column]] = (total + row['total_questions'], correct + int(row['correct_answers'] or 0))
+        return {
+            key: [{column: value, 'total_questions': total, 'correct_answers': correct}
+                  for value, (total, correct) in totals[column].items()]
+            for key, column in (('question_types', 'question_type'), ('difficulties', 'difficulty'))
+        }
+
+    def refresh_daily_stats(self, user_id, day):
+        """Recompute a user's user_daily_stats row for one day from their sessions on that day"""
+        connection = self.get_connection()
+        if connection is None:
+            return False
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._refresh_daily_stats(cursor, user_id, day)
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error refreshing daily stats: {e}")
+            connection.rollback()
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def _refresh_daily_stats(self, cursor, user_id, day):
+        was_active = self._studied_on(cursor, user_id, day)
+        # A range read of one user's day (idx_user_created); days left with no sessions keep a zero row
+        cursor.execute("""
+            INSERT INTO user_daily_stats (user_id, day, sessions, questions, correct, study_seconds)
+            SELECT * FROM (
+                SELECT %s AS user_id, %s AS day, COUNT(*) AS sessions,
+                       COALESCE(SUM(questions), 0) AS questions, COALESCE(SUM(correct), 0) AS correct,
+                       COALESCE(SUM(study_seconds), 0) AS study_seconds
+                FROM (
+                    SELECT COALESCE(ss.session_duration, 0) AS study_seconds, COUNT(sc.id) AS questions,
+                           COALESCE(SUM(sc.is_correct = 1), 0) AS correct
+                    FROM study_sessions ss
+                    LEFT JOIN studycards sc ON sc.session_id = ss.id
+                    WHERE ss.user_id = %s AND ss.created_at >= %s AND ss.created_at < %s + INTERVAL 1 DAY
+                    GROUP BY ss.id
+                ) per_session
+            ) AS fresh
+            ON DUPLICATE KEY UPDATE sessions = fresh.sessions, questions = fresh.questions,
+                                    correct = fresh.correct, study_seconds = fresh.study_seconds
+        """, (user_id, day, user_id, day, day))
+        
+        is_active = self._studied_on(cursor, user_id, day)
+        if is_active and not was_active:
+            # A new study day joins the runs on either side of it
+            run = (self._streak_length(cursor, user_id, day, -1)
+                   + self._streak_length(cursor, user_id, day + timedelta(days=1), 1))
+            cursor.execute("""
+                INSERT INTO user_streaks (user_id, longest_streak, active_days) VALUES (%s, %s, 1)
+                ON DUPLICATE KEY UPDATE longest_streak = GREATEST(longest_streak, %s), active_days = active_days + 1
+            """, (user_id, run, run))
+        elif was_active and not is_active:
+            # A day emptied by deleting its sessions may have split the longest run; recount this user
+            self._rebuild_streaks(cursor, user_id, user_id)
+
+    def _studied_on(self, cursor, user_id, day):
+        cursor.execute("SELECT sessions FROM user_daily_stats WHERE user_id = %s AND day = %s", (user_id, day))
+        rows = cursor.fetchall()
+        return bool(rows and rows[0][0])
+
+    def _streak_length(self, cursor, user_id, day, step):
+        """Consecutive study days from day (inclusive) going back (step -1) or forward (step 1)"""
+        length = 0
+        while True:
+            first = day + timedelta(days=step * length)
+            last = first + timedelta(days=step * (self.STREAK_PAGE_DAYS - 1))
+            cursor.execute(f"""
+                SELECT day FROM user_daily_stats
+                WHERE user_id = %s AND day BETWEEN %s AND %s AND sessions > 0
+                ORDER BY day {'DESC' if step < 0 else 'ASC'}
+            """, (user_id, min(first, last), max(first, last)))
+            found = 0
+            for (active,) in cursor.fetchall():
+                if active != first + timedelta(days=step * found):
+                    break
+                found += 1
+            length += found
+            if found < self.STREAK_PAGE_DAYS:
+                return length
+
+    def rebuild_daily_stats(self, first_user_id=None, last_user_id=None):
+        """Rebuild user_daily_stats from study_sessions/studycards for a range of user ids (all by default)"""
+        connection = self.get_connection()
+        if connection is None:
+            return False
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._rebuild_daily_stats(cursor, first_user_id, last_user_id)
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error rebuilding daily stats: {e}")
+            connection.rollback()
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def _rebuild_daily_stats(self, cursor, first_user_id=None, last_user_id=None):
+        bounds = (first_user_id or 0, last_user_id if last_user_id is not None else 2 ** 31 - 1)
+        cursor.execute("DELETE FROM user_daily_stats WHERE user_id BETWEEN %s AND %s", bounds)
+        cursor.execute("""
+            INSERT INTO user_daily_stats (user_id, day, sessions, questions, correct, study_seconds)
+            SELECT user_id, day, COUNT(*), SUM(questions), SUM(correct), SUM(study_seconds)
+            FROM (
+                SELECT ss.user_id, DATE(ss.created_at) AS day, COALESCE(ss.session_duration, 0) AS study_seconds,
+                       COUNT(sc.id) AS questions, COALESCE(SUM(sc.is_correct = 1), 0) AS correct
+                FROM study_sessions ss
+                LEFT JOIN studycards sc ON sc.session_id = ss.id
+                WHERE ss.user_id BETWEEN %s AND %s AND ss.created_at IS NOT NULL
+                GROUP BY ss.id
+            ) per_session
+            GROUP BY user_id, day
+        """, bounds)
+        self._rebuild_streaks(cursor, *bounds)
+
+    def _rebuild_streaks(self, cursor, first_user_id, last_user_id):
+        bounds = (first_user_id, last_user_id)
+        cursor.execute("DELETE FROM user_streaks WHERE user_id BETWEEN %s AND %s", bounds)
+        # Consecutive days share TO_DAYS(day) minus their position, so each island is one run
+        cursor.execute("""
+            INSERT INTO user_streaks (user_id, longest_streak, active_days)
+            SELECT user_id, MAX(run), SUM(run)
+            FROM (
+                SELECT user_id, COUNT(*) AS run
+                FROM (
+                    SELECT user_id, TO_DAYS(day) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS island
+                    FROM user_daily_stats
+                    WHERE user_id BETWEEN %s AND %s AND sessions > 0
+                ) active
+                GROUP BY user_id, island
+            ) runs
+            GROUP BY user_id
+        """, bounds)
+
+    def get_daily_stats(self, user_id, start, end):
+        """A user's user_daily_stats rows for days start..end inclusive, oldest first (None on error)"""
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT day, sessions, questions, correct, study_seconds
+                FROM user_daily_stats
+                WHERE user_id = %s AND day BETWEEN %s AND %s AND sessions > 0
+                ORDER BY day
+            """, (user_id, start, end))
+            return cursor.fetchall()
+            
+        except Error as e:
+            print(f"Error getting daily stats: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def get_streak(self, user_id, today):
+        """
+        A user's streak as of today: {'current', 'longest', 'active_days', 'last_study_day'}, or None
+        on error. The current run is walked back from the last study day, and only counts if
+        that was today or yesterday (today isn't over yet); longest and active_days are the
+        stored user_streaks values, so the read never covers the whole history.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT day FROM user_daily_stats
+                WHERE user_id = %s AND sessions > 0
+                ORDER BY day DESC
+                LIMIT 1
             """, (user_id,))
-            type_data = cursor.fetchall()
+            rows = cursor.fetchall()
+            last = rows[0][0] if rows else None
+            current = self._streak_length(cursor, user_id, last, -1) if last and (today - last).days <= 1 else 0
             
-            # Get difficulty analytics
+            cursor.execute("SELECT longest_streak, active_days FROM user_streaks WHERE user_id = %s", (user_id,))
+            rows = cursor.fetchall()
+            longest, active_days = rows[0] if rows else (0, 0)
+            return {"current": current, "longest": longest, "active_days": active_days, "last_study_day": last}
+            
+        except Error as e:
+            print(f"Error getting streak: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def get_card_outcomes(self, user_id):
+        """
+        Every card a user answered, oldest first, as plain tuples for columnar loading:
+        (session created_at as unix seconds, session_id, is_correct 0/1,
+         question_type index in ('mcq', 'tf'), difficulty index in ('normal', 'difficult')),
+        the indexes being 1-based with 0 for anything else. None on error.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
             cursor.execute("""
-                SELECT 
-                    sc.difficulty,
-                    COUNT(*) as total_questions,
-                    SUM(CASE WHEN sc.is_correct = 1 THEN 1 ELSE 0 END) as correct_answers
-                FROM studycards sc
-                JOIN study_sessions ss ON sc.session_id = ss.id
+                SELECT COALESCE(UNIX_TIMESTAMP(ss.created_at), 0), sc.session_id, COALESCE(sc.is_correct, 0),
+                       FIELD(sc.question_type, 'mcq', 'tf'), FIELD(sc.difficulty, 'normal', 'difficult')
+                FROM study_sessions ss
+                JOIN studycards sc ON sc.session_id = ss.id
                 WHERE ss.user_id = %s
-                GROUP BY sc.difficulty
+                ORDER BY ss.created_at, sc.id
             """, (user_id,))
-            difficulty_data = cursor.fetchall()
+            return cursor.fetchall()
             
-            return {
-                'question_types': type_data,
-                'difficulties': difficulty_data
-            }
+        except Error as e:
+            print(f"Error getting card outcomes: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def schedule_session_cards(self, session_id, correct_state, missed_state):
+        """
+        Start review state for a saved session's cards, reviewed now. The states are
+        (repetitions, interval_days, ease, lapses) for answered-correctly and missed cards.
+        Returns the number of cards scheduled, or None on error.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._insert_initial_reviews(cursor, "sc.session_id = %s", (session_id,), "NOW()",
+                                         correct_state, missed_state)
+            connection.commit()
+            return cursor.rowcount
+        
+        except Error as e:
+            print(f"Error scheduling session {session_id} cards: {e}")
+            connection.rollback()
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def _insert_initial_reviews(self, cursor, where, params, reviewed_at, correct_state, missed_state):
+        # Cards that already have review state are left alone
+        names = ("repetitions", "interval_days", "ease", "lapses")
+        states = [value for pair in zip(correct_state, missed_state) for value in pair]
+        cursor.execute(f"""
+            INSERT INTO card_reviews (card_id, user_id, repetitions, interval_days, ease, lapses, due_at, last_reviewed_at)
+            SELECT card_id, user_id, repetitions, interval_days, ease, lapses,
+                   reviewed_at + INTERVAL ROUND(interval_days * 86400) SECOND, reviewed_at
+            FROM (
+                SELECT sc.id AS card_id, ss.user_id, {reviewed_at} AS reviewed_at,
+                       {", ".join(f"IF(sc.is_correct = 1, %s, %s) AS {name}" for name in names)}
+                FROM studycards sc
+                JOIN study_sessions ss ON ss.id = sc.session_id
+                LEFT JOIN card_reviews cr ON cr.card_id = sc.id
+                WHERE {where} AND ss.user_id IS NOT NULL AND cr.card_id IS NULL
+            ) initial
+        """, (*states, *params))
+    
+    def get_due_cards(self, user_id, limit):
+        """A user's cards due for review, most overdue first, up to limit (None on error)"""
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            # A range of idx_user_due read in order, so LIMIT stops the scan however many cards are due
+            cursor.execute("""
+                SELECT cr.card_id, cr.due_at, cr.repetitions, cr.lapses, sc.session_id, sc.question,
+                       sc.options, sc.correct_answer, sc.question_type, sc.difficulty
+                FROM card_reviews cr
+                JOIN studycards sc ON sc.id = cr.card_id
+                WHERE cr.user_id = %s AND cr.due_at <= NOW()
+                ORDER BY cr.due_at
+                LIMIT %s
+            """, (user_id, limit))
+            cards = cursor.fetchall()
+            for card in cards:
+                card['options'] = RawJSON(card['options'])
+            return cards
+        
+        except Error as e:
+            print(f"Error getting due cards: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def get_review_summary(self, user_id):
+        """Cards due now, cards scheduled in total and the next due time after now (None on error)"""
+        return self.fetch_one("""
+            SELECT COUNT(*) AS scheduled, COALESCE(SUM(due_at <= NOW()), 0) AS due,
+                   MIN(IF(due_at > NOW(), due_at, NULL)) AS next_due_at
+            FROM card_reviews WHERE user_id = %s
+        """, (user_id,))
+    
+    def get_review_states(self, user_id, card_ids):
+        """Review state and correct answer of the given cards that belong to the user, by card id (None on error)"""
+        if not card_ids:
+            return {}
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            placeholders = ','.join(['%s'] * len(card_ids))
+            cursor.execute(f"""
+                SELECT cr.card_id, cr.repetitions, cr.interval_days, cr.ease, cr.lapses, sc.correct_answer
+                FROM card_reviews cr
+                JOIN studycards sc ON sc.id = cr.card_id
+                WHERE cr.card_id IN ({placeholders}) AND cr.user_id = %s
+            """, (*card_ids, user_id))
+            return {row['card_id']: row for row in cursor.fetchall()}
+        
+        except Error as e:
+            print(f"Error getting review states: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def save_review_states(self, user_id, states):
+        """
+        Store reviews made now in one statement: states are
+        (card_id, repetitions, interval_days, ease, lapses) tuples for cards the user owns.
+        """
+        if not states:
+            return True
+        connection = self.get_connection()
+        if connection is None:
+            return False
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            rows = ','.join(["(%s, %s, %s, %s, %s, %s, NOW() + INTERVAL ROUND(%s * 86400) SECOND, NOW())"] * len(states))
+            params = []
+            for card_id, repetitions, interval_days, ease, lapses in states:
+                params += (card_id, user_id, repetitions, interval_days, ease, lapses, interval_days)
+            cursor.execute(f"""
+                INSERT INTO card_reviews (card_id, user_id, repetitions, interval_days, ease, lapses, due_at, last_reviewed_at)
+                VALUES {rows} AS reviewed
+                ON DUPLICATE KEY UPDATE repetitions = reviewed.repetitions, interval_days = reviewed.interval_days,
+                                        ease = reviewed.ease, lapses = reviewed.lapses, due_at = reviewed.due_at,
+                                        last_reviewed_at = reviewed.last_reviewed_at
+            """, params)
+            connection.commit()
+            return True
+        
+        except Error as e:
+            print(f"Error saving review states: {e}")
+            connection.rollback()
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def reschedule_reviews(self, first_user_id, last_user_id, correct_state, missed_state, max_interval_days):
+        """
+        Bulk job for a range of user ids, in one transaction: schedule answered cards that have no
+        review state yet (as reviewed when their session was), and cap intervals at max_interval_days.
+        Returns (cards scheduled, reviews capped), or None on error.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._insert_initial_reviews(cursor, "ss.user_id BETWEEN %s AND %s", (first_user_id, last_user_id),
+                                         "COALESCE(ss.created_at, NOW())", correct_state, missed_state)
+            scheduled = cursor.rowcount
+            cursor.execute("""
+                UPDATE card_reviews
+                SET interval_days = %s, due_at = last_reviewed_at + INTERVAL ROUND(%s * 86400) SECOND
+                WHERE user_id BETWEEN %s AND %s AND interval_days > %s
+            """, (max_interval_days, max_interval_days, first_user_id, last_user_id, max_interval_days))
+            capped = cursor.rowcount
+            connection.commit()
+            return scheduled, capped
+        
+        except Error as e:
+            print(f"Error rescheduling reviews for users {first_user_id}-{last_user_id}: {e}")
+            connection.rollback()
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+    
+    def search_sessions(self, user_id, query, limit, offset):
+        """
+        A user's sessions whose notes or card questions match a boolean-mode full-text query,
+        best match first: (rows, total matching sessions), or None on error. A session's score
+        is its notes' relevance plus that of each matching question.
+        """
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            # Each MATCH is answered from its FULLTEXT index (ft_notes, ft_question); the user filter
+            # is applied to the index's hits, not by scanning the user's rows
+            search = """
+                SELECT ss.id, ss.title, ss.created_at, LEFT(ss.notes, 200) AS notes_preview, ss.session_duration,
+                       hits.score, hits.in_notes, hits.matched_questions, COUNT(*) OVER () AS total
+                FROM (
+                    SELECT session_id, SUM(score) AS score, MAX(card_id IS NULL) AS in_notes,
+                           COUNT(card_id) AS matched_questions
+                    FROM (
+                        SELECT ss.id AS session_id, NULL AS card_id,
+                               MATCH(ss.notes) AGAINST (%s IN BOOLEAN MODE) AS score
+                        FROM study_sessions ss
+                        WHERE MATCH(ss.notes) AGAINST (%s IN BOOLEAN MODE) AND ss.user_id = %s
+                        UNION ALL
+                        SELECT sc.session_id, sc.id, MATCH(sc.question) AGAINST (%s IN BOOLEAN MODE)
+                        FROM studycards sc
+                        JOIN study_sessions ss ON ss.id = sc.session_id
+                        WHERE MATCH(sc.question) AGAINST (%s IN BOOLEAN MODE) AND ss.user_id = %s
+                    ) matches
+                    GROUP BY session_id
+                ) hits
+                JOIN study_sessions ss ON ss.id = hits.session_id
+                ORDER BY hits.score DESC, ss.created_at DESC, ss.id DESC
+                LIMIT %s OFFSET %s
+            """
+            params = (query, query, user_id, query, query, user_id)
+            cursor.execute(search, (*params, limit, offset))
+            rows = cursor.fetchall()
+            if not rows and offset:
+                # Past the last page: the total still comes from the first row
+                cursor.execute(search, (*params, 1, 0))
+                first = cursor.fetchall()
+                return [], first[0]['total'] if first else 0
+            return rows, rows[0]['total'] if rows else 0
+            
+        except Error as e:
+            print(f"Error searching sessions: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection and connection.is_connected():
+                connection.close()
+
+    def get_matching_questions(self, session_ids, query, per_session):
+        """The best-matching card questions in each of the given sessions, by session id (None on error)"""
+        if not session_ids:
+            return {}
+        connection = self.get_connection()
+        if connection is None:
+            return None
+        
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            placeholders = ','.join(['%s'] * len(session_ids))
+            cursor.execute(f"""
+                SELECT session_id, id, question, score
+                FROM (
+                    SELECT sc.session_id, sc.id, sc.question,
+                           MATCH(sc.question) AGAINST (%s IN BOOLEAN MODE) AS score,
+                           ROW_NUMBER() OVER (PARTITION BY sc.session_id
+                                              ORDER BY MATCH(sc.question) AGAINST (%s IN BOOLEAN MODE) DESC, sc.id) AS place
+                    FROM studycards sc
+                    WHERE sc.session_id IN ({placeholders}) AND MATCH(sc.question) AGAINST (%s IN BOOLEAN MODE)
+                ) ranked
+                WHERE place <= %s
+                ORDER BY session_id, place
+            """, (query, query, *session_ids, query, per_session))
+            matches = {}
+            for row in cursor.fetchall():
+                matches.setdefault(row['session_id'], []).append(row)
+            return matches
             
         except Error as e:
-            print(f"Error getting analytics: {e}")
+            print(f"Error getting matching questions: {e}")
             return None
         finally:
             if cursor:
@@ -0,0 +1,51 @@
+"""
+Spaced-repetition bulk job: schedules reviews for answered cards that have
+none (cards saved before the scheduler existed, or whose scheduling failed)
+and applies the current REVIEW_MAX_INTERVAL_DAYS to existing schedules.
+
+Users are processed in id ranges of --batch-users, one transaction and a few
+set-based statements per range, never a statement per card. Safe to re-run
+and to interrupt; resume with --from-user.
+
+    python reschedule_reviews.py [--batch-users 500] [--from-user 1]
+"""
+import argparse
+import sys
+import time
+
+from config import Config
+from models import Database
+from services.review_service import ReviewService
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--batch-users', type=int, default=500, help="user ids per transaction")
+parser.add_argument('--from-user', type=int, default=None, help="first user id (default the lowest)")
+args = parser.parse_args()
+
+db = Database()
+if db.pool is None:
+    print("❌ No database connection")
+    sys.exit(1)
+
+review_service = ReviewService(db, max_interval_days=Config.REVIEW_MAX_INTERVAL_DAYS,
+                               relearn_minutes=Config.REVIEW_RELEARN_MINUTES)
+bounds = db.fetch_one("SELECT MIN(id) AS first, MAX(id) AS last FROM users")
+if not bounds or bounds['first'] is None:
+    print("No users to reschedule")
+    sys.exit(0)
+
+first = args.from_user if args.from_user is not None else bounds['first']
+scheduled = capped = 0
+started = time.perf_counter()
+while first <= bounds['last']:
+    last = first + args.batch_users - 1
+    result = review_service.reschedule(first, last)
+    if result is None:
+        print(f"❌ Failed at users {first}-{last}; resume with --from-user {first}")
+        sys.exit(1)
+    scheduled += result[0]
+    capped += result[1]
+    print(f"Users {first}-{min(last, bounds['last'])}: {result[0]} cards scheduled, {result[1]} intervals capped")
+    first = last + 1
+
+print(f"✅ {scheduled} cards scheduled, {capped} intervals capped in {time.perf_counter() - started:.1f}s")
@@ -1,5 +1,15 @@
 from services.ai_service import AIService
+from services.analytics_engine import AnalyticsEngine
+from services.asset_service import AssetService
+from services.compression_service import CompressionService
+from services.dashboard_service import DashboardService
 from services.session_service import SessionService
 from services.email_service import EmailService
+from services.local_generator import LocalQuestionGenerator
+from services.metrics_service import MetricsService
+from services.page_cache_service import PageCacheService
+from services.review_service import ReviewService
+from services.tracing_service import TracingService
+from services.trend_service import TrendService
 
-__all__ = ['AIService', 'SessionService', 'EmailService']
\ No newline at end of file
+__all__ = ['AIService', 'AnalyticsEngine', 'AssetService', 'CompressionService', 'DashboardService', 'SessionService', 'EmailService', 'LocalQuestionGenerator', 'MetricsService', 'PageCacheService', 'ReviewService', 'TracingService', 'TrendService']
\ No newline at end of file
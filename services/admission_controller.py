@@ -0,0 +1,171 @@
+import math
+import time
+import heapq
+import itertools
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional
+
+class AdmissionController:
+    """Caps in-flight generations globally and per user, queueing by tier and shedding under overload"""
+    
+    # Lower values are served first; unknown tiers are treated as free
+    TIER_PRIORITY = {"premium": 0, "pro": 0, "free": 1}
+    EWMA_ALPHA = 0.2
+    
+    def __init__(self, max_concurrent: int = 8, per_user_limit: int = 2, max_queue: int = 32,
+                 max_wait_seconds: float = 20, initial_latency_ms: float = 3000):
+        self.max_concurrent = max_concurrent
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.latency_ms = initial_latency_ms
+        self.lock = threading.Lock()
+        self.active = 0
+        self.per_user = Counter()
+        self.queue = []
+        self.queued_weight = Counter()  # priority -> weight waiting
+        self.seq = itertools.count()
+        self.counters = Counter()
+    
+    def acquire(self, user_id: Optional[int], tier: Optional[str] = "free", weight: int = 1) -> Dict[str, Any]:
+        """Block until a slot is free or the request is shed; returns an admission decision"""
+        weight = max(1, min(weight, self.per_user_limit, self.max_concurrent))
+        priority = self.TIER_PRIORITY.get(tier or "free", max(self.TIER_PRIORITY.values()))
+        
+        with self.lock:
+            if user_id is not None and self.per_user[user_id] + weight > self.per_user_limit:
+                self.counters['rejected_user_limit'] += 1
+                return self._reject(429, "Too many generations in progress", self._estimate_wait(weight))
+            
+            # Each waiter sleeps on its own event so a release wakes only the tickets it starts
+            ticket = {"user_id": user_id, "weight": weight, "priority": priority,
+                      "seq": next(self.seq), "state": "queued", "started": None,
+                      "event": threading.Event()}
+            
+            if not self.queue and self.active + weight <= self.max_concurrent:
+                return self._start(ticket)
+            
+            ahead = sum(w for p, w in self.queued_weight.items() if p <= priority)
+            wait = self._estimate_wait(ahead + weight)
+            if wait > self.max_wait_seconds:
+                self.counters['shed_latency'] += 1
+                return self._reject(503, "Generation service is busy", wait)
+            
+            if len(self.queue) >= self.max_queue and not self._evict_lower(priority):
+                self.counters['shed_queue_full'] += 1
+                return self._reject(503, "Generation service is busy", wait)
+            
+            heapq.heappush(self.queue, (priority, ticket['seq'], ticket))
+            self.queued_weight[priority] += weight
+            self._charge(ticket, 1)
+        
+        ticket['event'].wait(self.max_wait_seconds)
+        
+        with self.lock:
+            if ticket['state'] == "running":
+                return {"admitted": True, "ticket": ticket}
+            if ticket['state'] == "queued":
+                # Timed out while still waiting
+                self.queue = [entry for entry in self.queue if entry[2] is not ticket]
+                heapq.heapify(self.queue)
+                self._dequeue(ticket)
+                self.counters['shed_timeout'] += 1
+                self._dispatch()
+            return self._reject(503, "Generation service is busy", self._estimate_wait(weight))
+    
+    def try_acquire(self, weight: int = 1) -> Dict[str, Any]:
+        """Admit background work only if it can start now: never queues, waits or displaces a waiter
+        
+        The ticket is charged to no user, so it never counts against a user's own requests,
+        but it holds its slots against max_concurrent until released like any other.
+        """
+        weight = max(1, min(weight, self.max_concurrent))
+        with self.lock:
+            if self.queue or self.active + weight > self.max_concurrent:
+                self.counters['skipped_background'] += 1
+                return self._reject(503, "Generation service is busy", self._estimate_wait(weight))
+            ticket = {"user_id": None, "weight": weight, "priority": max(self.TIER_PRIORITY.values()) + 1,
+                      "seq": next(self.seq), "state": "queued", "started": None,
+                      "event": threading.Event()}
+            self.counters['admitted_background'] += 1
+            return self._start(ticket)
+    
+    def release(self, ticket: Optional[Dict[str, Any]], weight: Optional[int] = None) -> None:
+        """Free the ticket's slots, or `weight` of them; freeing the last folds its duration into the latency estimate"""
+        if not ticket:
+            return
+        with self.lock:
+            if ticket['state'] != "running":
+                return
+            weight = ticket['weight'] if weight is None else max(0, min(weight, ticket['weight']))
+            self.active -= weight
+            self._charge(ticket, -1, weight)
+            ticket['weight'] -= weight
+            if ticket['weight'] == 0:
+                ticket['state'] = "done"
+                elapsed_ms = (time.monotonic() - ticket['started']) * 1000
+                self.latency_ms = (1 - self.EWMA_ALPHA) * self.latency_ms + self.EWMA_ALPHA * elapsed_ms
+            self._dispatch()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "active": self.active,
+                "queued": len(self.queue),
+                "max_concurrent": self.max_concurrent,
+                "latency_ewma_ms": round(self.latency_ms, 1),
+                **self.counters
+            }
+    
+    def _start(self, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        ticket['state'] = "running"
+        ticket['started'] = time.monotonic()
+        self.active += ticket['weight']
+        self._charge(ticket, 1)
+        self.counters['admitted'] += 1
+        return {"admitted": True, "ticket": ticket}
+    
+    def _dispatch(self) -> None:
+        """Start queued tickets in priority order while capacity allows"""
+        while self.queue and self.active + self.queue[0][2]['weight'] <= self.max_concurrent:
+            _, _, ticket = heapq.heappop(self.queue)
+            self._dequeue(ticket)
+            self._start(ticket)
+            ticket['event'].set()
+    
+    def _dequeue(self, ticket: Dict[str, Any]) -> None:
+        self.queued_weight[ticket['priority']] -= ticket['weight']
+        self._charge(ticket, -1)
+    
+    def _charge(self, ticket: Dict[str, Any], sign: int, weight: Optional[int] = None) -> None:
+        if ticket['user_id'] is not None:
+            self.per_user[ticket['user_id']] += sign * (ticket['weight'] if weight is None else weight)
+            if self.per_user[ticket['user_id']] <= 0:
+                del self.per_user[ticket['user_id']]
+    
+    def _evict_lower(self, priority: int) -> bool:
+        """Shed the newest waiter of the lowest tier if it ranks below the newcomer"""
+        victim = max(self.queue, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        self.queue.remove(victim)
+        heapq.heapify(self.queue)
+        ticket = victim[2]
+        ticket['state'] = "shed"
+        self._dequeue(ticket)
+        self.counters['shed_evicted'] += 1
+        ticket['event'].set()
+        return True
+    
+    def _estimate_wait(self, queued_weight: int) -> float:
+        """Seconds until `queued_weight` more slots' worth of work could start"""
+        return self.latency_ms / 1000 * queued_weight / self.max_concurrent
+    
+    def _reject(self, status_code: int, message: str, wait_seconds: float) -> Dict[str, Any]:
+        return {
+            "admitted": False,
+            "status_code": status_code,
+            "message": message,
+            "retry_after": max(1, math.ceil(wait_seconds))
+        }
@@ -1,49 +1,213 @@
 import os
+import re
 import json
 import random
+import time
 import groq
+import httpx
 from typing import List, Dict, Optional, Tuple
+from services.model_router import ModelRouter
+from tracing import span, traced, KIND_CLIENT
+
+ITEMS_START_RE = re.compile(r'"q"\s*:\s*\[')
+
+# Outcomes that count against a model's health; parse failures do not
+ROUTER_FAILURES = ("api_error", "quota_exceeded", "empty_response")
 
 class AIService:
     """Handles all AI-related operations: API, prompt building, answer balancing"""
 
-    def __init__(self):
+    # Output token budget per question in the compact format (with headroom)
+    TOKENS_PER_QUESTION = {"mcq": 90, "tf": 40}
+    DIFFICULT_TOKEN_FACTOR = 1.3
+    RESPONSE_TOKEN_OVERHEAD = 20
+    MAX_RESPONSE_TOKENS = 2000
+
+    def __init__(self, telemetry=None, max_connections: int = 100):
         self.api_key = os.environ.get('GROQ_API_KEY')
         self.model = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
-        self.client = groq.Groq(api_key=self.api_key) if self.api_key else None
+        # Requests beyond max_connections wait for a free connection inside httpx
+        self.client = groq.Groq(
+            api_key=self.api_key,
+            http_client=groq.DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(max_connections, 100)
+            ))
+        ) if self.api_key else None
+        if self.client:
+            # Cached after the first call, which shells out to `uname`; warm it before concurrent use
+            self.client.platform_headers()
+        self.telemetry = telemetry
+        self.router = ModelRouter(
+            primary=self.model,
+            fast=os.environ.get('GROQ_FAST_MODEL', 'llama-3.1-8b-instant'),
+            short_notes_chars=int(os.environ.get('ROUTER_SHORT_NOTES_CHARS', 800)),
+            slow_ms=float(os.environ.get('ROUTER_SLOW_MS', 8000)),
+            max_error_rate=float(os.environ.get('ROUTER_MAX_ERROR_RATE', 0.5))
+        )
     
+    @traced("ai.generate_questions")
     def generate_questions(self, notes: str, num_questions: int = 6, 
-                          question_type: str = "mcq", difficulty: str = "normal") -> Tuple[Optional[List[Dict]], str]:
+                          question_type: str = "mcq", difficulty: str = "normal",
+                          user_id: Optional[int] = None) -> Tuple[Optional[List[Dict]], str]:
         """Generate quiz questions"""
         if not self.api_key:
             return None, "no_api_key"
         
         try:
             prompt = self._build_prompt(notes, num_questions, question_type, difficulty)
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=2000,
-                temperature=0.8,
-                response_format={"type": "json_object"},
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            if response and response.choices:
-                return self._process_response(response.choices[0].message.content, num_questions, question_type, difficulty)
-            return None, "empty_response"
+            questions, status, model = self._routed_request(prompt, notes, num_questions, question_type,
+                                                            difficulty, user_id)
+            # Nothing salvaged is a failed call; the router has already tried its fallbacks
+            if not questions:
+                return None, status
+            
+            # Ask only for what is missing instead of regenerating the whole set
+            if len(questions) < num_questions:
+                questions = self._top_up(questions, notes, num_questions, question_type, difficulty,
+                                         user_id, model)
+            
+            if question_type == "mcq" and len(questions) >= 2:
+                questions = self._balance_answers(questions)
+            
+            return questions, "success"
 
-        except groq.APIConnectionError:
-            return None, "api_error"
-        except groq.RateLimitError:
-            return None, "quota_exceeded"
-        except groq.AuthenticationError:
-            return None, "auth_error"
-        except groq.APIStatusError as e:
-            return None, "auth_error" if e.status_code == 401 else "api_error"
-        except Exception:
-            return None, "api_error"
+        except Exception as e:
+            return None, self._error_status(e)
+    
+    def _error_status(self, error: Exception) -> str:
+        """Map a Groq client exception to a generation status"""
+        if isinstance(error, groq.APIConnectionError):
+            return "api_error"
+        if isinstance(error, groq.RateLimitError):
+            return "quota_exceeded"
+        if isinstance(error, groq.AuthenticationError):
+            return "auth_error"
+        if isinstance(error, groq.APIStatusError):
+            return "auth_error" if error.status_code == 401 else "api_error"
+        return "api_error"
+    
+    def _routed_request(self, prompt: str, notes: str, num_questions: int, question_type: str,
+                        difficulty: str, user_id: Optional[int] = None) -> Tuple[Optional[List[Dict]], str, str]:
+        """Try the routed models in order, falling back when one errors or returns nothing"""
+        candidates = self.router.route(question_type, difficulty, len(notes))
+        for i, model in enumerate(candidates):
+            last = i == len(candidates) - 1
+            try:
+                questions, status = self._request(prompt, num_questions, question_type, difficulty, user_id,
+                                                  model=model, route="primary" if i == 0 else "fallback")
+            except Exception as e:
+                # A bad key fails the same way on every model
+                if last or self._error_status(e) == "auth_error":
+                    raise
+                continue
+            
+            if status in ROUTER_FAILURES and not last:
+                continue
+            return questions, status, model
+    
+    def _request(self, prompt: str, num_questions: int, question_type: str, difficulty: str,
+                 user_id: Optional[int] = None, parse_limit: Optional[int] = None,
+                 model: Optional[str] = None, route: str = "primary") -> Tuple[Optional[List[Dict]], str]:
+        """Run one completion, validate it and record telemetry for the call"""
+        model = model or self.model
+        started = time.perf_counter()
+        text, usage, questions, status = None, None, None, "api_error"
+        try:
+            text, usage = self._complete(prompt, self._max_tokens(num_questions, question_type, difficulty), model)
+            if text is None:
+                status = "empty_response"
+                return None, status
+            
+            questions, status = self._process_response(text, parse_limit or num_questions, question_type, difficulty)
+            return questions, status
+        
+        except Exception as e:
+            status = self._error_status(e)
+            raise
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.router.observe(model, latency_ms, ok=status not in ROUTER_FAILURES)
+            if self.telemetry:
+                self.telemetry.record_llm_call({
+                    "model": model,
+                    "route": route,
+                    "question_type": question_type,
+                    "difficulty": difficulty,
+                    "status": status,
+                    "latency_ms": latency_ms,
+                    "prompt_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+                    "completion_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+                    "total_tokens": getattr(usage, 'total_tokens', 0) or 0,
+                    "questions_requested": num_questions,
+                    "questions_valid": len(questions or []),
+                    "user_id": user_id,
+                    "prompt": prompt,
+                    "response": text
+                })
+    
+    def _complete(self, prompt: str, max_tokens: int,
+                  model: Optional[str] = None) -> Tuple[Optional[str], Optional[object]]:
+        """Run one chat completion and return its text and usage block"""
+        try:
+            with span("groq.chat.completions", KIND_CLIENT, **{
+                "llm.model": model or self.model,
+                "llm.max_tokens": max_tokens
+            }) as call_span:
+                response = self.client.chat.completions.create(
+                    model=model or self.model,
+                    max_tokens=max_tokens,
+                    temperature=0.8,
+                    response_format={"type": "json_object"},
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                usage = getattr(response, 'usage', None)
+                if call_span is not None and usage is not None:
+                    call_span.attributes["llm.prompt_tokens"] = usage.prompt_tokens or 0
+                    call_span.attributes["llm.completion_tokens"] = usage.completion_tokens or 0
+        except groq.BadRequestError as e:
+            # JSON mode rejects truncated output but still returns what was generated
+            failed = self._failed_generation(e)
+            if failed is None:
+                raise
+            return failed, None
+        
+        if response and response.choices:
+            return response.choices[0].message.content, getattr(response, 'usage', None)
+        return None, getattr(response, 'usage', None)
+    
+    def _failed_generation(self, error: "groq.BadRequestError") -> Optional[str]:
+        """Pull the partial output out of a json_validate_failed error"""
+        body = error.body if isinstance(error.body, dict) else {}
+        details = body.get('error', body)
+        if isinstance(details, dict) and details.get('code') == 'json_validate_failed':
+            return details.get('failed_generation')
+        return None
     
-    def _build_prompt(self, notes: str, num_questions: int, question_type: str, difficulty: str) -> str:
+    def _top_up(self, questions: List[Dict], notes: str, num_questions: int,
+                question_type: str, difficulty: str, user_id: Optional[int] = None,
+                model: Optional[str] = None) -> List[Dict]:
+        """Make one smaller request for the shortfall and merge new, valid questions"""
+        shortfall = num_questions - len(questions)
+        prompt = self._build_prompt(notes, shortfall, question_type, difficulty,
+                                    exclude=[q['question'] for q in questions])
+        try:
+            # Parse past the shortfall so duplicates can be replaced by later items
+            extra, _ = self._request(prompt, shortfall, question_type, difficulty, user_id,
+                                     parse_limit=num_questions, model=model, route="top_up")
+        except Exception as e:
+            print(f"Top-up request failed: {e}")
+            return questions
+        
+        seen = {q['question'].lower() for q in questions}
+        for q in extra or []:
+            if q['question'].lower() not in seen:
+                seen.add(q['question'].lower())
+                questions.append(q)
+        return questions[:num_questions]
+    
+    def _build_prompt(self, notes: str, num_questions: int, question_type: str, difficulty: str,
+                      exclude: Optional[List[str]] = None) -> str:
         """Build prompt"""
         truncated_notes = notes[:1500]
         
@@ -57,6 +221,18 @@ class AIService:
             "difficult": "Make questions more obscure, indirect, and challenging."
         }
         
+        output_formats = {
+            "mcq": '{"q":[["Question text",["Option A","Option B","Option C","Option D"],0]]}\n'
+                   'Each item is [question, 4 options, index of the correct option].',
+            "tf": '{"q":[["Statement",0]]}\n'
+                  'Each item is [statement, answer] where answer is 0 for True and 1 for False.'
+        }
+        
+        avoid = ""
+        if exclude:
+            listed = "\n".join(f"- {q[:120]}" for q in exclude)
+            avoid = f"\nDo not repeat or rephrase these existing questions:\n{listed}\n"
+        
         return f"""
 You are an expert educational assistant creating quiz questions.
 
@@ -68,45 +244,28 @@ REQUIREMENTS:
 {type_instructions.get(question_type, type_instructions['mcq'])}
 {difficulty_instructions.get(difficulty, difficulty_instructions['normal'])}
 
-OUTPUT FORMAT (JSON only, no extra text):
-{{
-  "questions": [
-    {{
-      "question": "Question text",
-      "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correctAnswer": 0
-    }}
-  ]
-}}
-
+OUTPUT FORMAT (compact JSON only, no extra text, no whitespace between items):
+{output_formats.get(question_type, output_formats['mcq'])}
+{avoid}
 INPUT CONTENT:
 {truncated_notes}
 """
     
+    @traced("ai.parse_response")
     def _process_response(self, response_text: str, num_questions: int, 
                           question_type: str, difficulty: str) -> Tuple[Optional[List[Dict]], str]:
-        """Process and validate API response"""
+        """Process and validate API response, keeping every complete item of a truncated one"""
         try:
-            json_str = self._extract_json(response_text)
-            if not json_str:
+            raw_questions = self._salvage_items(response_text)
+            if raw_questions is None:
                 return None, "invalid_response"
-            
-            questions_data = json.loads(json_str)
-            raw_questions = questions_data.get('questions', [])[:num_questions]
+            if not raw_questions:
+                return None, "parse_error"
             
             processed = []
-            for q in raw_questions:
-                if not all(k in q for k in ['question', 'options', 'correctAnswer']):
-                    continue
-                
-                options = q['options']
-                correct = q['correctAnswer']
-                expected_count = 4 if question_type == "mcq" else 2
-                
-                if len(options) != expected_count or not isinstance(correct, int) or correct >= len(options):
-                    continue
-                
-                if question_type == "tf" and options not in (["True", "False"], ["False", "True"]):
+            for item in raw_questions[:num_questions]:
+                q = self._parse_item(item, question_type)
+                if q is None:
                     continue
                 
                 q.update({"question_type": question_type, "difficulty": difficulty})
@@ -115,21 +274,63 @@ INPUT CONTENT:
             if not processed:
                 return None, "no_valid_questions"
             
-            if question_type == "mcq" and len(processed) >= 2:
-                processed = self._balance_answers(processed)
-            
             return processed, "success"
             
-        except json.JSONDecodeError:
-            return None, "parse_error"
         except Exception:
             return None, "process_error"
     
-    def _extract_json(self, text: str) -> Optional[str]:
-        """Extract JSON from response text"""
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        return text[start:end] if start >= 0 and end > start else None
+    def _salvage_items(self, text: str) -> Optional[List]:
+        """Decode items of the "q" array one by one, stopping at the first incomplete one"""
+        match = ITEMS_START_RE.search(text)
+        if not match:
+            return None
+        
+        decoder = json.JSONDecoder()
+        items = []
+        pos = match.end()
+        while True:
+            while pos < len(text) and text[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(text) or text[pos] == ']':
+                break
+            try:
+                item, pos = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break
+            items.append(item)
+        return items
+    
+    def _parse_item(self, item, question_type: str) -> Optional[Dict]:
+        """Validate one positional item and expand it to the question schema"""
+        if question_type == "tf":
+            if not isinstance(item, list) or len(item) != 2:
+                return None
+            text, correct = item
+            options = ["True", "False"]
+        else:
+            if not isinstance(item, list) or len(item) != 3:
+                return None
+            text, options, correct = item
+            if not isinstance(options, list) or len(options) != 4:
+                return None
+            if not all(isinstance(o, str) and o.strip() for o in options):
+                return None
+            options = [o.strip() for o in options]
+        
+        if not isinstance(text, str) or not text.strip():
+            return None
+        if isinstance(correct, bool) or not isinstance(correct, int) or not 0 <= correct < len(options):
+            return None
+        
+        return {"question": text.strip(), "options": options, "correctAnswer": correct}
+    
+    def _max_tokens(self, num_questions: int, question_type: str, difficulty: str) -> int:
+        """Size the completion budget from the number and type of questions"""
+        per_question = self.TOKENS_PER_QUESTION.get(question_type, self.TOKENS_PER_QUESTION['mcq'])
+        if difficulty == "difficult":
+            per_question = int(per_question * self.DIFFICULT_TOKEN_FACTOR)
+        budget = self.RESPONSE_TOKEN_OVERHEAD + per_question * max(num_questions, 1)
+        return min(budget, self.MAX_RESPONSE_TOKENS)
     
     def _balance_answers(self, questions: List[Dict]) -> List[Dict]:
         """Distribute correct answers across A, B, C, D to prevent patterns"""
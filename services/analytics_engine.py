@@ -0,0 +1,249 @@
+import time
+import threading
+import itertools
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from cachetools import TTLCache
+from tracing import span, traced
+
+QUESTION_TYPES = ('mcq', 'tf')
+DIFFICULTIES = ('normal', 'difficult')
+Z_95 = 1.959963984540054
+
+class CardOutcomes:
+    """One user's answered cards as columns, oldest first (rows from Database.get_card_outcomes)"""
+    
+    __slots__ = ('answered_at', 'session_id', 'correct', 'question_type', 'difficulty')
+    
+    def __init__(self, rows: Sequence[Tuple[int, int, int, int, int]]):
+        table = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=5 * len(rows)).reshape(-1, 5)
+        self.answered_at = table[:, 0].copy()
+        self.session_id = table[:, 1].astype(np.int32)
+        self.correct = table[:, 2].astype(np.int8)
+        # Indexes into QUESTION_TYPES / DIFFICULTIES; -1 for values outside them
+        self.question_type = (table[:, 3] - 1).astype(np.int8)
+        self.difficulty = (table[:, 4] - 1).astype(np.int8)
+    
+    def __len__(self) -> int:
+        return self.correct.size
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+class AnalyticsEngine:
+    """Learning curves, confidence intervals and mastery estimates from a user's card outcomes
+    
+    A user's cards are loaded once into NumPy columns and kept in a cache
+    bounded by total cards. Entries are keyed on the user's sessions version
+    (Database.get_sessions_version), checked on every read, so a session saved
+    or deleted through any worker replaces them. Every statistic is computed
+    with whole-array operations over those columns.
+    """
+    
+    # Below this many cards a group's mastery is reported as not_enough_data
+    MIN_CARDS = 10
+    
+    def __init__(self, db, session_service=None, cache_cards: int = 2000000, cache_ttl: float = 600):
+        self.db = db
+        self.cache = TTLCache(maxsize=cache_cards, ttl=cache_ttl, getsizeof=len)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        if session_service is not None:
+            session_service.invalidation_listeners.append(self.invalidate)
+    
+    @traced("analytics.outcomes")
+    def outcomes(self, user_id: int) -> Optional[CardOutcomes]:
+        """The user's cards as columns, from the cache or one query"""
+        version = self.db.get_sessions_version(user_id)
+        if version is None:
+            return None
+        key = (user_id, version)
+        with self.lock:
+            cached = self.cache.get(key)
+            self.counts["hits" if cached is not None else "loads"] += 1
+        if cached is not None:
+            return cached
+        
+        started = time.perf_counter()
+        rows = self.db.get_card_outcomes(user_id)
+        if rows is None:
+            return None
+        with span("analytics.columns", cards=len(rows)):
+            outcomes = CardOutcomes(rows)
+        with self.lock:
+            self.counts["load_ms"] += round((time.perf_counter() - started) * 1000)
+            self._drop(user_id)
+            try:
+                self.cache[key] = outcomes
+            except ValueError:
+                # More cards than the whole cache holds
+                self.counts["uncacheable"] += 1
+        return outcomes
+    
+    def invalidate(self, user_id: int) -> None:
+        with self.lock:
+            self._drop(user_id)
+    
+    def _drop(self, user_id: int) -> None:
+        for key in [key for key in self.cache.keys() if key[0] == user_id]:
+            self.cache.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"users": len(self.cache), "cards": self.cache.currsize, "max_cards": self.cache.maxsize,
+                    "bytes": sum(o.nbytes for o in self.cache.values()), **self.counts}
+    
+    @traced("analytics.learning_curves")
+    def learning_curves(self, user_id: int, window: int = 20, points: int = 200, bins: int = 10) -> Optional[Dict[str, Any]]:
+        outcomes = self.outcomes(user_id)
+        return None if outcomes is None else learning_curves(outcomes, window, points, bins)
+    
+    @traced("analytics.mastery")
+    def mastery(self, user_id: int, half_life: float = 50, threshold: float = 0.8) -> Optional[Dict[str, Any]]:
+        outcomes = self.outcomes(user_id)
+        return None if outcomes is None else mastery(outcomes, half_life, threshold)
+
+def learning_curves(outcomes: CardOutcomes, window: int = 20, points: int = 200, bins: int = 10) -> Dict[str, Any]:
+    """Moving-average accuracy over all cards, and binned accuracy curves per difficulty and question type"""
+    correct = outcomes.correct.astype(np.float64)
+    n = correct.size
+    
+    # Accuracy of the last `window` cards at every card, sampled at up to `points` places
+    cumulative = np.cumsum(correct)
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+    sizes = np.minimum(np.arange(1, n + 1), window)
+    sample = np.unique(np.linspace(0, n - 1, min(points, n)).round().astype(np.int64)) if n else np.empty(0, np.int64)
+    accuracy, low, high = wilson_interval(sums[sample], sizes[sample])
+    
+    total_correct = cumulative[-1] if n else 0.0
+    overall, overall_low, overall_high = wilson_interval(np.array([total_correct]), np.array([n]))
+    return {
+        "cards": n,
+        "sessions": int(np.unique(outcomes.session_id).size),
+        "overall": {"accuracy": _percent(overall)[0], "low": _percent(overall_low)[0], "high": _percent(overall_high)[0]},
+        "moving_average": {
+            "window": window,
+            "attempts": (sample + 1).tolist(),
+            "dates": outcomes.answered_at[sample].astype('datetime64[s]').astype('datetime64[D]').astype(str).tolist(),
+            "accuracy": _percent(accuracy),
+            "low": _percent(low),
+            "high": _percent(high)
+        },
+        "curves": {
+            "difficulty": _binned_curves(correct, outcomes.difficulty, DIFFICULTIES, bins),
+            "question_type": _binned_curves(correct, outcomes.question_type, QUESTION_TYPES, bins)
+        }
+    }
+
+def mastery(outcomes: CardOutcomes, half_life: float = 50, threshold: float = 0.8) -> Dict[str, Any]:
+    """Recency-weighted mastery per question type, difficulty and their combinations
+    
+    Each group's cards are weighted by 0.5 ** (cards answered in that group since / half_life)
+    and scored with a Beta(1, 1) prior: the estimate is the posterior mean, and a group is
+    mastered when the lower end of its 95% interval reaches the threshold.
+    """
+    correct = outcomes.correct.astype(np.float64)
+    qtype, difficulty = outcomes.question_type, outcomes.difficulty
+    cells = np.where((qtype >= 0) & (difficulty >= 0), qtype * len(DIFFICULTIES) + difficulty, -1)
+    
+    def groups(codes, names):
+        estimates = _weighted_estimates(correct, codes, len(names), half_life, threshold)
+        return {name: estimate for name, estimate in zip(names, estimates)}
+    
+    combined = [f"{t}/{d}" for t in QUESTION_TYPES for d in DIFFICULTIES]
+    return {
+        "cards": int(correct.size),
+        "half_life": half_life,
+        "threshold": round(threshold * 100, 1),
+        "overall": groups(np.zeros(correct.size, np.int8), ("all",))["all"],
+        "question_type": groups(qtype, QUESTION_TYPES),
+        "difficulty": groups(difficulty, DIFFICULTIES),
+        "combined": groups(cells, combined)
+    }
+
+def wilson_interval(successes, totals, z: float = Z_95) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Proportion and Wilson score interval for each (successes, totals) pair; NaN where totals is 0"""
+    s = np.asarray(successes, dtype=np.float64)
+    n = np.asarray(totals, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = s / n
+        z2n = z * z / n
+        denominator = 1 + z2n
+        centre = (p + z2n / 2) / denominator
+        half = z * np.sqrt(p * (1 - p) / n + z2n / (4 * n)) / denominator
+    empty = n == 0
+    return (np.where(empty, np.nan, p), np.where(empty, np.nan, centre - half),
+            np.where(empty, np.nan, centre + half))
+
+def group_ranks(codes: np.ndarray, groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Each element's position among earlier elements with the same code, and the size of each code's group
+    
+    A running count per group (groups x elements), which for the handful of
+    groups used here is cheaper than sorting by code.
+    """
+    running = np.cumsum(codes == np.arange(groups)[:, None], axis=1, dtype=np.int32)
+    sizes = running[:, -1] if codes.size else np.zeros(groups, dtype=np.int32)
+    return running[codes, np.arange(codes.size)] - 1, sizes
+
+def _binned_curves(correct: np.ndarray, codes: np.ndarray, names: Sequence[str], bins: int) -> Dict[str, Any]:
+    """Accuracy over consecutive, equal slices of each group's cards (up to `bins` slices per group)"""
+    correct, codes = _known(correct, codes)
+    groups = len(names)
+    ranks, sizes = group_ranks(codes, groups)
+    slices = np.minimum(sizes, bins)
+    index = codes * bins + ranks * slices[codes] // np.maximum(sizes[codes], 1)
+    totals = np.bincount(index, minlength=groups * bins).reshape(groups, bins)
+    hits = np.bincount(index, weights=correct, minlength=groups * bins).reshape(groups, bins)
+    accuracy, low, high = wilson_interval(hits, totals)
+    ends = np.cumsum(totals, axis=1)
+    
+    curves = {}
+    for g, name in enumerate(names):
+        k = int(slices[g])
+        curves[name] = {
+            "cards": int(sizes[g]),
+            "attempts": ends[g, :k].tolist(),
+            "accuracy": _percent(accuracy[g, :k]),
+            "low": _percent(low[g, :k]),
+            "high": _percent(high[g, :k])
+        }
+    return curves
+
+def _weighted_estimates(correct: np.ndarray, codes: np.ndarray, groups: int, half_life: float,
+                        threshold: float) -> List[Dict[str, Any]]:
+    correct, codes = _known(correct, codes)
+    ranks, sizes = group_ranks(codes, groups)
+    # 0 for each group's most recent card
+    age = sizes[codes] - 1 - ranks
+    weights = np.exp(age * (-np.log(2) / half_life))
+    weight = np.bincount(codes, weights=weights, minlength=groups)
+    score = np.bincount(codes, weights=weights * correct, minlength=groups)
+    hits = np.bincount(codes, weights=correct, minlength=groups)
+    
+    mean = (1 + score) / (2 + weight)
+    spread = Z_95 * np.sqrt(mean * (1 - mean) / (3 + weight))
+    low, high = np.clip(mean - spread, 0, 1), np.clip(mean + spread, 0, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = np.where(sizes > 0, hits / sizes, np.nan)
+    level = np.select([sizes < AnalyticsEngine.MIN_CARDS, low >= threshold, mean >= 0.6],
+                      ["not_enough_data", "mastered", "developing"], "needs_practice")
+    
+    columns = zip(sizes.tolist(), _percent(accuracy), _percent(mean), _percent(low), _percent(high), level.tolist())
+    return [{"cards": cards, "accuracy": acc, "mastery": m, "low": lo, "high": hi, "level": lev}
+            for cards, acc, m, lo, hi, lev in columns]
+
+def _known(correct: np.ndarray, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Drop cards whose code is -1 (a question type or difficulty outside the known ones)"""
+    codes = codes.astype(np.intp)
+    valid = codes >= 0
+    if valid.all():
+        return correct, codes
+    return correct[valid], codes[valid]
+
+def _percent(values: np.ndarray) -> List[Optional[float]]:
+    """Fractions as percentages to one decimal, NaN as None"""
+    rounded = np.round(np.asarray(values, dtype=np.float64) * 100, 1)
+    return [None if v != v else v for v in rounded.tolist()]
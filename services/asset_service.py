@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+from flask import current_app, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+class AssetService:
+    """Maps static files to the fingerprinted, precompressed copies written by build_assets.py"""
+    
+    DIST_DIR = "dist"
+    MANIFEST = "manifest.json"
+    # Fingerprinted names change with their content, so browsers may keep them forever
+    IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+    
+    # Bundles in load order; (path, media) stylesheets are wrapped in @media when bundled
+    BUNDLES: Dict[str, List[Tuple[str, Optional[str]]]] = {
+        "app.css": [
+            ("css/base.css", None),
+            ("css/layout.css", None),
+            ("css/components/buttons.css", None),
+            ("css/components/navigation.css", None),
+            ("css/components/modals.css", None),
+            ("css/components/cards.css", None),
+            ("css/tablet.css", "(min-width: 768px)"),
+            ("css/desktop.css", "(min-width: 1024px)"),
+            ("css/rotation.css", None),
+        ],
+        "app.js": [
+            ("js/utils.js", None),
+            ("js/auth.js", None),
+            ("js/flashcards.js", None),
+            ("js/sessions.js", None),
+            ("js/analytics.js", None),
+            ("js/ui.js", None),
+            ("js/main.js", None),
+        ],
+    }
+    
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self.files: Dict[str, str] = {}
+        self.bundles: Dict[str, str] = {}
+        self.compressed: Dict[str, List[str]] = {}
+        self.manifest_path = os.path.join(static_folder, self.DIST_DIR, self.MANIFEST)
+        # Changes whenever a build changes any output; "source" when serving unbuilt files
+        self.version = "source"
+        self.load_manifest()
+    
+    def init_app(self, app) -> None:
+        """Use the manifest in templates and serve built files precompressed with immutable caching"""
+        app.jinja_env.globals['url_for'] = self.url_for
+        app.jinja_env.globals['asset_tags'] = self.tags
+        app.view_functions['static'] = self.send_static
+    
+    def load_manifest(self) -> bool:
+        """Read static/dist/manifest.json; without one (development) source files are served as-is"""
+        path = self.manifest_path
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            manifest = json.loads(content)
+        except FileNotFoundError:
+            self.files, self.bundles, self.compressed, self.version = {}, {}, {}, "source"
+            return False
+        except (OSError, ValueError) as e:
+            print(f"Ignoring asset manifest {path}: {e}")
+            return False
+        
+        self.files = manifest.get('files', {})
+        self.bundles = manifest.get('bundles', {})
+        self.compressed = manifest.get('compressed', {})
+        self.version = hashlib.sha256(content).hexdigest()[:12]
+        return True
+    
+    def url_for(self, endpoint: str, **values) -> str:
+        """flask.url_for, with static filenames swapped for their fingerprinted copies"""
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+        return url_for(endpoint, **values)
+    
+    def tags(self, bundle: str) -> Markup:
+        """<link>/<script> tags for a bundle: the built file, or each source file in development"""
+        if bundle in self.bundles:
+            sources = [(self.bundles[bundle], None)]
+        else:
+            sources = [(self.files.get(path, path), media) for path, media in self.BUNDLES[bundle]]
+        
+        tags = []
+        for path, media in sources:
+            href = escape(url_for('static', filename=path))
+            if bundle.endswith('.css'):
+                media_attr = f' media="{escape(media)}"' if media else ''
+                tags.append(f'<link rel="stylesheet" href="{href}"{media_attr}>')
+            else:
+                tags.append(f'<script src="{href}"></script>')
+        return Markup("\n        ".join(tags))
+    
+    def send_static(self, filename: str):
+        """Static view: built files get a precompressed variant if the client accepts one"""
+        if not filename.startswith(self.DIST_DIR + '/'):
+            return current_app.send_static_file(filename)
+        
+        relative = filename[len(self.DIST_DIR) + 1:]
+        directory = os.path.join(self.static_folder, self.DIST_DIR)
+        response = None
+        for encoding, suffix in self.ENCODINGS:
+            if encoding in self.compressed.get(relative, ()) and encoding in request.accept_encodings:
+                response = send_from_directory(directory, relative + suffix,
+                                               mimetype=mimetypes.guess_type(relative)[0] or 'application/octet-stream')
+                response.headers['Content-Encoding'] = encoding
+                break
+        if response is None:
+            response = send_from_directory(directory, relative)
+        
+        if relative in self.compressed:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = self.IMMUTABLE_CACHE
+        return response
@@ -0,0 +1,65 @@
+import gzip
+import threading
+from typing import Any, Dict
+import brotli
+from flask import request
+import tracing
+
+class CompressionService:
+    """Negotiated brotli/gzip compression of dynamic responses (JSON, pages, metrics)"""
+    
+    COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+    # Preferred first when the client rates them equally
+    ENCODINGS = ('br', 'gzip')
+    
+    def __init__(self, min_size: int = 1024, brotli_quality: int = 4, gzip_level: int = 6):
+        self.min_size = min_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+        self.lock = threading.Lock()
+        self.counts = {"compressed": 0, "bytes_in": 0, "bytes_out": 0}
+    
+    def init_app(self, app) -> None:
+        """Register the hook; call before other after_request handlers so it runs last, on the final body"""
+        app.after_request(self._after_request)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = dict(self.counts)
+        counts["ratio"] = round(counts["bytes_out"] / counts["bytes_in"], 3) if counts["bytes_in"] else None
+        counts.update(min_size=self.min_size, brotli_quality=self.brotli_quality, gzip_level=self.gzip_level)
+        return counts
+    
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+    
+    def _after_request(self, response):
+        # Streams (batch generation) and files (static/, precompressed at build time) are sent as they are
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(self.COMPRESSIBLE_TYPES)):
+            return response
+        
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.ENCODINGS)
+        if encoding is None:
+            return response
+        
+        with tracing.span("http.compress", **{"http.content_encoding": encoding}):
+            compressed = self.compress(data, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # The bytes differ per encoding, so a strong validator would be wrong for either
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        with self.lock:
+            self.counts["compressed"] += 1
+            self.counts["bytes_in"] += len(data)
+            self.counts["bytes_out"] += len(compressed)
+        return response
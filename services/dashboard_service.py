@@ -0,0 +1,119 @@
+import threading
+import contextvars
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from collections import Counter
+from cachetools import TTLCache
+from typing import Any, Callable, Dict, Optional, Tuple
+import tracing
+
+class DashboardService:
+    """Everything the analytics page loads, gathered in one call
+    
+    Each section is an independent query run on a small shared pool, so a
+    dashboard takes as long as its slowest query rather than their sum. Every
+    query checks out its own pooled connection. Tier info and sessions are read
+    fresh on every load; the breakdown is cached per user and keyed on the
+    user's sessions version (Database.get_sessions_version), so a session saved
+    through any worker is picked up by all of them.
+    """
+    
+    # Cheap enough to read every time, and a cache would only be cleared in the process that saved
+    UNCACHED = ("tier_info", "sessions")
+    
+    def __init__(self, db, session_service, workers: int = 4, cache_ttl: float = 60,
+                 cache_size: int = 5000, timeout: float = 10, utc_offset_hours: float = 0):
+        self.db = db
+        self.session_service = session_service
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard')
+        self.timeout = timeout
+        # study_sessions.created_at holds wall-clock time at this offset, so the days window must too
+        self.timezone = timezone(timedelta(hours=utc_offset_hours))
+        # (section, user_id, *args) -> value
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        session_service.invalidation_listeners.append(self.invalidate)
+    
+    def load(self, user_id: int, latest: Optional[int] = 5, days: Optional[int] = 30) -> Dict[str, Any]:
+        """All dashboard sections for a user; sections that fail or time out are None and listed in 'errors'
+        
+        The type/difficulty breakdown covers the page's filter: the latest sessions of the
+        last days (None for no limit), so the page needs no second request on load.
+        """
+        sections: Dict[str, Tuple[Callable, tuple]] = {
+            "tier_info": (self.db.get_user_tier_info, (user_id,)),
+            "sessions": (self._sessions, (user_id,)),
+            "type_difficulty": (self._breakdown, (user_id, latest, days)),
+        }
+        
+        version = self.db.get_sessions_version(user_id)
+        results, pending = {}, {}
+        for section, (fn, args) in sections.items():
+            if section in self.UNCACHED or version is None:
+                pending[section] = (None, self._submit(section, fn, args))
+                continue
+            key = (section,) + args + (version,)
+            with self.lock:
+                cached = self.cache.get(key)
+                self.counts["hits" if cached is not None else "misses"] += 1
+            if cached is not None:
+                results[section] = cached
+                continue
+            pending[section] = (key, self._submit(section, fn, args))
+        
+        errors = []
+        for section, (key, future) in pending.items():
+            try:
+                value = future.result(timeout=self.timeout)
+            except FutureTimeout:
+                print(f"Dashboard section {section} timed out")
+                value = None
+            except Exception as e:
+                print(f"Dashboard section {section} error: {e}")
+                value = None
+            if value is None:
+                errors.append(section)
+                with self.lock:
+                    self.counts["errors"] += 1
+            elif value and key is not None:
+                # Empty results aren't kept: they're cheap to recompute and may be a failed query
+                with self.lock:
+                    self.cache[key] = value
+            results[section] = value
+        
+        return {
+            "tier_info": results["tier_info"],
+            "sessions": results["sessions"],
+            "type_difficulty": results["type_difficulty"],
+            "filter": {"latest": latest, "days": days},
+            "errors": errors
+        }
+    
+    def invalidate(self, user_id: int) -> None:
+        """Drop every cached section for a user"""
+        with self.lock:
+            for key in [key for key in self.cache.keys() if key[1] == user_id]:
+                self.cache.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"entries": len(self.cache), "workers": self.workers, **self.counts}
+    
+    def _submit(self, section: str, fn: Callable, args: tuple) -> Future:
+        # Each task gets its own copy of the context, so its spans land in this request's trace
+        return self.executor.submit(contextvars.copy_context().run, self._run, section, fn, args)
+    
+    def _run(self, section: str, fn: Callable, args: tuple) -> Optional[Any]:
+        with tracing.span("dashboard.section", **{"dashboard.section": section}):
+            return fn(*args)
+    
+    def _sessions(self, user_id: int) -> list:
+        return self.db.get_sessions(user_id).get('sessions', [])
+    
+    def _breakdown(self, user_id: int, latest: Optional[int], days: Optional[int]) -> Optional[Dict[str, list]]:
+        date_from = None
+        if days is not None:
+            date_from = datetime.now(self.timezone).replace(tzinfo=None) - timedelta(days=days)
+        return self.db.get_filtered_breakdown(user_id, date_from=date_from, latest=latest)
@@ -1,32 +1,151 @@
-from threading import Thread
+import time
+import uuid
+import smtplib
+import threading
+from collections import Counter
 from flask_mail import Message, Mail
-from typing import Optional
+from typing import Optional, Dict, Any
 
 class EmailService:
-    """Handles async email sending"""
+    """Queues emails in a durable outbox and delivers them from a fixed pool of senders"""
     
-    def __init__(self, mail: Mail, default_sender: Optional[str] = None):
+    BASE_RETRY_SECONDS = 30
+    MAX_RETRY_SECONDS = 3600
+    EWMA_ALPHA = 0.2
+    
+    def __init__(self, mail: Mail, default_sender: Optional[str] = None, outbox=None,
+                 workers: int = 2, batch_size: int = 20, max_attempts: int = 5,
+                 poll_seconds: float = 5, idle_close_seconds: float = 30):
         self.mail = mail
         self.default_sender = default_sender
+        self.outbox = outbox
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.counters = Counter()
+        self.latency_ms = None
+        self.latency_max_ms = 0.0
+    
+    def start(self, app) -> None:
+        """Start the sender pool (idempotent); workers run inside `app`'s context"""
+        if self.threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(app,), name=f"email-sender-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def send_async(self, subject: str, recipients: list, body: str,
+                   reply_to: Optional[str] = None) -> bool:
+        """Queue an email in the outbox; a sender worker delivers it"""
+        email_id = self.outbox.enqueue_email(subject, self.default_sender, recipients, body, reply_to)
+        if not email_id:
+            print("❌ Email could not be queued")
+            return False
+        
+        self.wakeup.set()
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth by status plus this process's send counters and latency"""
+        with self.lock:
+            local = {
+                "workers": len(self.threads),
+                "send_latency_ewma_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+                "send_latency_max_ms": round(self.latency_max_ms, 1),
+                **self.counters
+            }
+        return {"queue": self.outbox.get_outbox_stats(), **local}
+    
+    def _worker(self, app) -> None:
+        """Claim batches from the outbox and send them over one long-lived SMTP connection"""
+        connection = None
+        last_used = 0.0
+        with app.app_context():
+            while True:
+                try:
+                    emails = self.outbox.claim_outbox_batch(uuid.uuid4().hex, self.batch_size)
+                except Exception as e:
+                    print(f"❌ Outbox claim failed: {e}")
+                    emails = []
+                
+                if not emails:
+                    if connection and time.monotonic() - last_used > self.idle_close_seconds:
+                        connection = self._close(connection)
+                    self.wakeup.wait(self.poll_seconds)
+                    self.wakeup.clear()
+                    continue
+                
+                for email in emails:
+                    connection = self._deliver(connection, email)
+                    last_used = time.monotonic()
     
-    def send_async(self, subject: str, recipients: list, body: str, 
-                   reply_to: Optional[str] = None) -> None:
-        """Send email in background thread"""
+    def _deliver(self, connection, email: Dict[str, Any]):
+        """Send one outbox email, reconnecting once if the server dropped us"""
         msg = Message(
-            subject=subject,
-            sender=self.default_sender,
-            recipients=recipients,
-            body=body,
-            reply_to=reply_to
+            subject=email['subject'],
+            sender=email['sender'] or self.default_sender,
+            recipients=email['recipients'],
+            body=email['body'],
+            reply_to=email['reply_to']
         )
         
-        def send_thread():
+        started = time.perf_counter()
+        try:
             try:
-                self.mail.send(msg)
-                print("✅ Email sent successfully")
-            except Exception as e:
-                print(f"❌ Email failed: {e}")
+                connection = connection or self._open()
+                connection.send(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                self._close(connection)
+                connection = self._open()
+                connection.send(msg)
+        except Exception as e:
+            connection = self._close(connection)
+            self._record_failure(email, e)
+            return connection
         
-        thread = Thread(target=send_thread)
-        thread.daemon = True
-        thread.start()
\ No newline at end of file
+        self.outbox.mark_email_sent(email['id'])
+        self._record_latency((time.perf_counter() - started) * 1000)
+        return connection
+    
+    def _record_failure(self, email: Dict[str, Any], error: Exception) -> None:
+        attempts = email['attempts'] + 1
+        if attempts >= self.max_attempts:
+            self.outbox.mark_email_failed(email['id'], error)
+            print(f"❌ Email {email['id']} failed permanently: {error}")
+            with self.lock:
+                self.counters['failed'] += 1
+            return
+        
+        retry_in = min(self.BASE_RETRY_SECONDS * 2 ** (attempts - 1), self.MAX_RETRY_SECONDS)
+        self.outbox.mark_email_failed(email['id'], error, retry_in)
+        print(f"❌ Email {email['id']} failed (attempt {attempts}), retrying in {retry_in}s: {error}")
+        with self.lock:
+            self.counters['retried'] += 1
+    
+    def _record_latency(self, elapsed_ms: float) -> None:
+        with self.lock:
+            self.counters['sent'] += 1
+            previous = self.latency_ms
+            self.latency_ms = elapsed_ms if previous is None else (1 - self.EWMA_ALPHA) * previous + self.EWMA_ALPHA * elapsed_ms
+            self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+    
+    def _open(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        with self.lock:
+            self.counters['connections_opened'] += 1
+        return connection
+    
+    def _close(self, connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
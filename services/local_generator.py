@@ -0,0 +1,203 @@
+import re
+import random
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+STOPWORDS = frozenset("""
+a about above after again against all also although am an and any are as at be because been before
+being below between both but by can could did do does doing down during each either else even every
+few for from further had has have having he her here hers him his how however i if in into is it its
+itself just least less like made make many may me might more most much must my neither no nor not of
+off often on once one only or other our ours out over own per rather same several she should since so
+some such than that the their theirs them then there these they this those though through thus to too
+under until up upon us used using very was we were what when where whether which while who whom whose
+why will with within without would yet you your
+""".split())
+
+# Words that usually precede a noun; terms seen after them make better blanks
+NOUN_MARKERS = frozenset("a an the of and or in into from with by as on".split())
+# Words that usually precede a verb; a term followed by a determiner is usually one too
+VERB_MARKERS = frozenset("to can could will would should may might must shall cannot i you he she it we they who which".split())
+DETERMINERS = frozenset("a an the its their this these".split())
+NOUN_SUFFIXES = ('tion', 'sion', 'ment', 'ness', 'ity', 'ism', 'ance', 'ence', 'ogy', 'ist', 'ship')
+VERB_SUFFIXES = ('ize', 'ify')
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+TERM_RE = re.compile(r"\b(?:[A-Za-z][A-Za-z'-]{3,}|\d+(?:\.\d+)?)\b")
+WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9.'-]*")
+BLANK = "_____"
+
+
+class LocalQuestionGenerator:
+    """Builds cloze MCQ and True/False questions from the notes without any network call"""
+    
+    MIN_SENTENCE_WORDS = 5
+    MAX_SENTENCE_WORDS = 40
+    MAX_TERMS_PER_SENTENCE = 2
+    
+    def generate_questions(self, notes: str, num_questions: int = 6,
+                           question_type: str = "mcq", difficulty: str = "normal") -> Tuple[Optional[List[Dict]], str]:
+        """Generate quiz questions in the same schema as AIService
+        
+        Each sentence is used at most once, so short notes may give fewer questions.
+        """
+        sentences = self._split_sentences(notes)
+        terms = self._extract_terms(sentences)
+        if not sentences or len(terms) < 2:
+            return None, "no_valid_questions"
+        
+        questions, used = [], set()
+        for sentence, term in self._candidates(sentences, terms):
+            if len(questions) >= num_questions:
+                break
+            # Two blanks in one sentence, or a statement and its falsified copy, give each other away
+            if sentence in used:
+                continue
+            distractors = self._pick_distractors(term, terms, sentence, difficulty)
+            if question_type == "tf":
+                q = self._build_tf(sentence, term, distractors, len(questions))
+            else:
+                q = self._build_cloze(sentence, term, distractors)
+            if q is None:
+                continue
+            q.update({"question_type": question_type, "difficulty": difficulty})
+            questions.append(q)
+            used.add(sentence)
+        
+        if not questions:
+            return None, "no_valid_questions"
+        return questions, "success"
+    
+    def _split_sentences(self, notes: str) -> List[str]:
+        """Segment notes into sentences of quiz-friendly length"""
+        sentences = []
+        for raw in SENTENCE_RE.split(notes or ''):
+            sentence = raw.strip(' -*•\t')
+            words = len(sentence.split())
+            if self.MIN_SENTENCE_WORDS <= words <= self.MAX_SENTENCE_WORDS:
+                sentences.append(sentence)
+        return sentences
+    
+    def _extract_terms(self, sentences: List[str]) -> Dict[str, Dict]:
+        """Score candidate key terms by frequency, capitalisation and noun-likeness, and guess their kind
+        
+        A term's kind is "number", "noun", "verb" or "other" (no clear evidence either way), from the
+        words around it, its place in the sentence and its suffix.
+        """
+        counts = Counter()
+        forms = {}
+        proper = Counter()
+        nounish = Counter()
+        verbish = Counter()
+        for sentence in sentences:
+            words = [w.rstrip('.') for w in WORD_RE.findall(sentence)]
+            lowered = [w.lower() for w in words]
+            for i, word in enumerate(words):
+                key = lowered[i]
+                if TERM_RE.fullmatch(word) and key not in STOPWORDS and not key.endswith('ly'):
+                    counts[key] += 1
+                    forms.setdefault(key, word)
+                    if i > 0 and word[0].isupper():
+                        proper[key] += 1
+                    previous = lowered[i - 1] if i else None
+                    following = lowered[i + 1] if i + 1 < len(words) else None
+                    # A sentence usually opens with its subject, and the word after it is the verb
+                    if i == 0 or previous in NOUN_MARKERS:
+                        nounish[key] += 1
+                    elif (previous in VERB_MARKERS or following in DETERMINERS
+                          or (i == 1 and lowered[0] not in STOPWORDS)
+                          or (key.endswith('ed') and not key.endswith('eed'))):
+                        verbish[key] += 1
+        
+        terms = {}
+        for key, count in counts.items():
+            is_number = key[0].isdigit()
+            noun = proper[key] + nounish[key] + (count if key.endswith(NOUN_SUFFIXES) else 0)
+            verb = verbish[key] + (count if key.endswith(VERB_SUFFIXES) else 0)
+            kind = "number" if is_number else "noun" if noun > verb else "verb" if verb > noun else "other"
+            score = count * (1.5 if kind == "noun" else 1.0) + (0.5 if is_number else len(key) / 10)
+            terms[key] = {"text": forms[key], "score": score, "number": is_number, "kind": kind}
+        return terms
+    
+    def _candidates(self, sentences: List[str], terms: Dict[str, Dict]):
+        """Yield (sentence, term) pairs, covering every sentence once before reusing any"""
+        per_sentence = []
+        for sentence in sentences:
+            found = {m.group(0).lower() for m in TERM_RE.finditer(sentence)}
+            ranked = sorted((k for k in found if k in terms), key=lambda k: -terms[k]["score"])
+            per_sentence.append((sentence, ranked[:self.MAX_TERMS_PER_SENTENCE]))
+        
+        for rank in range(self.MAX_TERMS_PER_SENTENCE):
+            for sentence, ranked in per_sentence:
+                if rank < len(ranked):
+                    yield sentence, terms[ranked[rank]]["text"]
+    
+    def _pick_distractors(self, term: str, terms: Dict[str, Dict], sentence: str,
+                          difficulty: str) -> List[str]:
+        """Choose up to three wrong answers of the same kind from the notes
+        
+        A noun is never offered for a verb blank or the other way round. Terms of unknown kind make
+        up the numbers when there are too few of the answer's own kind (nouns, for an unknown blank).
+        """
+        key = term.lower()
+        kind = terms[key]["kind"]
+        in_sentence = {m.group(0).lower() for m in TERM_RE.finditer(sentence)}
+        others = [t for k, t in terms.items() if k != key and k not in in_sentence]
+        fallback = {"noun": "other", "verb": "other", "other": "noun"}.get(kind)
+        
+        distractors = []
+        for pool in ([t["text"] for t in others if t["kind"] == kind],
+                     [t["text"] for t in others if t["kind"] == fallback]):
+            if difficulty == "difficult":
+                # Closest in length and shape reads as more plausible
+                pool.sort(key=lambda t: (abs(len(t) - len(term)), t[0].isupper() != term[0].isupper()))
+            else:
+                random.shuffle(pool)
+            distractors += pool[:3 - len(distractors)]
+        
+        if kind == "number" and len(distractors) < 3:
+            distractors += self._numeric_variants(term, 3 - len(distractors), distractors)
+        return distractors
+    
+    def _numeric_variants(self, term: str, count: int, existing: List[str]) -> List[str]:
+        """Plausible nearby numbers when the notes do not contain enough of them"""
+        value = float(term)
+        is_int = '.' not in term
+        step = 1 if is_int and abs(value) < 100 else max(abs(value) * 0.1, 0.1)
+        variants = []
+        for offset in (1, -1, 2, -2, 3):
+            candidate = value + offset * step
+            text = str(int(round(candidate))) if is_int else f"{candidate:.{len(term.split('.')[1])}f}"
+            if text != term and text not in existing and text not in variants:
+                variants.append(text)
+            if len(variants) == count:
+                break
+        return variants
+    
+    def _build_cloze(self, sentence: str, term: str, distractors: List[str]) -> Optional[Dict]:
+        if len(distractors) < 3:
+            return None
+        pattern = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
+        cloze = pattern.sub(lambda m: BLANK, sentence, count=1)
+        if cloze == sentence:
+            return None
+        
+        options = [term] + distractors[:3]
+        random.shuffle(options)
+        return {
+            "question": f"Fill in the blank: {cloze}",
+            "options": options,
+            "correctAnswer": options.index(term)
+        }
+    
+    def _build_tf(self, sentence: str, term: str, distractors: List[str], index: int) -> Optional[Dict]:
+        # Alternate true and false statements so answers stay balanced
+        if index % 2 == 0 or not distractors:
+            return {"question": sentence, "options": ["True", "False"], "correctAnswer": 0}
+        
+        pattern = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
+        altered = pattern.sub(lambda m: distractors[0], sentence, count=1)
+        if altered == sentence:
+            return None
+        altered = altered[0].upper() + altered[1:]
+        return {"question": altered, "options": ["True", "False"], "correctAnswer": 1}
@@ -0,0 +1,118 @@
+import os
+import time
+from flask import g, request, current_app
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram,
+    CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from typing import Tuple
+
+class MetricsService:
+    """Prometheus metrics: per-route latency, status and in-flight, plus pool, cache and worker gauges"""
+    
+    # Seconds; page and JSON routes land in the low buckets, generations in the high ones
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+    # Each process refreshes its own gauges at most this often while serving traffic
+    GAUGE_REFRESH_SECONDS = 5
+    OUTBOX_STATUSES = ('pending', 'sending', 'sent', 'failed')
+    
+    def __init__(self):
+        # Set by gunicorn.conf.py; each worker writes to files there and any worker can serve the merged view
+        self.multiprocess_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+        self.registry = CollectorRegistry()
+        self.last_refresh = 0.0
+        
+        self.requests = Counter(
+            'reviseai_http_requests', 'HTTP requests by endpoint, method and status',
+            ['endpoint', 'method', 'status'], registry=self.registry)
+        self.latency = Histogram(
+            'reviseai_http_request_duration_seconds', 'Time to produce the response (headers, for streams)',
+            ['endpoint', 'method'], buckets=self.LATENCY_BUCKETS, registry=self.registry)
+        self.in_flight = Gauge(
+            'reviseai_http_requests_in_flight', 'Requests currently being handled',
+            ['endpoint'], multiprocess_mode='livesum', registry=self.registry)
+        
+        self.workers = Gauge(
+            'reviseai_worker_processes', 'Live worker processes',
+            multiprocess_mode='livesum', registry=self.registry)
+        self.db_pool = Gauge(
+            'reviseai_db_pool_connections', 'MySQL pool connections by state',
+            ['state'], multiprocess_mode='livesum', registry=self.registry)
+        self.cache_entries = Gauge(
+            'reviseai_cache_entries', 'Entries held in in-process caches',
+            ['cache'], multiprocess_mode='livesum', registry=self.registry)
+        self.admission = Gauge(
+            'reviseai_admission_generations', 'Generations admitted or waiting in the admission controller',
+            ['state'], multiprocess_mode='livesum', registry=self.registry)
+        self.background = Gauge(
+            'reviseai_background_workers', 'Background sender threads and pending prefetches',
+            ['pool'], multiprocess_mode='livesum', registry=self.registry)
+        self.outbox = Gauge(
+            'reviseai_email_outbox_messages', 'Email outbox rows by status',
+            ['status'], multiprocess_mode='mostrecent', registry=self.registry)
+    
+    def init_app(self, app) -> None:
+        """Register the request hooks; call before other before_request handlers so rejected requests count too"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+    
+    def render(self, app) -> Tuple[bytes, str]:
+        """Exposition text for /metrics, merged across workers in multiprocess mode"""
+        self.refresh_gauges(app, include_outbox=True)
+        if self.multiprocess_dir:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self.registry
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    
+    def refresh_gauges(self, app, include_outbox: bool = False) -> None:
+        """Sample this process's pool, cache and worker state"""
+        self.last_refresh = time.monotonic()
+        # Only processes that serve requests refresh, so the gunicorn master is not counted
+        self.workers.set(1)
+        try:
+            pool = app.db.pool_stats()
+            self.db_pool.labels('size').set(pool['size'])
+            self.db_pool.labels('idle').set(pool['idle'])
+            self.db_pool.labels('in_use').set(pool['size'] - pool['idle'])
+            
+            self.cache_entries.labels('session_allowance').set(len(app.session_service.cache))
+            self.cache_entries.labels('identity').set(len(app.session_service.identities))
+            self.cache_entries.labels('dashboard').set(len(app.dashboard_service.cache))
+            self.cache_entries.labels('card_outcomes').set(len(app.analytics_engine.cache))
+            self.cache_entries.labels('prefetch').set(len(app.prefetch_service.slots))
+            
+            admission = app.admission_controller.snapshot()
+            self.admission.labels('active').set(admission['active'])
+            self.admission.labels('queued').set(admission['queued'])
+            
+            self.background.labels('email_senders').set(sum(t.is_alive() for t in app.email_service.threads))
+            self.background.labels('prefetch_pending').set(len(app.prefetch_service.pending))
+            
+            if include_outbox:
+                queue = app.db.get_outbox_stats()
+                for status in self.OUTBOX_STATUSES:
+                    self.outbox.labels(status).set(queue.get(status, 0))
+        except Exception as e:
+            print(f"Metrics refresh error: {e}")
+    
+    def _before_request(self) -> None:
+        g.metrics_endpoint = request.endpoint or 'unmatched'
+        g.metrics_started = time.perf_counter()
+        self.in_flight.labels(g.metrics_endpoint).inc()
+    
+    def _after_request(self, response):
+        endpoint = g.get('metrics_endpoint')
+        if endpoint:
+            self.latency.labels(endpoint, request.method).observe(time.perf_counter() - g.metrics_started)
+            self.requests.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+    
+    def _teardown_request(self, exc) -> None:
+        endpoint = g.pop('metrics_endpoint', None)
+        if endpoint:
+            self.in_flight.labels(endpoint).dec()
+        if time.monotonic() - self.last_refresh > self.GAUGE_REFRESH_SECONDS:
+            self.refresh_gauges(current_app)
@@ -0,0 +1,79 @@
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+class ModelRouter:
+    """Picks the model order per request and tracks each model's live latency and error rate"""
+    
+    EWMA_ALPHA = 0.2
+    WARMUP_CALLS = 3
+    COOLDOWN_SECONDS = 30
+    
+    def __init__(self, primary: str, fast: Optional[str] = None, short_notes_chars: int = 800,
+                 slow_ms: float = 8000, max_error_rate: float = 0.5):
+        self.primary = primary
+        self.fast = fast if fast and fast != primary else None
+        self.short_notes_chars = short_notes_chars
+        self.slow_ms = slow_ms
+        self.max_error_rate = max_error_rate
+        self.lock = threading.Lock()
+        self.stats = {m: self._new_stats() for m in self.models}
+    
+    @property
+    def models(self) -> List[str]:
+        return [self.primary] + ([self.fast] if self.fast else [])
+    
+    def route(self, question_type: str, difficulty: str, notes_length: int) -> List[str]:
+        """Return candidate models, preferred first, unhealthy ones moved to the back"""
+        if self.fast and self._is_simple(question_type, difficulty, notes_length):
+            ordered = [self.fast, self.primary]
+        else:
+            ordered = self.models
+        
+        with self.lock:
+            healthy = [m for m in ordered if self._healthy(m)]
+        return healthy + [m for m in ordered if m not in healthy]
+    
+    def observe(self, model: str, latency_ms: float, ok: bool) -> None:
+        """Fold one call's outcome into the model's moving averages"""
+        with self.lock:
+            stats = self.stats.setdefault(model, self._new_stats())
+            alpha = self.EWMA_ALPHA
+            stats['calls'] += 1
+            stats['errors'] += 0 if ok else 1
+            stats['error_rate'] = (1 - alpha) * stats['error_rate'] + alpha * (0.0 if ok else 1.0)
+            if ok:
+                previous = stats['latency_ms']
+                stats['latency_ms'] = latency_ms if previous is None else (1 - alpha) * previous + alpha * latency_ms
+            stats['last_seen'] = time.monotonic()
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [{
+                "model": model,
+                "calls": stats['calls'],
+                "errors": stats['errors'],
+                "error_rate": round(stats['error_rate'], 3),
+                "latency_ewma_ms": round(stats['latency_ms'], 1) if stats['latency_ms'] is not None else None,
+                "healthy": self._healthy(model)
+            } for model, stats in self.stats.items()]
+    
+    def _is_simple(self, question_type: str, difficulty: str, notes_length: int) -> bool:
+        """Normal True/False, or normal MCQ on short notes, is safe for the small model"""
+        if difficulty != "normal":
+            return False
+        return question_type == "tf" or notes_length <= self.short_notes_chars
+    
+    def _healthy(self, model: str) -> bool:
+        stats = self.stats[model]
+        if stats['calls'] < self.WARMUP_CALLS:
+            return True
+        # Give a demoted model another chance once it has been idle for a while
+        if time.monotonic() - stats['last_seen'] > self.COOLDOWN_SECONDS:
+            return True
+        if stats['error_rate'] > self.max_error_rate:
+            return False
+        return stats['latency_ms'] is None or stats['latency_ms'] <= self.slow_ms
+    
+    def _new_stats(self) -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "error_rate": 0.0, "latency_ms": None, "last_seen": 0.0}
@@ -0,0 +1,119 @@
+import os
+import hashlib
+import threading
+from email.utils import formatdate
+from typing import Dict, Iterable, Optional, Tuple
+from flask import current_app, render_template, request
+
+class PageCacheService:
+    """Template pages rendered once per asset build and served from memory with validators
+    
+    The page templates only depend on the request path (for the active nav
+    link) and the asset manifest, so each (template, path) is rendered once
+    and kept with its brotli/gzip encodings. Responses carry a strong ETag per
+    encoding and Last-Modified, so repeat visits get a 304.
+    """
+    
+    # Browsers revalidate on every navigation; unchanged pages cost a 304
+    CACHE_CONTROL = "no-cache"
+    
+    def __init__(self, asset_service, compression_service=None):
+        self.asset_service = asset_service
+        self.compression_service = compression_service
+        self.lock = threading.Lock()
+        self.pages: Dict[Tuple[str, str, str], "CachedPage"] = {}
+        self.stamp: Optional[Tuple[float, float]] = None
+        self.renders = 0
+        self.hits = 0
+    
+    def render(self, template: str):
+        """Response for a template page, rendered on the first request for it"""
+        if current_app.jinja_env.auto_reload:
+            self._check_for_changes()
+        key = (template, request.path, self.asset_service.version)
+        page = self.pages.get(key)
+        if page is None:
+            page = self._render(template, key)
+        else:
+            self.hits += 1
+        return page.response()
+    
+    def warm(self, app, paths: Iterable[str]) -> None:
+        """Pre-render the pages behind these GET paths by calling their views once"""
+        adapter = app.url_map.bind('localhost')
+        for path in paths:
+            endpoint, values = adapter.match(path, method='GET')
+            with app.test_request_context(path):
+                try:
+                    app.view_functions[endpoint](**values)
+                except Exception as e:
+                    print(f"Pre-rendering {path} failed: {e}")
+        self.stamp = self._template_stamp(app)
+    
+    def stats(self) -> Dict[str, int]:
+        return {"pages": len(self.pages), "renders": self.renders, "hits": self.hits}
+    
+    def _render(self, template: str, key: Tuple[str, str, str]) -> "CachedPage":
+        body = render_template(template).encode('utf-8')
+        encodings = {}
+        compression = self.compression_service
+        if compression is not None and len(body) >= compression.min_size:
+            encodings = {encoding: compression.compress(body, encoding) for encoding in compression.ENCODINGS}
+        page = CachedPage(body, encodings, self._last_modified(current_app))
+        with self.lock:
+            self.pages[key] = page
+            self.renders += 1
+        return page
+    
+    def _check_for_changes(self) -> None:
+        """Debug/auto-reload mode: drop every page when a template or the asset manifest changes"""
+        stamp = self._template_stamp(current_app)
+        if stamp == self.stamp:
+            return
+        if self.stamp is not None and stamp[1] != self.stamp[1]:
+            self.asset_service.load_manifest()
+        with self.lock:
+            self.pages.clear()
+            self.stamp = stamp
+    
+    def _template_stamp(self, app) -> Tuple[float, float]:
+        """(newest template mtime, asset manifest mtime)"""
+        newest = 0.0
+        for directory, _, names in os.walk(os.path.join(app.root_path, app.template_folder)):
+            for name in names:
+                newest = max(newest, os.path.getmtime(os.path.join(directory, name)))
+        try:
+            manifest = os.path.getmtime(self.asset_service.manifest_path)
+        except OSError:
+            manifest = 0.0
+        return newest, manifest
+    
+    def _last_modified(self, app) -> float:
+        if self.stamp is None:
+            self.stamp = self._template_stamp(app)
+        return max(self.stamp)
+
+class CachedPage:
+    """One rendered page and its precompressed encodings"""
+    
+    __slots__ = ('body', 'encodings', 'etag', 'last_modified')
+    
+    def __init__(self, body: bytes, encodings: Dict[str, bytes], last_modified: float):
+        self.body = body
+        self.encodings = encodings
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.last_modified = formatdate(last_modified, usegmt=True)
+    
+    def response(self):
+        encoding = request.accept_encodings.best_match(list(self.encodings)) if self.encodings else None
+        body = self.encodings[encoding] if encoding else self.body
+        response = current_app.response_class(body, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if self.encodings:
+            response.vary.add('Accept-Encoding')
+        # Each encoding is a different representation, so each gets its own strong ETag
+        response.set_etag(f"{self.etag}-{encoding}" if encoding else self.etag)
+        response.headers['Last-Modified'] = self.last_modified
+        response.headers['Cache-Control'] = PageCacheService.CACHE_CONTROL
+        return response.make_conditional(request)
@@ -0,0 +1,100 @@
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from typing import Dict, Any, Callable, Optional, Tuple
+
+class PrefetchService:
+    """Speculatively generates the next quiz for the same notes and keeps it in a per-user slot
+    
+    A prefetch runs only while few user-facing generations are in flight, and only on an
+    admission slot that is free at that moment (AdmissionController.try_acquire); when the
+    controller would queue it, the prefetch is skipped rather than competing with admitted
+    requests for the model and its rate limit.
+    """
+    
+    POLL_SECONDS = 0.25
+    
+    def __init__(self, generate_fn: Callable, ttl: int = 300, max_workers: int = 1,
+                 max_foreground: int = 4, max_wait_seconds: float = 30, admission_controller=None):
+        self.generate_fn = generate_fn
+        self.admission_controller = admission_controller
+        self.slots = TTLCache(maxsize=1000, ttl=ttl)  # user_id -> (key, questions, source)
+        self.pending = {}  # user_id -> key being generated
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self.max_foreground = max_foreground
+        self.max_wait_seconds = max_wait_seconds
+        self.foreground_count = 0
+        self.lock = threading.Lock()
+    
+    @contextmanager
+    def foreground(self):
+        """Mark a user-facing generation as in flight so background work holds back"""
+        with self.lock:
+            self.foreground_count += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.foreground_count -= 1
+    
+    def schedule(self, user_id: int, settings: Dict[str, Any]) -> bool:
+        """Start a background generation unless one is already stored or running for these settings"""
+        key = self._key(settings)
+        with self.lock:
+            slot = self.slots.get(user_id)
+            if self.pending.get(user_id) == key or (slot and slot[0] == key):
+                return False
+            self.pending[user_id] = key
+        
+        self.executor.submit(self._run, user_id, key, dict(settings))
+        return True
+    
+    def take(self, user_id: int, settings: Dict[str, Any]) -> Optional[Tuple[list, str]]:
+        """Pop the stored quiz if it was generated for exactly these settings"""
+        key = self._key(settings)
+        with self.lock:
+            slot = self.slots.get(user_id)
+            if not slot or slot[0] != key:
+                return None
+            del self.slots[user_id]
+        return slot[1], slot[2]
+    
+    def _run(self, user_id: int, key: str, settings: Dict[str, Any]) -> None:
+        try:
+            if not self._wait_for_idle():
+                return
+            admission = self.admission_controller.try_acquire() if self.admission_controller else None
+            if admission is not None and not admission['admitted']:
+                return
+            try:
+                questions, _, source = self.generate_fn(**settings, user_id=user_id)
+            finally:
+                if admission is not None:
+                    self.admission_controller.release(admission['ticket'])
+            if questions:
+                with self.lock:
+                    self.slots[user_id] = (key, questions, source)
+        except Exception as e:
+            print(f"Prefetch error: {e}")
+        finally:
+            with self.lock:
+                if self.pending.get(user_id) == key:
+                    del self.pending[user_id]
+    
+    def _wait_for_idle(self) -> bool:
+        """Yield to foreground requests; give up if the site stays busy"""
+        deadline = time.monotonic() + self.max_wait_seconds
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.foreground_count < self.max_foreground:
+                    return True
+            time.sleep(self.POLL_SECONDS)
+        return False
+    
+    def _key(self, settings: Dict[str, Any]) -> str:
+        raw = "|".join(str(settings.get(k, '')) for k in
+                       ('notes', 'num_questions', 'question_type', 'difficulty', 'mode'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
@@ -0,0 +1,104 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from tracing import traced
+
+# (repetitions, interval_days, ease, lapses)
+ReviewState = Tuple[int, float, float, int]
+
+class ReviewService:
+    """Spaced-repetition scheduling of answered cards (SM-2 with pass/fail grades)
+    
+    Every saved card gets review state (card_reviews): a correct answer is due
+    again after 1 day, then 6, then the previous interval times the card's
+    ease; a miss brings it back after relearn_minutes and lowers its ease.
+    Due cards are read most-overdue first from idx_user_due (user_id, due_at).
+    """
+    
+    NEW: ReviewState = (0, 0.0, 2.5, 0)
+    MIN_EASE = 1.3
+    EASE_PENALTY = 0.2
+    
+    def __init__(self, db, max_interval_days: float = 365, relearn_minutes: float = 10, quiz_size: int = 20):
+        self.db = db
+        self.max_interval_days = max_interval_days
+        self.relearn_days = relearn_minutes / 1440
+        self.quiz_size = quiz_size
+        self.counts = Counter()
+    
+    def next_state(self, state: ReviewState, correct: bool) -> ReviewState:
+        repetitions, interval_days, ease, lapses = state
+        if not correct:
+            return 0, self.relearn_days, max(self.MIN_EASE, ease - self.EASE_PENALTY), lapses + 1
+        repetitions += 1
+        interval_days = 1 if repetitions == 1 else 6 if repetitions == 2 else interval_days * ease
+        return repetitions, min(interval_days, self.max_interval_days), ease, lapses
+    
+    def initial_states(self) -> Tuple[ReviewState, ReviewState]:
+        """State of a first-time card answered correctly, and of one missed"""
+        return self.next_state(self.NEW, True), self.next_state(self.NEW, False)
+    
+    @traced("reviews.schedule_session")
+    def schedule_session(self, session_id: int) -> Optional[int]:
+        """Start review state for a saved session's cards; the number scheduled, or None on error"""
+        scheduled = self.db.schedule_session_cards(session_id, *self.initial_states())
+        if scheduled is not None:
+            self.counts["scheduled"] += scheduled
+        return scheduled
+    
+    @traced("reviews.due")
+    def due_quiz(self, user_id: int, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """A review quiz of the user's most overdue cards, in the shape /generate_questions returns"""
+        cards = self.db.get_due_cards(user_id, limit or self.quiz_size)
+        summary = self.db.get_review_summary(user_id)
+        if cards is None or summary is None:
+            return None
+        return {
+            "questions": [{
+                "cardId": card['card_id'],
+                "question": card['question'],
+                "options": card['options'],
+                "correctAnswer": card['correct_answer'],
+                "questionType": card['question_type'],
+                "difficulty": card['difficulty'],
+                "sessionId": card['session_id'],
+                "dueAt": card['due_at'].isoformat() if card['due_at'] else None,
+                "repetitions": card['repetitions'],
+                "lapses": card['lapses']
+            } for card in cards],
+            "due": int(summary['due']),
+            "scheduled": summary['scheduled'],
+            "next_due_at": summary['next_due_at'].isoformat() if summary['next_due_at'] else None
+        }
+    
+    @traced("reviews.answer")
+    def record_answers(self, user_id: int, answers: Dict[int, int]) -> Optional[List[Dict[str, Any]]]:
+        """Grade {card_id: user_answer} against the stored answers and reschedule them in one write
+        
+        Cards that aren't the user's or have no review state are skipped. None on error.
+        """
+        states = self.db.get_review_states(user_id, list(answers))
+        if states is None:
+            return None
+        
+        updated, results = [], []
+        for card_id, user_answer in answers.items():
+            row = states.get(card_id)
+            if row is None:
+                continue
+            correct = user_answer == row['correct_answer']
+            state = self.next_state((row['repetitions'], row['interval_days'], row['ease'], row['lapses']), correct)
+            updated.append((card_id, *state))
+            results.append({"cardId": card_id, "correct": correct, "intervalDays": round(state[1], 4)})
+        
+        if not self.db.save_review_states(user_id, updated):
+            return None
+        self.counts["reviewed"] += len(updated)
+        return results
+    
+    def reschedule(self, first_user_id: int, last_user_id: int) -> Optional[Tuple[int, int]]:
+        """Bulk job for one batch of users: schedule unscheduled cards and apply max_interval_days"""
+        return self.db.reschedule_reviews(first_user_id, last_user_id, *self.initial_states(),
+                                          self.max_interval_days)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"max_interval_days": self.max_interval_days, "quiz_size": self.quiz_size, **self.counts}
@@ -1,14 +1,38 @@
+import threading
 from cachetools import TTLCache
 from typing import Dict, Any, Optional
 from models import Database
+from tracing import traced
 
 class SessionService:
     """Handles session limits, caching, and allowance checking"""
     
-    def __init__(self, db: Database):
+    DAILY_LIMIT = 10
+    
+    def __init__(self, db: Database, identity_cache_size: int = 10000, identity_ttl: float = 300):
         self.db = db
         self.cache = TTLCache(maxsize=100, ttl=60)  # 60-second TTL
+        # email -> user row for repeat logins; ids never change and tiers only matter for admission priority
+        self.identities = TTLCache(maxsize=identity_cache_size, ttl=identity_ttl)
+        self.identity_lock = threading.Lock()
+        # Called with the user id whenever a user's sessions change (e.g. DashboardService.invalidate)
+        self.invalidation_listeners = []
+    
+    @traced("session.resolve_user")
+    def resolve_user(self, email: str) -> Optional[Dict[str, Any]]:
+        """User row for a login email, created on first login; repeat logins within the TTL skip the DB"""
+        with self.identity_lock:
+            user = self.identities.get(email)
+        if user is not None:
+            return user
+        
+        user = self.db.get_or_create_user(email)
+        if user:
+            with self.identity_lock:
+                self.identities[email] = user
+        return user
     
+    @traced("session.check_daily_limit")
     def check_daily_limit(self, user_id: int) -> Dict[str, Any]:
         """Check if user has exceeded daily session limit"""
         conn = None
@@ -40,9 +64,9 @@ class SessionService:
                 conn.commit()
             
             return {
-                "allowed": sessions_used < 10,
-                "remaining": max(0, 10 - sessions_used),
-                "limit": 10,
+                "allowed": sessions_used < self.DAILY_LIMIT,
+                "remaining": max(0, self.DAILY_LIMIT - sessions_used),
+                "limit": self.DAILY_LIMIT,
                 "sessions_used_today": sessions_used,
                 "reset_in": "midnight",
                 "period": "daily"
@@ -57,6 +81,7 @@ class SessionService:
             if conn:
                 conn.close()
     
+    @traced("session.increment_session_count")
     def increment_session_count(self, user_id: int) -> bool:
         """Increment user's session count after successful generation"""
         conn = None
@@ -88,6 +113,74 @@ class SessionService:
             if conn:
                 conn.close()
     
+    @traced("session.reserve_sessions")
+    def reserve_sessions(self, user_id: int, count: int) -> bool:
+        """Atomically reserve `count` sessions, all or nothing, resetting the day if needed"""
+        conn = None
+        cursor = None
+        try:
+            conn = self.db.get_connection()
+            if not conn:
+                return False
+            
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE users 
+                SET sessions_used_today = IF(last_session_date = CURDATE(), sessions_used_today, 0) + %s,
+                    total_sessions_used = total_sessions_used + %s,
+                    last_session_date = CURDATE()
+                WHERE id = %s
+                  AND IF(last_session_date = CURDATE(), sessions_used_today, 0) + %s <= %s
+            """, (count, count, user_id, count, self.DAILY_LIMIT))
+            conn.commit()
+            
+            self.invalidate_cache(user_id)
+            return cursor.rowcount == 1
+            
+        except Exception as e:
+            print(f"Error reserving sessions: {e}")
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+    
+    @traced("session.release_sessions")
+    def release_sessions(self, user_id: int, count: int) -> bool:
+        """Give back reserved sessions that were not used"""
+        if count <= 0:
+            return True
+        
+        conn = None
+        cursor = None
+        try:
+            conn = self.db.get_connection()
+            if not conn:
+                return False
+            
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE users 
+                SET sessions_used_today = GREATEST(sessions_used_today - %s, 0),
+                    total_sessions_used = GREATEST(total_sessions_used - %s, 0)
+                WHERE id = %s
+            """, (count, count, user_id))
+            conn.commit()
+            
+            self.invalidate_cache(user_id)
+            return True
+            
+        except Exception as e:
+            print(f"Error releasing sessions: {e}")
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+    
+    @traced("session.get_user_sessions")
     def get_user_sessions(self, user_id: int) -> list:
         """Get sessions from cache or database"""
         cache_key = f"sessions_{user_id}"
@@ -102,16 +195,18 @@ class SessionService:
         return sessions
     
     def invalidate_cache(self, user_id: int) -> None:
-        """Invalidate cached sessions for a user"""
+        """Invalidate cached sessions for a user, and anything derived from them"""
         cache_key = f"sessions_{user_id}"
         if cache_key in self.cache:
             del self.cache[cache_key]
+        for listener in self.invalidation_listeners:
+            listener(user_id)
     
     def _default_allowance(self) -> Dict[str, Any]:
         return {
             "allowed": True,
-            "remaining": 10,
-            "limit": 10,
+            "remaining": self.DAILY_LIMIT,
+            "limit": self.DAILY_LIMIT,
             "sessions_used_today": 0,
             "reset_in": "midnight",
             "period": "daily"
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+class TelemetryService:
+    """Aggregates LLM call metrics in memory and persists per-user token usage
+    
+    Calls are aggregated on the calling thread; token usage and sampled calls are queued
+    for this process's writer thread, which stores each batch with one upsert and one
+    file append, so request threads never wait on the database or disk for telemetry.
+    """
+    
+    # Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+    LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 30000)
+    WRITE_BATCH = 200
+    WRITE_INTERVAL_SECONDS = 2.0
+    MAX_QUEUED_CALLS = 10000
+    
+    def __init__(self, db=None, sample_rate: float = 0.0, sample_path: Optional[str] = None):
+        self.db = db
+        self.sample_rate = sample_rate
+        self.sample_path = sample_path
+        self.lock = threading.Lock()
+        self.metrics: Dict[tuple, Dict[str, Any]] = {}
+        # (call, charge the user, write a sample) for the writer thread
+        self.queue: "queue.Queue[tuple]" = queue.Queue(maxsize=self.MAX_QUEUED_CALLS)
+        self.thread = None
+        self.dropped = 0
+    
+    def start(self) -> None:
+        """Start this process's writer thread (per worker, after fork)"""
+        if (self.db or self.sample_path) and (self.thread is None or not self.thread.is_alive()):
+            self.thread = threading.Thread(target=self._write_loop, daemon=True, name="telemetry-writer")
+            self.thread.start()
+    
+    def record_llm_call(self, call: Dict[str, Any]) -> None:
+        """Record one LLM call: aggregate it, and queue the user's charge and maybe a sample"""
+        key = (call['model'], call['question_type'])
+        with self.lock:
+            entry = self.metrics.get(key)
+            if entry is None:
+                entry = self.metrics[key] = self._new_entry()
+            
+            entry['calls'] += 1
+            entry['statuses'][call['status']] += 1
+            entry['routes'][call.get('route', 'primary')] += 1
+            entry['latency_buckets'][self._bucket(call['latency_ms'])] += 1
+            entry['latency_sum_ms'] += call['latency_ms']
+            entry['latency_max_ms'] = max(entry['latency_max_ms'], call['latency_ms'])
+            for field in ('prompt_tokens', 'completion_tokens', 'total_tokens',
+                          'questions_requested', 'questions_valid'):
+                entry[field] += call.get(field, 0)
+        
+        charge = bool(self.db and call.get('user_id') and call.get('total_tokens'))
+        sample = bool(self.sample_path and self.sample_rate > 0 and random.random() < self.sample_rate)
+        if charge or sample:
+            if sample:
+                call = dict(call, recorded_at=datetime.now().isoformat())
+            try:
+                self.queue.put_nowait((call, charge, sample))
+            except queue.Full:
+                with self.lock:
+                    self.dropped += 1
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per (model, question_type) aggregates with derived rates"""
+        bounds = [str(b) for b in self.LATENCY_BUCKETS_MS] + ['+Inf']
+        result = []
+        with self.lock:
+            for (model, question_type), entry in sorted(self.metrics.items()):
+                calls = entry['calls']
+                latency_s = entry['latency_sum_ms'] / 1000
+                result.append({
+                    "model": model,
+                    "question_type": question_type,
+                    "calls": calls,
+                    "statuses": dict(entry['statuses']),
+                    "routes": dict(entry['routes']),
+                    "latency_histogram_ms": dict(zip(bounds, entry['latency_buckets'])),
+                    "latency_avg_ms": round(entry['latency_sum_ms'] / calls, 1) if calls else 0,
+                    "latency_max_ms": round(entry['latency_max_ms'], 1),
+                    "prompt_tokens": entry['prompt_tokens'],
+                    "completion_tokens": entry['completion_tokens'],
+                    "total_tokens": entry['total_tokens'],
+                    "completion_tokens_per_second": round(entry['completion_tokens'] / latency_s, 1) if latency_s else 0,
+                    "question_yield": round(entry['questions_valid'] / entry['questions_requested'], 3)
+                        if entry['questions_requested'] else 0
+                })
+        return result
+    
+    def writer_stats(self) -> Dict[str, Any]:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+    
+    def _new_entry(self) -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "statuses": Counter(),
+            "routes": Counter(),
+            "latency_buckets": [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+            "latency_sum_ms": 0.0,
+            "latency_max_ms": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+            "questions_requested": 0,
+            "questions_valid": 0
+        }
+    
+    def _bucket(self, latency_ms: float) -> int:
+        for i, bound in enumerate(self.LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                return i
+        return len(self.LATENCY_BUCKETS_MS)
+    
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.WRITE_INTERVAL_SECONDS
+            while len(batch) < self.WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Telemetry write error: {e}")
+    
+    def _write(self, batch: List[tuple]) -> None:
+        """Charge the batch's token usage in one upsert and append its samples to the JSONL file"""
+        usage: Dict[tuple, List[int]] = {}
+        for call, charge, _ in batch:
+            if charge:
+                totals = usage.setdefault((call['user_id'], call['model']), [0, 0, 0, 0])
+                totals[0] += 1
+                for i, field in enumerate(('prompt_tokens', 'completion_tokens', 'total_tokens'), 1):
+                    totals[i] += call.get(field, 0)
+        if usage and not self.db.add_llm_usage([key + tuple(totals) for key, totals in usage.items()]):
+            print(f"Failed to store LLM usage for {len(usage)} users")
+        
+        samples = [call for call, _, sample in batch if sample]
+        if samples:
+            self._write_samples(samples)
+    
+    def _write_samples(self, calls: List[Dict[str, Any]]) -> None:
+        """Append prompt/response pairs to a JSONL file for offline replay"""
+        try:
+            directory = os.path.dirname(self.sample_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.sample_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(call) + "\n" for call in calls))
+        except OSError as e:
+            print(f"Failed to write LLM samples: {e}")
@@ -0,0 +1,306 @@
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import random
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+import requests
+from flask import g, request
+import tracing
+from json_provider import FastJSONProvider
+
+class TracingService:
+    """Samples requests into span trees, exports them as OTLP JSON, and profiles single requests on demand"""
+    
+    EXPORT_BATCH = 100
+    EXPORT_INTERVAL_SECONDS = 2.0
+    MAX_QUEUED_TRACES = 1000
+    
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[str] = None,
+                 export_path: Optional[str] = None, otlp_endpoint: Optional[str] = None,
+                 service_name: str = "reviseai", profile_token: Optional[str] = None,
+                 profile_endpoints: Optional[List[str]] = None, profile_interval_ms: float = 5,
+                 profile_dir: str = "logs/profiles"):
+        self.sample_rate = sample_rate
+        self.exporter = exporter  # "file", "otlp" or None (traces are only summarised in headers)
+        self.export_path = export_path
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self.profile_token = profile_token
+        self.profile_endpoints = set(profile_endpoints or [])
+        self.profile_interval = profile_interval_ms / 1000
+        self.profile_dir = profile_dir
+        self.queue: "queue.Queue[tracing.Trace]" = queue.Queue(maxsize=self.MAX_QUEUED_TRACES)
+        self.thread = None
+        self.dropped = 0
+        self.exported = 0
+    
+    def init_app(self, app) -> None:
+        """Register the request hooks; call before other before_request handlers so they run inside the root span"""
+        app.json = TracedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+    
+    def start(self) -> None:
+        """Start this process's exporter thread (per worker, after fork)"""
+        if self.exporter and (self.thread is None or not self.thread.is_alive()):
+            self.thread = threading.Thread(target=self._export_loop, daemon=True, name="trace-exporter")
+            self.thread.start()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "exporter": self.exporter,
+            "queued": self.queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "profiling": bool(self.profile_token or self.profile_endpoints)
+        }
+    
+    def read_profile(self, profile_id: str) -> Optional[str]:
+        """Collapsed stacks of a profiled request (any worker on this host wrote it)"""
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.profile_dir, f"{profile_id}.folded"), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def profile_allowed(self, token: Optional[str]) -> bool:
+        """Whether token is PROFILE_TOKEN, compared in constant time; always False when none is set"""
+        if not self.profile_token or token is None:
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.profile_token.encode('utf-8'))
+    
+    def _wants_profile(self) -> bool:
+        return self.profile_allowed(request.headers.get('X-Profile')) or request.endpoint in self.profile_endpoints
+    
+    def _sampled(self) -> Optional[tracing.Trace]:
+        """Honour an upstream W3C traceparent decision, else sample locally"""
+        parent = request.headers.get('traceparent', '').split('-')
+        if len(parent) == 4 and len(parent[1]) == 32:
+            if parent[3] == '01':
+                g.trace_parent_id = parent[2]
+                return tracing.Trace(parent[1])
+            return None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return tracing.Trace()
+        return None
+    
+    def _before_request(self) -> None:
+        profile = self._wants_profile()
+        trace = self._sampled()
+        if trace is None and not profile:
+            return
+        
+        # A profiled request is always traced so the profile and the span tree share an id
+        trace = trace or tracing.Trace()
+        root = tracing.Span(trace, f"{request.method} {request.url_rule or request.path}",
+                            g.pop('trace_parent_id', None), tracing.KIND_SERVER, {
+                                "http.method": request.method,
+                                "http.route": str(request.url_rule or ''),
+                                "http.target": request.path,
+                                "flask.endpoint": request.endpoint or 'unmatched'
+                            })
+        g.trace_root = root
+        g.trace_token = tracing.activate(root)
+        if profile:
+            g.profiler = Profiler(self.profile_interval)
+            g.profiler.start()
+    
+    def _after_request(self, response):
+        root = g.get('trace_root')
+        if root is None:
+            return response
+        
+        root.attributes["http.status_code"] = response.status_code
+        response.headers['X-Trace-Id'] = root.trace.trace_id
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            if self._write_profile(root.trace.trace_id, profiler):
+                response.headers['X-Profile-Id'] = root.trace.trace_id
+                root.attributes["profile.samples"] = profiler.samples
+        return response
+    
+    def _teardown_request(self, exc) -> None:
+        root = g.pop('trace_root', None)
+        if root is None:
+            return
+        
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+        root.finish(exc)
+        tracing.deactivate(g.pop('trace_token'))
+        if self.exporter:
+            try:
+                self.queue.put_nowait(root.trace)
+            except queue.Full:
+                self.dropped += 1
+    
+    def _write_profile(self, profile_id: str, profiler: "Profiler") -> bool:
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(os.path.join(self.profile_dir, f"{profile_id}.folded"), 'w', encoding='utf-8') as f:
+                f.write(profiler.folded())
+            return True
+        except OSError as e:
+            print(f"Failed to write profile: {e}")
+            return False
+    
+    def _export_loop(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.EXPORT_INTERVAL_SECONDS
+            while len(batch) < self.EXPORT_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"Trace export error: {e}")
+    
+    def _export(self, traces: List[tracing.Trace]) -> None:
+        payload = self._otlp_payload(traces)
+        if self.exporter == "otlp":
+            response = requests.post(f"{self.otlp_endpoint.rstrip('/')}/v1/traces", json=payload, timeout=5)
+            response.raise_for_status()
+        else:
+            # One ExportTraceServiceRequest per line, as read by the collector's otlpjsonfile receiver
+            directory = os.path.dirname(self.export_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.export_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(payload, separators=(',', ':')) + "\n")
+    
+    def _otlp_payload(self, traces: List[tracing.Trace]) -> Dict[str, Any]:
+        """OTLP/JSON (protobuf JSON mapping) for a batch of traces"""
+        spans = []
+        for trace in traces:
+            for span in trace.spans:
+                if span.end_ns is None:
+                    continue
+                entry = {
+                    "traceId": trace.trace_id,
+                    "spanId": span.span_id,
+                    "name": span.name,
+                    "kind": span.kind,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 0}
+                }
+                if span.parent_id:
+                    entry["parentSpanId"] = span.parent_id
+                spans.append(entry)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", self.service_name),
+                _otlp_attribute("process.pid", os.getpid())
+            ]},
+            "scopeSpans": [{"scope": {"name": "reviseai.tracing"}, "spans": spans}]
+        }]}
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+class TracedJSONProvider(FastJSONProvider):
+    """The app's JSON provider with response serialization timed as a span"""
+    
+    def response(self, *args, **kwargs):
+        with tracing.span("json.serialize"):
+            return super().response(*args, **kwargs)
+
+class Profiler:
+    """Wall-clock sampling profiler for the current request, producing collapsed (folded) stacks
+    
+    Samples are taken from a native thread so they keep coming while the request
+    blocks on I/O; under gevent the request greenlet's own frame is sampled when
+    it is switched out.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.running = False
+        self.thread_id = _native_thread_id()
+        self.greenlet = _current_greenlet()
+    
+    def start(self) -> None:
+        self.running = True
+        _start_native_thread(self._run)
+    
+    def stop(self) -> None:
+        self.running = False
+    
+    def folded(self) -> str:
+        """One `frame;frame;frame count` line per distinct stack, for flamegraph.pl, speedscope or inferno"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+    
+    def _run(self) -> None:
+        sleep = _native_sleep()
+        while self.running:
+            sleep(self.interval)
+            frame = self.greenlet.gr_frame if self.greenlet is not None else None
+            if frame is None:
+                frame = sys._current_frames().get(self.thread_id)
+            if frame is None or not self.running:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+def _gevent_patched() -> bool:
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+def _current_greenlet():
+    if not _gevent_patched():
+        return None
+    import greenlet
+    return greenlet.getcurrent()
+
+def _native_thread_id() -> int:
+    # Patched get_ident() returns the greenlet's id, not the key sys._current_frames() uses
+    if _gevent_patched():
+        from gevent import monkey
+        return monkey.get_original('_thread', 'get_ident')()
+    return threading.get_ident()
+
+def _start_native_thread(target) -> None:
+    if _gevent_patched():
+        from gevent import monkey
+        monkey.get_original('_thread', 'start_new_thread')(target, ())
+    else:
+        threading.Thread(target=target, daemon=True, name="request-profiler").start()
+
+def _native_sleep():
+    if _gevent_patched():
+        from gevent import monkey
+        return monkey.get_original('time', 'sleep')
+    return time.sleep
@@ -0,0 +1,126 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from tracing import traced
+
+class TrendService:
+    """Accuracy, study-time, streak and period-over-period views over the daily rollups
+    
+    Every view is one read of the user's user_daily_stats rows in the
+    requested range (one row per day studied), so its cost follows the
+    length of the range rather than how many sessions or cards there are.
+    Streaks read only the current run; the longest is kept in user_streaks.
+    """
+    
+    BUCKETS = ('day', 'week')
+    
+    def __init__(self, db, utc_offset_hours: float = 0, max_days: int = 3660):
+        self.db = db
+        # study_sessions.created_at holds wall-clock time at this offset, so "today" must too
+        self.timezone = timezone(timedelta(hours=utc_offset_hours))
+        self.max_days = max_days
+    
+    def today(self) -> date:
+        return datetime.now(self.timezone).date()
+    
+    def check_range(self, start: date, end: date) -> None:
+        if end < start:
+            raise ValueError("from must not be after to")
+        if (end - start).days + 1 > self.max_days:
+            raise ValueError(f"Ranges are limited to {self.max_days} days")
+    
+    @traced("trends.series")
+    def series(self, user_id: int, start: date, end: date, bucket: str = 'day') -> Optional[Dict[str, Any]]:
+        """Zero-filled per-day or per-week (Monday-based) series for start..end inclusive"""
+        self.check_range(start, end)
+        if bucket not in self.BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(self.BUCKETS)}")
+        rows = self.db.get_daily_stats(user_id, start, end)
+        if rows is None:
+            return None
+        
+        step = 7 if bucket == 'week' else 1
+        first = start - timedelta(days=start.weekday()) if bucket == 'week' else start
+        buckets = {}
+        day = first
+        while day <= end:
+            buckets[day] = [0, 0, 0, 0.0]
+            day += timedelta(days=step)
+        for row in rows:
+            key = row['day'] - timedelta(days=row['day'].weekday()) if bucket == 'week' else row['day']
+            totals = buckets[key]
+            totals[0] += row['sessions']
+            totals[1] += row['questions']
+            totals[2] += row['correct']
+            totals[3] += row['study_seconds']
+        
+        values = list(buckets.values())
+        return {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "bucket": bucket,
+            "labels": [day.isoformat() for day in buckets],
+            "sessions": [v[0] for v in values],
+            "questions": [v[1] for v in values],
+            "correct": [v[2] for v in values],
+            "accuracy": [round(v[2] / v[1] * 100, 1) if v[1] else None for v in values],
+            "study_minutes": [round(v[3] / 60, 1) for v in values],
+            "totals": self._totals(rows)
+        }
+    
+    @traced("trends.streaks")
+    def streaks(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Current and longest runs of consecutive study days"""
+        today = self.today()
+        streak = self.db.get_streak(user_id, today)
+        if streak is None:
+            return None
+        
+        last = streak['last_study_day']
+        return {
+            "current": streak['current'],
+            "longest": streak['longest'],
+            "active_days": streak['active_days'],
+            "last_study_day": last.isoformat() if last else None,
+            "studied_today": last == today
+        }
+    
+    @traced("trends.compare")
+    def compare(self, user_id: int, end: date, days: int = 7) -> Optional[Dict[str, Any]]:
+        """The `days` days ending on `end` against the `days` days before them"""
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        start = end - timedelta(days=2 * days - 1)
+        self.check_range(start, end)
+        rows = self.db.get_daily_stats(user_id, start, end)
+        if rows is None:
+            return None
+        
+        split = end - timedelta(days=days - 1)
+        current = self._totals([row for row in rows if row['day'] >= split])
+        previous = self._totals([row for row in rows if row['day'] < split])
+        # Percent change for the counts; accuracy changes in percentage points
+        change = {}
+        for key in ('sessions', 'questions', 'correct', 'study_minutes'):
+            change[key] = round((current[key] - previous[key]) / previous[key] * 100, 1) if previous[key] else None
+        change['accuracy'] = (round(current['accuracy'] - previous['accuracy'], 1)
+                              if current['accuracy'] is not None and previous['accuracy'] is not None else None)
+        return {
+            "days": days,
+            "current": {"from": split.isoformat(), "to": end.isoformat(), **current},
+            "previous": {"from": start.isoformat(), "to": (split - timedelta(days=1)).isoformat(), **previous},
+            "change": change
+        }
+    
+    @staticmethod
+    def _totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        sessions = sum(row['sessions'] for row in rows)
+        questions = sum(row['questions'] for row in rows)
+        correct = sum(row['correct'] for row in rows)
+        return {
+            "sessions": sessions,
+            "questions": questions,
+            "correct": correct,
+            "accuracy": round(correct / questions * 100, 1) if questions else None,
+            "study_minutes": round(sum(row['study_seconds'] for row in rows) / 60, 1),
+            "active_days": len(rows)
+        }
@@ -4,6 +4,9 @@ let typePerformanceChart = null;
 let difficultyChart = null;
 let currentRangeFilter = '5';
 let currentTimeFilter = '30';
+// Last /analytics/dashboard response; its breakdown covers the filters it was loaded with
+let dashboardData = null;
+let dashboardFilters = null;
 
 function initProgressChart() {
     const canvas = document.getElementById('progress-chart');
@@ -173,9 +176,10 @@ function applyAnalyticsFilters() {
     const daysLimit = currentTimeFilter === 'all' ? null : parseInt(currentTimeFilter);
     
     let filtered = [...allSessions];
+    let cutoff = null;
     
     if (daysLimit) {
-        const cutoff = new Date();
+        cutoff = new Date();
         cutoff.setDate(cutoff.getDate() - daysLimit);
         filtered = filtered.filter(s => new Date(s.created_at) >= cutoff);
     }
@@ -185,10 +189,66 @@ function applyAnalyticsFilters() {
     updateSummaryStats(filtered);
     updateProgressChart(filtered, rangeLimit);
     updateTrendsChart(filtered);
-    loadAdvancedAnalyticsForSessions(filtered);
+    // "All sessions" is a date range the server can filter on, rather than a list of every id
+    const filters = currentRangeFilter === 'all' ? (cutoff ? { date_from: cutoff.toISOString() } : {}) : null;
+    loadAdvancedAnalyticsForSessions(filtered, filters);
 }
 
-async function loadAdvancedAnalyticsForSessions(sessions) {
+// Everything the analytics page shows on load (auth, tier, sessions, breakdown) in one request
+async function loadDashboard() {
+    try {
+        const range = document.getElementById('sessions-range')?.value ?? currentRangeFilter;
+        const time = document.getElementById('time-period')?.value ?? currentTimeFilter;
+        const response = await fetch(`/analytics/dashboard?sessions=${encodeURIComponent(range)}&days=${encodeURIComponent(time)}`);
+        const data = await response.json();
+        if (data.status === 'success' && data.authenticated && data.user) {
+            currentUser = data.user;
+            dashboardData = data;
+            dashboardFilters = { range, time };
+            return true;
+        }
+        return false;
+    } catch (error) {
+        console.error('Dashboard load failed:', error);
+        return false;
+    }
+}
+
+function renderDashboard() {
+    // Sections the server couldn't load fall back to their own endpoints
+    if (dashboardData.tier_info) renderTierInfo(dashboardData.tier_info);
+    else updateTierInfo();
+    
+    initAllCharts();
+    if (dashboardData.sessions) {
+        allSessions = dashboardData.sessions;
+        applyAnalyticsFilters();
+    } else {
+        loadSessions(1);
+    }
+}
+
+function renderBreakdown(breakdown) {
+    const typeData = { mcq: { total: 0, correct: 0 }, tf: { total: 0, correct: 0 } };
+    const difficultyData = { normal: { total: 0, correct: 0 }, difficult: { total: 0, correct: 0 } };
+    
+    breakdown.question_types?.forEach(item => {
+        if (item.question_type in typeData) {
+            typeData[item.question_type] = { total: item.total_questions, correct: item.correct_answers };
+        }
+    });
+    
+    breakdown.difficulties?.forEach(item => {
+        if (item.difficulty in difficultyData) {
+            difficultyData[item.difficulty] = { total: item.total_questions, correct: item.correct_answers };
+        }
+    });
+    
+    updateTypePerformanceChart(typeData);
+    updateDifficultyChart(difficultyData);
+}
+
+async function loadAdvancedAnalyticsForSessions(sessions, filters = null) {
     const sessionIds = sessions.map(s => s.id);
     
     if (sessionIds.length === 0) {
@@ -197,34 +257,24 @@ async function loadAdvancedAnalyticsForSessions(sessions) {
         return;
     }
     
+    // The filters the dashboard was loaded with: its breakdown already covers these sessions
+    const breakdown = dashboardData?.type_difficulty;
+    if (breakdown && dashboardData.sessions === allSessions &&
+        dashboardFilters.range === currentRangeFilter && dashboardFilters.time === currentTimeFilter) {
+        renderBreakdown(breakdown);
+        return;
+    }
+    
     try {
         const response = await fetch('/analytics/type-difficulty-filtered', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ session_ids: sessionIds })
+            body: JSON.stringify(filters ?? { session_ids: sessionIds })
         });
         
         const data = await response.json();
         
-        if (data.status === 'success') {
-            const typeData = { mcq: { total: 0, correct: 0 }, tf: { total: 0, correct: 0 } };
-            const difficultyData = { normal: { total: 0, correct: 0 }, difficult: { total: 0, correct: 0 } };
-            
-            data.data.question_types?.forEach(item => {
-                if (item.question_type in typeData) {
-                    typeData[item.question_type] = { total: item.total_questions, correct: item.correct_answers };
-                }
-            });
-            
-            data.data.difficulties?.forEach(item => {
-                if (item.difficulty in difficultyData) {
-                    difficultyData[item.difficulty] = { total: item.total_questions, correct: item.correct_answers };
-                }
-            });
-            
-            updateTypePerformanceChart(typeData);
-            updateDifficultyChart(difficultyData);
-        }
+        if (data.status === 'success') renderBreakdown(data.data);
     } catch (error) {
         console.error('Error loading analytics:', error);
     }
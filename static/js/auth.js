@@ -110,27 +110,28 @@ async function updateTierInfo() {
         const response = await fetch('/user/tier-info');
         const data = await response.json();
         
-        if (data.status === 'success') {
-            const info = data.tier_info;
-            const tierEl = document.getElementById('user-tier');
-            if (tierEl) tierEl.textContent = info.tier.charAt(0).toUpperCase() + info.tier.slice(1) + ' Plan';
-            
-            const sessionsEl = document.getElementById('sessions-remaining');
-            if (sessionsEl) sessionsEl.textContent = `Sessions remaining: ${info.remaining_sessions}`;
+        if (data.status === 'success') renderTierInfo(data.tier_info);
+    } catch (error) {
+        console.error('Error fetching tier info:', error);
+    }
+}
 
-            const resetsEl = document.getElementById('resets-in');
-            if (resetsEl) resetsEl.textContent = `Resets in: ${info.reset_in}`;
+function renderTierInfo(info) {
+    const tierEl = document.getElementById('user-tier');
+    if (tierEl) tierEl.textContent = info.tier.charAt(0).toUpperCase() + info.tier.slice(1) + ' Plan';
+    
+    const sessionsEl = document.getElementById('sessions-remaining');
+    if (sessionsEl) sessionsEl.textContent = `Sessions remaining: ${info.remaining_sessions}`;
 
-            const topbarEmailEl = document.getElementById('topbar-email');
-            if (topbarEmailEl) topbarEmailEl.textContent = currentUser.email;
+    const resetsEl = document.getElementById('resets-in');
+    if (resetsEl) resetsEl.textContent = `Resets in: ${info.reset_in}`;
 
-            // Mobile menu shows its own copies of this info - keep them in sync
-            const mobileSessionsEl = document.getElementById('mobile-sessions-info');
-            if (mobileSessionsEl) mobileSessionsEl.textContent = `Sessions: ${info.remaining_sessions} remaining`;
+    const topbarEmailEl = document.getElementById('topbar-email');
+    if (topbarEmailEl) topbarEmailEl.textContent = currentUser.email;
 
-            if (typeof syncMobileUserData === 'function') syncMobileUserData();
-        }
-    } catch (error) {
-        console.error('Error fetching tier info:', error);
-    }
+    // Mobile menu shows its own copies of this info - keep them in sync
+    const mobileSessionsEl = document.getElementById('mobile-sessions-info');
+    if (mobileSessionsEl) mobileSessionsEl.textContent = `Sessions: ${info.remaining_sessions} remaining`;
+
+    if (typeof syncMobileUserData === 'function') syncMobileUserData();
 }
\ No newline at end of file
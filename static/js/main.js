@@ -6,22 +6,22 @@ document.addEventListener('DOMContentLoaded', async function() {
     initMobileNavigation();
     initCollapsibleSidebar();
     
-    // Check authentication
-    const isAuthenticated = await checkAuthStatus();
+    // Check authentication; the analytics page gets its auth status along with its data
+    const onAnalytics = window.location.pathname === '/analytics';
+    const isAuthenticated = onAnalytics ? await loadDashboard() : await checkAuthStatus();
     
     if (isAuthenticated) {
         enableAppInterface();
-        updateTierInfo();
-        loadSessions(1);
         
-        // Initialize charts on analytics page
-        if (window.location.pathname === '/analytics') {
+        if (onAnalytics) {
             try {
-                initAllCharts();
-                setTimeout(() => applyAnalyticsFilters(), 500);
+                renderDashboard();
             } catch (error) {
                 console.error('Error initializing analytics charts:', error);
             }
+        } else {
+            updateTierInfo();
+            loadSessions(1);
         }
     } else {
         disableAppInterface();
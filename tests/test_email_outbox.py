@@ -0,0 +1,223 @@
+"""
+The email outbox: delivery, retry with backoff and giving up in EmailService
+against a local SMTP stand-in, and claiming, backoff and reclaiming after the
+10-minute lease in Database.claim_outbox_batch against MySQL.
+
+The MySQL tests empty email_outbox, so they only run against the throwaway
+database named by TEST_DB_HOST, TEST_DB_USER, TEST_DB_PASSWORD, TEST_DB_NAME
+(and optionally TEST_DB_PORT).
+"""
+import os
+import time
+import uuid
+
+import pytest
+
+from benchmarks.email_outbox import MemoryOutbox, make_app
+from benchmarks.standins import SMTPStandIn
+from services.email_service import EmailService
+
+
+class RecordingOutbox(MemoryOutbox):
+    """MemoryOutbox that records each scheduled retry and makes it due at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.retries = []
+
+    def mark_email_failed(self, email_id, error, retry_in_seconds=None):
+        super().mark_email_failed(email_id, error, retry_in_seconds)
+        self.retries.append(retry_in_seconds)
+        with self.lock:
+            self.rows[email_id]['due'] = 0.0
+
+
+@pytest.fixture
+def smtp():
+    standins = []
+
+    def start(fail_first=0):
+        standin = SMTPStandIn(fail_first=fail_first).start()
+        standins.append(standin)
+        return standin
+
+    yield start
+    for standin in standins:
+        standin.stop()
+
+
+def make_service(standin, outbox, **kwargs):
+    app, mail = make_app(standin)
+    return app, EmailService(mail, 'noreply@example.com', outbox=outbox, **kwargs)
+
+
+def drain(app, service, outbox, rounds=20):
+    """Claim and deliver until the outbox has nothing due, like one sender worker"""
+    connection = None
+    with app.app_context():
+        for _ in range(rounds):
+            emails = outbox.claim_outbox_batch(uuid.uuid4().hex, service.batch_size)
+            if not emails:
+                break
+            for email in emails:
+                connection = service._deliver(connection, email)
+        service._close(connection)
+
+
+def test_workers_deliver_queued_mail_over_one_connection(smtp):
+    standin = smtp()
+    outbox = MemoryOutbox()
+    app, service = make_service(standin, outbox, workers=1, poll_seconds=0.05)
+    service.start(app)
+    
+    for i in range(5):
+        assert service.send_async(f"Contact {i}", ['inbox@example.com'], 'Hello')
+    
+    deadline = time.monotonic() + 10
+    while outbox.get_outbox_stats().get('sent', 0) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert outbox.get_outbox_stats() == {'sent': 5}
+    assert standin.counts == {'connections': 1, 'messages': 5}
+    assert service.stats()['sent'] == 5
+
+
+def test_transient_failures_retry_with_exponential_backoff(smtp):
+    standin = smtp(fail_first=3)
+    outbox = RecordingOutbox()
+    app, service = make_service(standin, outbox, max_attempts=5)
+    email_id = outbox.enqueue_email("Contact", 'noreply@example.com', ['inbox@example.com'], 'Hello')
+    
+    drain(app, service, outbox)
+    
+    assert outbox.retries == [30, 60, 120]
+    assert outbox.rows[email_id]['status'] == 'sent'
+    assert outbox.rows[email_id]['attempts'] == 4
+    assert standin.counts['messages'] == 1
+    assert service.counters['retried'] == 3
+
+
+def test_gives_up_after_max_attempts(smtp):
+    standin = smtp(fail_first=10)
+    outbox = RecordingOutbox()
+    app, service = make_service(standin, outbox, max_attempts=3)
+    email_id = outbox.enqueue_email("Contact", 'noreply@example.com', ['inbox@example.com'], 'Hello')
+    
+    drain(app, service, outbox)
+    
+    assert outbox.retries == [30, 60, None]
+    assert outbox.rows[email_id]['status'] == 'failed'
+    assert outbox.rows[email_id]['attempts'] == 3
+    assert standin.counts['messages'] == 0
+    assert service.counters['failed'] == 1
+
+
+def test_backoff_is_capped(smtp):
+    outbox = RecordingOutbox()
+    _, service = make_service(smtp(), outbox, max_attempts=20)
+    email_id = outbox.enqueue_email("Contact", 'noreply@example.com', ['inbox@example.com'], 'Hello')
+    
+    for attempts in (6, 7, 12):
+        service._record_failure({'id': email_id, 'attempts': attempts}, RuntimeError("451"))
+    
+    assert outbox.retries == [1920, 3600, 3600]
+
+
+TEST_DB = {key: os.environ.get(f"TEST_DB_{key}") for key in ("HOST", "USER", "PASSWORD", "NAME", "PORT")}
+
+needs_mysql = pytest.mark.skipif(not all(TEST_DB[key] for key in ("HOST", "USER", "PASSWORD", "NAME")),
+                                 reason="TEST_DB_HOST/USER/PASSWORD/NAME not set")
+
+
+@pytest.fixture(scope="module")
+def database():
+    from config import Config
+    from models import Database
+    
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Config, 'DB_HOST', TEST_DB['HOST'])
+        patch.setattr(Config, 'DB_USER', TEST_DB['USER'])
+        patch.setattr(Config, 'DB_PASSWORD', TEST_DB['PASSWORD'])
+        patch.setattr(Config, 'DB_NAME', TEST_DB['NAME'])
+        patch.setattr(Config, 'DB_PORT', int(TEST_DB['PORT'] or 3306))
+        db = Database()
+        assert db.initialize_database()
+        yield db
+
+
+@pytest.fixture
+def outbox(database):
+    database.execute_query("DELETE FROM email_outbox")
+    return database
+
+
+def enqueue(db, count=1):
+    return [db.enqueue_email(f"Contact {i}", 'noreply@example.com', ['inbox@example.com'], 'Hello')
+            for i in range(count)]
+
+
+def claim(db, limit=20):
+    return [email['id'] for email in db.claim_outbox_batch(uuid.uuid4().hex, limit)]
+
+
+def set_age(db, email_id, column, minutes):
+    db.execute_query(f"UPDATE email_outbox SET {column} = NOW() - INTERVAL %s MINUTE WHERE id = %s",
+                     (minutes, email_id))
+
+
+@needs_mysql
+def test_claims_do_not_overlap(outbox):
+    ids = enqueue(outbox, 10)
+    
+    first = claim(outbox, limit=4)
+    second = claim(outbox)
+    
+    assert len(first) == 4
+    assert set(first).isdisjoint(second)
+    assert sorted(first + second) == sorted(ids)
+    assert claim(outbox) == []
+    assert outbox.get_outbox_stats() == {'sending': 10}
+
+
+@needs_mysql
+def test_failed_mail_waits_for_its_backoff(outbox):
+    [email_id] = enqueue(outbox)
+    assert claim(outbox) == [email_id]
+    
+    outbox.mark_email_failed(email_id, "451 temporary failure", 30)
+    assert claim(outbox) == []
+    
+    set_age(outbox, email_id, 'next_attempt_at', 1)
+    [email] = outbox.claim_outbox_batch(uuid.uuid4().hex, 20)
+    assert email['id'] == email_id
+    assert email['attempts'] == 1
+
+
+@needs_mysql
+def test_finished_mail_is_never_reclaimed(outbox):
+    sent, failed = enqueue(outbox, 2)
+    claim(outbox)
+    outbox.mark_email_sent(sent)
+    outbox.mark_email_failed(failed, "550 rejected")
+    
+    for email_id in (sent, failed):
+        set_age(outbox, email_id, 'claimed_at', 60)
+        set_age(outbox, email_id, 'next_attempt_at', 60)
+    
+    assert claim(outbox) == []
+    assert outbox.get_outbox_stats() == {'sent': 1, 'failed': 1}
+
+
+@needs_mysql
+def test_stale_claim_is_reclaimed_after_the_lease(outbox):
+    [email_id] = enqueue(outbox)
+    assert claim(outbox) == [email_id]
+    
+    set_age(outbox, email_id, 'claimed_at', 9)
+    assert claim(outbox) == []
+    
+    set_age(outbox, email_id, 'claimed_at', 11)
+    token = uuid.uuid4().hex
+    [email] = outbox.claim_outbox_batch(token, 20)
+    assert email['id'] == email_id
+    assert outbox.fetch_one("SELECT claimed_by FROM email_outbox WHERE id = %s", (email_id,))['claimed_by'] == token
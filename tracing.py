@@ -0,0 +1,163 @@
+"""
+Request tracing primitives shared by the models and services.
+
+A trace is started per sampled request by TracingService and lives in a
+context variable, so it follows the request's thread (gthread) or greenlet
+(gevent). Outside a sampled request span() and traced() do nothing beyond one
+context variable lookup.
+"""
+import os
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATEMENT_MAX_CHARS = 500
+
+_current: ContextVar[Optional["Span"]] = ContextVar('reviseai_span', default=None)
+
+class Trace:
+    """Spans collected for one request"""
+    
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List["Span"] = []
+
+class Span:
+    __slots__ = ('trace', 'name', 'kind', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+    
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str] = None,
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+        trace.spans.append(self)
+    
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, attributes)
+    
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+    
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def activate(span: Optional[Span]):
+    """Make span the parent of spans opened in this context; returns a token for deactivate()"""
+    return _current.set(span)
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Time a block as a child of the current span; yields None when the request is not traced"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    
+    child = parent.child(name, kind, **attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.finish(e)
+        raise
+    else:
+        child.finish()
+    finally:
+        _current.reset(token)
+
+def traced(name: str):
+    """Decorator form of span() for service methods"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def trace_connection(connection):
+    """Wrap a DB connection so each query on it becomes a span, if this request is traced"""
+    if connection is None or _current.get() is None:
+        return connection
+    return TracedConnection(connection)
+
+class TracedConnection:
+    """Pooled connection proxy whose cursors report their queries"""
+    
+    def __init__(self, connection):
+        self._connection = connection
+    
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._connection.cursor(*args, **kwargs))
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+class TracedCursor:
+    """A query span runs from execute() until its rows have been fetched"""
+    
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._span = None
+    
+    def execute(self, operation, params=None, *args, **kwargs):
+        statement = " ".join(operation.split())
+        with span("db.query", KIND_CLIENT, **{
+            "db.system": "mysql",
+            "db.operation": statement.split(" ", 1)[0].upper(),
+            "db.statement": statement[:STATEMENT_MAX_CHARS]
+        }) as query_span:
+            self._span = query_span
+            result = self._cursor.execute(operation, params, *args, **kwargs)
+            if query_span is not None and self._cursor.rowcount >= 0:
+                query_span.attributes["db.rows"] = self._cursor.rowcount
+            return result
+    
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._fetched(row, 0 if row is None else 1)
+    
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        return self._fetched(rows, len(rows))
+    
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        return self._fetched(rows, len(rows))
+    
+    def _fetched(self, result, count):
+        # Unbuffered cursors read rows off the socket here, so extend the query's span over it
+        if self._span is not None:
+            self._span.end_ns = time.time_ns()
+            self._span.attributes["db.rows_fetched"] = self._span.attributes.get("db.rows_fetched", 0) + count
+        return result
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -18,6 +18,7 @@ DB_HOST = os.environ.get("DB_HOST")
 DB_USER = os.environ.get("DB_USER")
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
 DB_NAME = os.environ.get("DB_NAME")
+DB_PORT = int(os.environ.get("DB_PORT", 3306))
 
 MAX_ATTEMPTS = 60
 SLEEP_SECONDS = 2
@@ -27,6 +28,7 @@ for attempt in range(1, MAX_ATTEMPTS + 1):
     try:
         conn = mysql.connector.connect(
             host=DB_HOST,
+            port=DB_PORT,
             user=DB_USER,
             password=DB_PASSWORD,
             database=DB_NAME,